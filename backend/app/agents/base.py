@@ -1,7 +1,16 @@
+import hashlib
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple, Type
+from app.core.deadline import DeadlineExceeded
 from app.core.llm.gateway import bedrock_gateway
+from app.core.llm.json_extract import extract_object
+from app.core.llm.profiles import GenerationProfile
+from app.core.llm.schema import SchemaIssue, field_schema, tool_name, validate
+from app.core.config import settings
+from app.core.metrics import AGENT_CALLS, AGENT_LATENCY, AGENT_PARSE_FAILURES, AGENT_SCHEMA_REPAIRS
+from app.models.analysis_results import SectionResult, decode
 
 # Configure logging
 logging.basicConfig(
@@ -11,56 +20,341 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AGENT_BASE")
 
+# Prefix prompt layout: every agent of a call sends the same system prompt and
+# transcript block first, so Bedrock can serve that prefix from its prompt cache.
+SHARED_SYSTEM_PROMPT = (
+    "You are part of a customer service call QA system. Several specialist analysts review "
+    "the same call transcript; your specialist role and task follow the transcript."
+    "\n\nIMPORTANT: Always respond with valid JSON only. No markdown, no explanations outside JSON."
+)
+TRANSCRIPT_REFERENCE = "(the CALL TRANSCRIPT above)"
+
+
+def transcript_prefix(transcript: str) -> str:
+    """Shared, cacheable leading block for the prefix layout."""
+    return f"CALL TRANSCRIPT:\n---\n{transcript}\n---"
+
+
+def content_hash(value: Any) -> str:
+    """Short stable hash of a string or JSON-serializable value."""
+    raw = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
 class BaseAgent:
+    # JSON Schema of the agent's result (see app.agents.schemas); None leaves the answer unchecked
+    output_schema: Optional[Dict[str, Any]] = None
+    # Typed model the result is decoded through (see app.models.analysis_results)
+    result_model: Optional[Type[SectionResult]] = None
+    # Bump when parsing or postprocessing changes results in a way the prompt hash does not show
+    version: str = "1"
+    # Name -> output schema of every agent sharing a transcript prefix (set by the orchestrator);
+    # they all send this one tool list, since the tools open Bedrock's cached prefix
+    toolset: Optional[Dict[str, Dict[str, Any]]] = None
+
     def __init__(self, name: str, role: str):
         self.name = name
         self.role = role
         logger.info(f"🤖 Agent initialized: {name}")
 
-    async def _invoke_llm(self, prompt: str, system_instruction: str = None) -> Dict[str, Any]:
+    @property
+    def generation_profile(self) -> GenerationProfile:
+        """Output cap, temperature, stop sequences and prefill the gateway uses for this agent."""
+        return bedrock_gateway.profiles.get(self.name, "analysis")
+
+    def system_prompt(self, system_instruction: str = None) -> str:
+        """Full system prompt sent with every call made by this agent."""
+        return f"{self.role}\n{system_instruction or ''}\n\nYou are running as: {self.name}\n\nIMPORTANT: Always respond with valid JSON only. No markdown, no explanations outside JSON."
+
+    def _request(
+        self,
+        prompt: str,
+        system_instruction: str = None,
+        prefix: Optional[str] = None,
+        schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Gateway arguments for a prompt: the prompt, system prompt, prefix,
+        output schema (this agent's unless given) and toolset.
+        With a prefix (prefix layout), the shared system prompt is used, this
+        agent's role moves after the prefix, into the prompt, and the shared
+        toolset is offered. Repairs answer a narrower schema with their own tool.
+        """
+        if prefix is None:
+            return {"prompt": prompt, "system_instruction": self.system_prompt(system_instruction), "prefix": None, "schema": schema or self.output_schema, "toolset": None}
+        return {
+            "prompt": f"{self.role}\n{system_instruction or ''}\nYou are running as: {self.name}\n{prompt}",
+            "system_instruction": SHARED_SYSTEM_PROMPT,
+            "prefix": prefix,
+            "schema": schema or self.output_schema,
+            "toolset": self.toolset if schema is None else None
+        }
+
+    def parse_response(self, response_text: str) -> Dict[str, Any]:
+        """
+        Extracts the JSON object from a model response; {"error": ...} if there is none.
+        The object is returned as parsed; type coercion happens in _checked, and
+        only for objects that fail the schema.
+        """
+        logger.info(f"📥 [{self.name}] Raw response: {len(response_text or '')} chars")
+        logger.debug(f"📥 [{self.name}] Response preview: {(response_text or '')[:300]}...")
+        
+        result = extract_object(response_text)
+        if result is None:
+            logger.error(f"❌ [{self.name}] No JSON object found in response")
+            logger.error(f"❌ [{self.name}] Failed text: {response_text[:500] if response_text else 'empty'}")
+            AGENT_PARSE_FAILURES.inc(agent=self.name)
+            return {"error": "No JSON found", "raw": response_text[:500] if response_text else ""}
+        
+        logger.info(f"✅ [{self.name}] JSON parsed successfully")
+        logger.info(f"📊 [{self.name}] Result keys: {list(result.keys())}")
+        return result
+
+    def cacheable(self, response_text: str, schema: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Whether a response may go into the gateway's response cache: it holds a
+        JSON object and, with a schema (default: output_schema), passes it
+        (after coercion). Answers that would need schema repair are not cached.
+        """
+        result = extract_object(response_text)
+        if result is None:
+            return False
+        schema = schema or self.output_schema
+        return not schema or not self._checked(result, schema)[1]
+
+    def _checked(self, result: Dict[str, Any], schema: Dict[str, Any]) -> Tuple[Dict[str, Any], List[SchemaIssue]]:
+        """
+        A result and its schema issues. Only when there are issues (usually a
+        number sent as a string) and the schema is output_schema is the result
+        decoded through result_model, which coerces values to the declared types,
+        and checked again; a result that already fits is used as parsed.
+        """
+        issues = validate(result, schema)
+        if issues and self.result_model and schema is self.output_schema:
+            typed = decode(self.result_model, result)
+            if typed is not None:
+                result = typed.model_dump()
+                issues = validate(result, schema)
+        return result, issues
+
+    def typed(self, result: Dict[str, Any]) -> Optional[SectionResult]:
+        """A result as this agent's typed model, or None (no model, error or mismatch)."""
+        if not self.result_model or "error" in result:
+            return None
+        return decode(self.result_model, result)
+
+    def repair_prompt(self, prompt: str, issues: List[SchemaIssue], fields: List[str]) -> str:
+        """The original task plus the problems found, asking again for only the broken fields."""
+        problems = "\n".join(f"- {issue}" for issue in issues)
+        return (
+            f"{prompt}\n\n[REPAIR] Your previous answer did not match the required format:\n{problems}\n"
+            f"Answer again with a JSON object containing ONLY these fields, corrected: {', '.join(fields)}."
+        )
+
+    async def _enforce_schema(
+        self,
+        result: Dict[str, Any],
+        prompt: str,
+        system_instruction: str = None,
+        prefix: Optional[str] = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Validates a parsed result against output_schema and re-prompts for just
+        the top-level fields that fail it, up to LLM_SCHEMA_REPAIR_ATTEMPTS
+        times. A response without any JSON counts as every field failing.
+        Fields still invalid afterwards are listed under "schema_errors".
+        """
+        schema = self.output_schema
+        if "error" in result:
+            if "raw" not in result:
+                # The call itself failed; nothing to repair
+                return result
+            result = {}
+        result, issues = self._checked(result, schema)
+        if not issues:
+            return result
+
+        for attempt in range(settings.LLM_SCHEMA_REPAIR_ATTEMPTS):
+            # An issue at the root (no object at all) means every field has to be redone
+            if all(issue.field for issue in issues):
+                fields = sorted({issue.field for issue in issues})
+            else:
+                fields = list(schema.get("required", []))
+            logger.warning(f"🔧 [{self.name}] {len(issues)} schema issue(s) in {fields}, repair attempt {attempt + 1}")
+            request = self._request(self.repair_prompt(prompt, issues, fields), system_instruction, prefix, field_schema(schema, fields))
+            try:
+                response_text = await bedrock_gateway.invoke_model(
+                    request["prompt"],
+                    system_instruction=request["system_instruction"],
+                    stream=stream,
+                    prefix=request["prefix"],
+                    agent_name=self.name,
+                    task="analysis",
+                    schema=request["schema"],
+                    cacheable=lambda text: self.cacheable(text, request["schema"]),
+                    toolset=request["toolset"]
+                )
+            except Exception as e:
+                logger.error(f"❌ [{self.name}] Repair call failed: {e}")
+                break
+            repaired = self.parse_response(response_text)
+            if "error" not in repaired:
+                result.update({field: repaired[field] for field in fields if field in repaired})
+            result, issues = self._checked(result, schema)
+            if not issues:
+                AGENT_SCHEMA_REPAIRS.inc(agent=self.name, outcome="repaired")
+                logger.info(f"✅ [{self.name}] Repaired {fields}")
+                return result
+
+        AGENT_SCHEMA_REPAIRS.inc(agent=self.name, outcome="failed")
+        return self._invalid(result, issues)
+
+    def _invalid(self, result: Dict[str, Any], issues: List[SchemaIssue]) -> Dict[str, Any]:
+        """Lists the issues a result still has under "schema_errors"."""
+        logger.error(f"❌ [{self.name}] Still invalid: {'; '.join(str(issue) for issue in issues)}")
+        result["schema_errors"] = [str(issue) for issue in issues]
+        if len(result) == 1:
+            # Nothing usable was recovered: report a failure rather than let defaults fill in
+            result["error"] = "Output does not match the schema"
+        return result
+
+    def check(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Checks a result that did not come through _invoke_llm (a map-reduce
+        merge, a batch answer) against output_schema the same way, coercion
+        included, but without repair calls: remaining issues go under "schema_errors".
+        """
+        if not self.output_schema or "error" in result:
+            return result
+        result, issues = self._checked(result, self.output_schema)
+        return self._invalid(result, issues) if issues else result
+
+    async def _invoke_llm(
+        self,
+        prompt: str,
+        system_instruction: str = None,
+        use_cache: bool = True,
+        stream: Optional[bool] = None,
+        prefix: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Wraps Bedrock Gateway with JSON parsing, validation, and comprehensive logging.
+        stream defaults to settings.LLM_STREAMING_ENABLED; when on, the gateway
+        returns as soon as the response's JSON object closes.
+        With an output_schema the model answers through a forced tool call and
+        fields failing the schema are repaired; see _enforce_schema.
+        DeadlineExceeded is raised, not turned into an error result, so the
+        orchestrator can tell a cancelled agent from a failed one.
         """
+        if stream is None:
+            stream = settings.LLM_STREAMING_ENABLED
         logger.info(f"{'='*60}")
         logger.info(f"🔄 [{self.name}] Starting LLM invocation")
         logger.info(f"📝 [{self.name}] Prompt length: {len(prompt)} chars")
+        profile = self.generation_profile
+        # A forced tool call (structured output) ignores the profile's prefill and stops
+        prefill = "tool call" if self.output_schema and settings.LLM_STRUCTURED_OUTPUT else repr(profile.prefill)
+        logger.info(f"🎛️ [{self.name}] Profile: max_tokens={profile.max_tokens}, temperature={profile.temperature}, prefill={prefill}")
+        started = time.monotonic()
         
         try:
-            full_system_prompt = f"{self.role}\n{system_instruction or ''}\n\nYou are running as: {self.name}\n\nIMPORTANT: Always respond with valid JSON only. No markdown, no explanations outside JSON."
+            request = self._request(prompt, system_instruction, prefix)
             
             logger.info(f"📡 [{self.name}] Calling Bedrock Gateway...")
-            response_text = await bedrock_gateway.invoke_model(prompt, system_instruction=full_system_prompt)
-            
-            logger.info(f"📥 [{self.name}] Raw response: {len(response_text)} chars")
-            logger.debug(f"📥 [{self.name}] Response preview: {response_text[:300]}...")
-            
-            # Clean and parse JSON
-            clean_text = response_text.replace("```json", "").replace("```", "").strip()
+            response_text = await bedrock_gateway.invoke_model(
+                request["prompt"],
+                system_instruction=request["system_instruction"],
+                use_cache=use_cache,
+                stream=stream,
+                prefix=request["prefix"],
+                agent_name=self.name,
+                task="analysis",
+                schema=request["schema"],
+                cacheable=lambda text: self.cacheable(text, request["schema"]),
+                toolset=request["toolset"]
+            )
             
-            # Find JSON boundaries
-            start = clean_text.find("{")
-            end = clean_text.rfind("}") + 1
-            
-            if start != -1 and end > start:
-                clean_text = clean_text[start:end]
-                result = json.loads(clean_text)
-                logger.info(f"✅ [{self.name}] JSON parsed successfully")
-                logger.info(f"📊 [{self.name}] Result keys: {list(result.keys())}")
-                return result
-            else:
-                logger.error(f"❌ [{self.name}] No JSON object found in response")
-                return {"error": "No JSON found", "raw": response_text[:500]}
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ [{self.name}] JSON parse error: {e}")
-            logger.error(f"❌ [{self.name}] Failed text: {response_text[:500] if response_text else 'empty'}")
-            return {"error": f"Invalid JSON: {str(e)}", "raw": response_text[:500] if response_text else ""}
+            result = self.parse_response(response_text)
+            if self.output_schema:
+                result = await self._enforce_schema(result, prompt, system_instruction, prefix, stream)
+            AGENT_CALLS.inc(agent=self.name, outcome="parse_error" if "error" in result else "ok")
+            AGENT_LATENCY.observe(time.monotonic() - started, agent=self.name)
+            return result
             
+        except DeadlineExceeded:
+            AGENT_CALLS.inc(agent=self.name, outcome="deadline")
+            AGENT_LATENCY.observe(time.monotonic() - started, agent=self.name)
+            logger.warning(f"⏰ [{self.name}] Deadline reached, call abandoned")
+            raise
         except Exception as e:
+            AGENT_CALLS.inc(agent=self.name, outcome="error")
+            AGENT_LATENCY.observe(time.monotonic() - started, agent=self.name)
             logger.error(f"❌ [{self.name}] Execution failed: {e}")
             import traceback
             logger.error(f"❌ [{self.name}] Traceback: {traceback.format_exc()}")
             return {"error": str(e)}
 
+    def build_prompt(self, transcript: str) -> str:
+        raise NotImplementedError("Subclasses must implement build_prompt()")
+
+    def build_request(self, transcript: str, **prompt_kwargs) -> Dict[str, Optional[str]]:
+        """Gateway arguments _analyze would send for this transcript (prompt, system prompt, prefix, schema), e.g. for batch jobs."""
+        if settings.PROMPT_LAYOUT == "prefix":
+            return self._request(
+                self.build_prompt(TRANSCRIPT_REFERENCE, **prompt_kwargs),
+                prefix=transcript_prefix(transcript)
+            )
+        return self._request(self.build_prompt(transcript, **prompt_kwargs))
+
+    def fingerprint(self, transcript: str, fitted: Optional[str] = None) -> Dict[str, str]:
+        """
+        What a result of this agent depends on: its version, a hash of the
+        request template (prompts, schema, generation parameters), the model
+        the request routes to and a hash of the transcript. fitted is the
+        transcript as sent after the token budget, used for routing.
+        A stored result with a different fingerprint is stale.
+        """
+        template = self.build_request("")
+        _, payload = bedrock_gateway.build_payload(
+            template["prompt"],
+            system_instruction=template["system_instruction"],
+            prefix=template["prefix"],
+            agent_name=self.name,
+            task="analysis",
+            schema=template["schema"],
+            toolset=template["toolset"]
+        )
+        if template["toolset"] and "tools" in payload:
+            # Only this agent's own tool counts: another agent's schema change does not make this result stale
+            payload["tools"] = [tool for tool in payload["tools"] if tool["name"] == tool_name(self.name)]
+        request = self.build_request(transcript if fitted is None else fitted)
+        route = bedrock_gateway.route(self.name, "analysis", (request["prefix"] or "") + request["prompt"])
+        return {
+            "agent": self.name,
+            "version": self.version,
+            "prompt_hash": content_hash(payload),
+            "model_id": route.model_id,
+            "transcript_hash": content_hash(transcript)
+        }
+
+    async def _analyze(self, transcript: str, **prompt_kwargs) -> Dict[str, Any]:
+        """
+        Invokes the LLM on a transcript using settings.PROMPT_LAYOUT.
+        "inline": the transcript sits inside this agent's prompt.
+        "prefix": the transcript is a shared leading block and the prompt only
+        points back at it, so all agents of a call share a cacheable prefix.
+        """
+        if settings.PROMPT_LAYOUT == "prefix":
+            return await self._invoke_llm(
+                self.build_prompt(TRANSCRIPT_REFERENCE, **prompt_kwargs),
+                prefix=transcript_prefix(transcript)
+            )
+        return await self._invoke_llm(self.build_prompt(transcript, **prompt_kwargs))
+
+    def postprocess(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Back-fills defaults on a parsed result. Subclasses override as needed."""
+        return result
+
     async def run(self, input_data: Any) -> Dict[str, Any]:
         raise NotImplementedError("Subclasses must implement run()")
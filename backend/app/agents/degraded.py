@@ -0,0 +1,125 @@
+import logging
+import re
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger("DEGRADED_ANALYSIS")
+
+# Lexicons for the no-LLM fallback; English plus common Hinglish phrasing seen in our calls
+NEGATIVE_WORDS = [
+    "angry", "frustrated", "unacceptable", "problem", "issue", "complaint", "wrong", "damaged",
+    "hate", "terrible", "worst", "disappointed", "useless", "pathetic", "not working", "bakwas", "pareshan",
+]
+POSITIVE_WORDS = [
+    "thank", "resolved", "happy", "great", "excellent", "appreciate", "perfect", "helpful",
+    "wonderful", "sorted", "dhanyavad", "shukriya",
+]
+RISK_KEYWORDS = {
+    "Churn": ["cancel", "leave", "competitor", "switch provider", "close account", "close my account", "unsubscribe"],
+    "Legal": ["lawsuit", "lawyer", "attorney", "sue", "court", "legal action", "consumer forum"],
+    "Compliance": ["threat", "data breach", "harass", "abuse", "fraud"],
+}
+
+DEGRADED_NOTE = "Heuristic result produced while the LLM was unavailable; queued for re-analysis."
+
+
+def _count(lowered: str, words) -> int:
+    return sum(len(re.findall(r"\b" + re.escape(word), lowered)) for word in words)
+
+
+def _lexicon_score(text: str) -> int:
+    """-100..100 from positive/negative lexicon hits; 0 when nothing matches."""
+    lowered = text.lower()
+    negative = _count(lowered, NEGATIVE_WORDS)
+    positive = _count(lowered, POSITIVE_WORDS)
+    if negative + positive == 0:
+        return 0
+    return int(100 * (positive - negative) / (positive + negative + 1))
+
+
+def phase_label(score: int) -> str:
+    """Trajectory label (Happy ... Angry) for a -100..100 sentiment score."""
+    if score > 50:
+        return "Happy"
+    if score > 20:
+        return "Satisfied"
+    if score >= -20:
+        return "Neutral"
+    return "Frustrated" if score >= -60 else "Angry"
+
+
+def _flagged(section: Dict[str, Any]) -> Dict[str, Any]:
+    section["degraded"] = True
+    section["degraded_note"] = DEGRADED_NOTE
+    return section
+
+
+def risk(transcript: str) -> Dict[str, Any]:
+    """Keyword risk scan: first hit per category, with a quote around it."""
+    lowered = transcript.lower()
+    flags = []
+    for category, words in RISK_KEYWORDS.items():
+        for word in words:
+            match = re.search(r"\b" + re.escape(word), lowered)
+            if match:
+                start = match.start()
+                flags.append({
+                    "category": category,
+                    "confidence": "low",
+                    "quote": transcript[max(0, start - 40):start + len(word) + 40].strip()
+                })
+                break
+    severity = "none"
+    if flags:
+        severity = "high" if any(f["category"] == "Legal" for f in flags) else ("medium" if len(flags) > 1 else "low")
+    return _flagged({
+        "risk_detected": bool(flags),
+        "severity": severity,
+        "flags": flags,
+        "summary": f"Keyword scan: {len(flags)} risk categories matched" if flags else "Keyword scan: no risk keywords found"
+    })
+
+
+def sentiment(transcript: str) -> Dict[str, Any]:
+    """Lexicon sentiment for the whole call and its thirds."""
+    third = max(1, len(transcript) // 3)
+    phases = [transcript[:third], transcript[third:2 * third], transcript[2 * third:]]
+    trajectory = []
+    for phase, text in zip(["Opening", "Middle", "Closing"], phases):
+        phase_score = _lexicon_score(text)
+        trajectory.append({"phase": phase, "score": phase_score, "label": phase_label(phase_score)})
+    score = _lexicon_score(transcript)
+    return _flagged({
+        "score": score,
+        "trajectory": trajectory,
+        "label": "Positive" if score > 20 else ("Negative" if score < -20 else "Neutral"),
+        "escalation_detected": score < -50 or risk(transcript)["severity"] == "high"
+    })
+
+
+def sop_compliance(transcript: str) -> Dict[str, Any]:
+    # Step adherence needs the model; report it as unknown rather than guess
+    return _flagged({"adherence_score": None, "compliant": None, "missed_steps": [], "checklist": []})
+
+
+def qa_score(transcript: str) -> Dict[str, Any]:
+    return _flagged({"total_score": None, "breakdown": {}, "critical_fail": False, "comments": DEGRADED_NOTE})
+
+
+def coaching(transcript: str) -> Dict[str, Any]:
+    return _flagged({"strengths": [], "weaknesses": [], "actionable_feedback": "", "recommended_training": []})
+
+
+# Result key -> heuristic, mirroring OrchestratorAgent.agents
+HEURISTICS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "sentiment": sentiment,
+    "sop_compliance": sop_compliance,
+    "risk_analysis": risk,
+    "qa_score": qa_score,
+    "coaching": coaching,
+}
+
+
+def degraded_section(key: str, transcript: str) -> Dict[str, Any]:
+    """Heuristic stand-in for one analysis section, flagged with "degraded": True."""
+    logger.warning(f"🩹 [DEGRADED] Using heuristic result for {key}")
+    return HEURISTICS[key](transcript)
@@ -0,0 +1,107 @@
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.agents.degraded import phase_label
+
+logger = logging.getLogger("MAP_REDUCE")
+
+SEVERITIES = ["none", "low", "medium", "high", "critical"]
+
+# (chunk index, chunk tokens, that chunk's agent result) of the chunks that
+# succeeded, in transcript order; failed chunks leave gaps in the indexes
+ChunkResults = List[Tuple[int, int, Dict[str, Any]]]
+
+
+def _position(index: int, count: int) -> str:
+    """Schema phase of chunk index out of count."""
+    if index == 0:
+        return "Opening"
+    return "Closing" if index == count - 1 else "Middle"
+
+
+def sentiment(parts: ChunkResults, chunk_count: int) -> Dict[str, Any]:
+    """
+    One trajectory point per chunk, from that chunk's real score, instead of
+    three phases guessed over the whole call. Each point keeps the schema's
+    phase and carries its chunk's place in the call as part (1-based) of
+    parts, so interior points stay apart and a failed chunk leaves a gap
+    rather than shifting the others. The overall score is the
+    token-weighted mean; escalation anywhere counts.
+    """
+    weights = [tokens for _, tokens, _ in parts]
+    scores = [int(result.get("score") or 0) for _, _, result in parts]
+    score = round(sum(w * s for w, s in zip(weights, scores)) / (sum(weights) or 1))
+    return {
+        "score": score,
+        "trajectory": [
+            {"phase": _position(index, chunk_count), "score": s, "label": phase_label(s), "part": index + 1, "parts": chunk_count}
+            for (index, _, _), s in zip(parts, scores)
+        ],
+        "label": "Positive" if score > 20 else ("Negative" if score < -20 else "Neutral"),
+        "escalation_detected": any(result.get("escalation_detected") for _, _, result in parts),
+    }
+
+
+def sop_compliance(parts: ChunkResults, chunk_count: int) -> Dict[str, Any]:
+    """A step passes if any chunk shows it done; evidence comes from that chunk."""
+    steps: Dict[str, Dict[str, Any]] = {}
+    for _, _, result in parts:
+        for item in result.get("checklist") or []:
+            name = str(item.get("step") or "").strip()
+            if not name:
+                continue
+            merged = steps.setdefault(name.lower(), {"step": name, "status": "fail", "evidence": item.get("evidence")})
+            if item.get("status") == "pass" and merged["status"] != "pass":
+                merged.update(status="pass", evidence=item.get("evidence"))
+    checklist = list(steps.values())
+    missed = [item["step"] for item in checklist if item["status"] != "pass"]
+    adherence = round(100 * (len(checklist) - len(missed)) / len(checklist)) if checklist else 0
+    return {
+        "adherence_score": adherence,
+        "compliant": adherence >= 80,
+        "missed_steps": missed,
+        "checklist": checklist,
+    }
+
+
+def risk_analysis(parts: ChunkResults, chunk_count: int) -> Dict[str, Any]:
+    """Union of the chunks' flags (deduplicated by category and quote), highest severity wins."""
+    flags, seen, summaries = [], set(), []
+    severity = "none"
+    for _, _, result in parts:
+        for flag in result.get("flags") or []:
+            key = (flag.get("category"), (flag.get("quote") or "").strip().lower())
+            if key not in seen:
+                seen.add(key)
+                flags.append(flag)
+        chunk_severity = result.get("severity") if result.get("severity") in SEVERITIES else "none"
+        if SEVERITIES.index(chunk_severity) > SEVERITIES.index(severity):
+            severity = chunk_severity
+        summary = (result.get("summary") or "").strip()
+        if result.get("risk_detected") and summary and summary not in summaries:
+            summaries.append(summary)
+    detected = any(result.get("risk_detected") for _, _, result in parts) or bool(flags)
+    return {
+        "risk_detected": detected,
+        "severity": severity,
+        "flags": flags,
+        "summary": " ".join(summaries) if summaries else "No risks detected in any part of the call.",
+    }
+
+
+# Result key -> reducer merging per-chunk results into the agent's usual schema.
+# Only agents whose findings are local to a stretch of the call can be mapped;
+# QA scoring and coaching judge the call as a whole and keep the trimmed transcript.
+REDUCERS: Dict[str, Callable[[ChunkResults, int], Dict[str, Any]]] = {
+    "sentiment": sentiment,
+    "sop_compliance": sop_compliance,
+    "risk_analysis": risk_analysis,
+}
+
+
+def reduce_section(key: str, parts: ChunkResults, chunk_count: int) -> Dict[str, Any]:
+    """Merged section for key, noting how many chunks it was built from."""
+    section = REDUCERS[key](parts, chunk_count)
+    section["map_reduce"] = {"chunks": chunk_count, "failed_chunks": chunk_count - len(parts)}
+    logger.info(f"🧩 [MAP_REDUCE] {key}: reduced {len(parts)}/{chunk_count} chunks")
+    return section
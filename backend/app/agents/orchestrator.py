@@ -1,12 +1,25 @@
 import asyncio
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 from app.agents.specialized.sentiment import SentimentAgent
 from app.agents.specialized.sop import SOPComplianceAgent
 from app.agents.specialized.risk import RiskDetectionAgent
 from app.agents.specialized.qa import QAScoringAgent
 from app.agents.specialized.coaching import CoachingAgent
+from app.agents.specialized.fused import FusedAnalysisAgent
+from app.agents.base import SHARED_SYSTEM_PROMPT, transcript_prefix
+from app.agents.degraded import degraded_section
+from app.agents.map_reduce import REDUCERS, reduce_section
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, deadline_scope
+from app.core.llm.budget import TranscriptBudget, chunk_turns
+from app.core.llm.gateway import bedrock_gateway
+from app.core.llm.priority import priority_scope
+from app.core.llm.tokens import estimate_tokens
+from app.core.metrics import ANALYSIS_TIMED_OUT
+from app.core.pipeline import Pipeline, PipelineRun, Stage
 
 # Configure logging
 logging.basicConfig(
@@ -27,48 +40,473 @@ class OrchestratorAgent:
         self.risk_agent = RiskDetectionAgent()
         self.qa_agent = QAScoringAgent()
         self.coaching_agent = CoachingAgent()
+        self.fused_agent = FusedAnalysisAgent()
+        
+        # Result key -> agent, shared by the fan-out and fused pipelines
+        self.agents = {
+            "sentiment": self.sentiment_agent,
+            "sop_compliance": self.sop_agent,
+            "risk_analysis": self.risk_agent,
+            "qa_score": self.qa_agent,
+            "coaching": self.coaching_agent
+        }
+        # One tool list for every fan-out agent, so with structured output their
+        # requests keep the transcript prefix they share in the prompt cache
+        self.toolset = {agent.name: agent.output_schema for agent in self.agents.values() if agent.output_schema}
+        for agent in self.agents.values():
+            agent.toolset = self.toolset
+        
+        self.budget = TranscriptBudget(
+            settings.LLM_TOKEN_BUDGET_DEFAULT,
+            settings.LLM_TOKEN_BUDGETS,
+            settings.LLM_BUDGET_POLICY
+        )
         
         logger.info("✅ All specialized agents loaded")
         logger.info("=" * 70)
 
-    async def analyze_call(self, call_id: str, transcript: str) -> Dict[str, Any]:
+    @staticmethod
+    def _overhead(agent) -> int:
+        return estimate_tokens(agent.system_prompt()) + estimate_tokens(agent.build_prompt(""))
+
+    def fit_transcript(self, agent, transcript: str) -> Tuple[str, Dict[str, Any]]:
+        """Estimates the agent's prompt and applies the budget policy when it is too long."""
+        overhead = self._overhead(agent)
+        fitted, report = self.budget.fit(agent.name, transcript, overhead)
+        if report["action"] == "chunk":
+            # Agents without a map-reduce path (see plan_chunks) still have to fit in one prompt
+            fitted, report = self.budget.fit(agent.name, transcript, overhead, policy="head_tail")
+            report["requested_action"] = "chunk"
+        return fitted, report
+
+    def is_long(self, transcript: str) -> bool:
+        """Long enough that map-reduce beats one end-to-end call (ANALYSIS_MAP_REDUCE_TOKENS)."""
+        return bool(settings.ANALYSIS_MAP_REDUCE_TOKENS) and estimate_tokens(transcript) > settings.ANALYSIS_MAP_REDUCE_TOKENS
+
+    def plan_chunks(self, key: str, transcript: str) -> Optional[Tuple[List[str], Dict[str, Any]]]:
+        """
+        Chunks for a map-reduce run of the key's agent, with its budget report,
+        or None to run it on the whole (fitted) transcript. Only agents with a
+        reducer are chunked, when the transcript is long or over budget under
+        the "chunk" policy.
+        """
+        if key not in REDUCERS:
+            return None
+        agent = self.agents[key]
+        overhead = self._overhead(agent)
+        budget = self.budget.budget_for(agent.name)
+        transcript_tokens = estimate_tokens(transcript)
+        over_budget = overhead + transcript_tokens > budget and self.budget.policy == "chunk"
+        if not (self.is_long(transcript) or over_budget):
+            return None
+        chunk_tokens = max(1, min(settings.ANALYSIS_CHUNK_TOKENS, budget - overhead))
+        chunks = chunk_turns(transcript, chunk_tokens, settings.ANALYSIS_CHUNK_OVERLAP_TURNS)
+        if len(chunks) < 2:
+            return None
+        report = {
+            "budget_tokens": budget,
+            "estimated_prompt_tokens": overhead + max(estimate_tokens(chunk) for chunk in chunks),
+            "transcript_tokens": transcript_tokens,
+            "action": "map_reduce",
+            "chunks": len(chunks),
+        }
+        return chunks, report
+
+    @staticmethod
+    def llm_calls(keys: List[str], budget_report: Dict[str, Any]) -> int:
+        """Agent calls a fan-out over keys made: one per chunk for a map-reduced key, else one."""
+        return sum(
+            (budget_report.get(key) or {}).get("chunks", 1) if (budget_report.get(key) or {}).get("action") == "map_reduce" else 1
+            for key in keys
+        )
+
+    async def _map_reduce(self, key: str, chunks: List[str]) -> Dict[str, Any]:
+        """
+        Runs the key's agent on every chunk concurrently and merges the results
+        into one section. Failed chunks are left out; the section only fails if
+        every chunk did (re-raising DeadlineExceeded if that was the cause).
+        """
+        agent = self.agents[key]
+        logger.info(f"🧩 Agent [{key}] mapping over {len(chunks)} chunks")
+        results = await asyncio.gather(*(agent.run(chunk) for chunk in chunks), return_exceptions=True)
+        parts = [
+            (index, estimate_tokens(chunk), result) for index, (chunk, result) in enumerate(zip(chunks, results))
+            if isinstance(result, dict) and "error" not in result
+        ]
+        if parts:
+            # Checked like a whole-transcript answer; a merge cannot be repaired, only flagged
+            return agent.check(reduce_section(key, parts, len(chunks)))
+        for result in results:
+            if isinstance(result, DeadlineExceeded):
+                raise result
+        first = results[0]
+        raise RuntimeError(f"All {len(chunks)} chunks failed: {first.get('error') if isinstance(first, dict) else first}")
+
+    def section_fingerprint(self, agent, transcript: str) -> Dict[str, str]:
+        """The fingerprint a fresh result of agent would carry for this transcript."""
+        fitted, _ = self.fit_transcript(agent, transcript)
+        return agent.fingerprint(transcript, fitted)
+
+    def fingerprints(self, transcript: str, clean_results: Dict[str, Dict[str, Any]], producers: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+        """
+        Fingerprints of the usable sections, keyed like clean_results, from the
+        agent that produced each (the fused agent or the dedicated one).
+        Failed, timed-out, degraded and schema-failing sections get none, so
+        they always count as stale.
+        """
+        computed: Dict[str, Dict[str, str]] = {}
+        result = {}
+        for key, section in clean_results.items():
+            if "error" in section or section.get("degraded") or section.get("schema_errors"):
+                continue
+            agent = producers[key]
+            if agent.name not in computed:
+                computed[agent.name] = self.section_fingerprint(agent, transcript)
+            result[key] = computed[agent.name]
+        return result
+
+    def stale_sections(self, analysis: Dict[str, Any], transcript: str) -> List[str]:
+        """
+        Result keys whose stored fingerprint no longer matches what their
+        producing agent would send now (new version, prompt, model or
+        transcript), or that have no fingerprint at all.
+        """
+        stored = analysis.get("fingerprints") or {}
+        current: Dict[str, Dict[str, str]] = {}
+        stale = []
+        for key, agent in self.agents.items():
+            fingerprint = stored.get(key)
+            if not fingerprint:
+                stale.append(key)
+                continue
+            producer = self.fused_agent if fingerprint.get("agent") == self.fused_agent.name else agent
+            if producer.name not in current:
+                current[producer.name] = self.section_fingerprint(producer, transcript)
+            if fingerprint != current[producer.name]:
+                stale.append(key)
+        return stale
+
+    def _collect(self, run: PipelineRun, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-key results of a pipeline run, with {"error": ...} for failed or
+        skipped stages; sections cut off by the deadline are flagged "timed_out".
+        """
+        clean_results = {}
+        for key in keys:
+            if run.timed_out(key):
+                logger.warning(f"⏰ Agent [{key}] did not finish before the deadline")
+                ANALYSIS_TIMED_OUT.inc(section=key)
+                clean_results[key] = {"error": "Deadline exceeded", "timed_out": True}
+            elif run.ok(key):
+                logger.info(f"✅ Agent [{key}] completed successfully")
+                logger.debug(f"📊 [{key}] Result: {run.results[key]}")
+                clean_results[key] = run.results[key]
+            else:
+                error = run.errors.get(key) or run.timings.get(key, {}).get("waited_on") or "not run"
+                logger.error(f"❌ Agent [{key}] FAILED: {error}")
+                clean_results[key] = {"error": str(error) if key in run.errors else f"Input stage failed: {error}"}
+        return clean_results
+
+    def fanout_pipeline(self, keys: List[str], budget_report: Optional[Dict[str, Any]] = None) -> Pipeline:
+        """
+        fit -> warm -> one stage per agent: the budget fit (or the chunk plan
+        for map-reduce agents), then the prompt-cache warm-up (prefix layout),
+        then the agents, all concurrently. A map-reduce stage runs its chunks
+        concurrently too and reduces them when the last one is in.
+        """
+        def fit(transcript: str) -> Dict[str, Union[str, List[str]]]:
+            fitted = {}
+            for key in keys:
+                planned = self.plan_chunks(key, transcript)
+                if planned:
+                    fitted[key], report = planned
+                else:
+                    fitted[key], report = self.fit_transcript(self.agents[key], transcript)
+                if budget_report is not None:
+                    budget_report[key] = report
+            return fitted
+
+        async def warm(fit: Dict[str, Union[str, List[str]]]) -> None:
+            whole = [key for key in keys if isinstance(fit[key], str)]
+            if settings.PROMPT_LAYOUT == "prefix" and len(whole) > 1:
+                # Write the shared transcript prefix to the prompt cache once, so the
+                # parallel agents read it instead of each paying for it
+                await bedrock_gateway.warm_prefix(
+                    transcript_prefix(fit[whole[0]]),
+                    SHARED_SYSTEM_PROMPT,
+                    agent_names=[self.agents[key].name for key in whole],
+                    toolset=self.toolset
+                )
+
+        async def run_agent(key: str, fitted: Union[str, List[str]]) -> Dict[str, Any]:
+            if isinstance(fitted, list):
+                return await self._map_reduce(key, fitted)
+            return await self.agents[key].run(fitted)
+
+        def agent_stage(key: str) -> Stage:
+            return Stage(
+                key,
+                lambda fit, warm: run_agent(key, fit[key]),
+                ("fit", "warm"),
+                timeout=settings.ANALYSIS_AGENT_DEADLINES.get(key)
+            )
+
+        return Pipeline(
+            "fanout",
+            [Stage("fit", fit, ("transcript",)), Stage("warm", warm, ("fit",))] + [agent_stage(key) for key in keys],
+            inputs=("transcript",)
+        )
+
+    def fused_pipeline(self, fallbacks: List[str], budget_report: Optional[Dict[str, Any]] = None) -> Pipeline:
+        """
+        fused -> one stage per section. Each section stage starts when the fused
+        call returns and either post-processes its section or, if the section is
+        missing or malformed, runs the dedicated agent; fallbacks run concurrently.
+        """
+        async def fused(transcript: str) -> Dict[str, Any]:
+            fitted, report = self.fit_transcript(self.fused_agent, transcript)
+            if budget_report is not None:
+                budget_report["fused"] = report
+            try:
+                return await self.fused_agent.run(fitted)
+            except DeadlineExceeded:
+                # No time left for fallbacks either; the sections time out with it
+                raise
+            except Exception as e:
+                logger.error(f"❌ Fused invocation FAILED: {e}")
+                return {"error": str(e)}
+
+        def section_stage(key: str) -> Stage:
+            agent = self.agents[key]
+
+            async def section(transcript: str, fused: Dict[str, Any]) -> Dict[str, Any]:
+                if self.fused_agent.section_is_valid(key, fused.get(key)):
+                    return agent.postprocess(fused[key])
+                logger.warning(f"⚠️ Fused section {key} incomplete, falling back to {agent.name}")
+                fallbacks.append(key)
+                fitted, report = self.fit_transcript(agent, transcript)
+                if budget_report is not None:
+                    budget_report[key] = report
+                return await agent.run(fitted)
+
+            return Stage(key, section, ("transcript", "fused"), timeout=settings.ANALYSIS_AGENT_DEADLINES.get(key))
+
+        return Pipeline(
+            "fused",
+            [Stage("fused", fused, ("transcript",), timeout=settings.ANALYSIS_AGENT_DEADLINES.get("fused"))]
+            + [section_stage(key) for key in self.agents],
+            inputs=("transcript",)
+        )
+
+    async def _run_agents(
+        self,
+        transcript: str,
+        keys: List[str],
+        budget_report: Optional[Dict[str, Any]] = None,
+        stage_report: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs the dedicated agents for the given result keys concurrently.
+        Token estimates per agent are written into budget_report, and stage
+        timings into stage_report, when given.
+        """
+        logger.info(f"⏳ Awaiting {len(keys)} agent results...")
+        run = await self.fanout_pipeline(keys, budget_report).run(transcript=transcript)
+        if stage_report is not None:
+            stage_report.update(run.summary())
+        return self._collect(run, keys)
+
+    async def _run_fused(
+        self,
+        transcript: str,
+        budget_report: Optional[Dict[str, Any]] = None,
+        stage_report: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        One Bedrock call for all sections. Sections that come back missing or
+        malformed are re-run through their dedicated agent.
+        """
+        fallbacks: List[str] = []
+        run = await self.fused_pipeline(fallbacks, budget_report).run(transcript=transcript)
+        if stage_report is not None:
+            stage_report.update(run.summary())
+        # Keep the canonical key order regardless of which path produced a section
+        return self._collect(run, list(self.agents)), [key for key in self.agents if key in fallbacks]
+
+    def _degrade(self, transcript: str, clean_results: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Replaces failed sections whose model is behind an open circuit breaker
+        with flagged heuristic results. Returns the replaced keys.
+        """
+        degraded = []
+        for key, result in clean_results.items():
+            if "error" in result and bedrock_gateway.circuit_open(self.agents[key].name, "analysis", transcript):
+                clean_results[key] = degraded_section(key, transcript)
+                degraded.append(key)
+        if degraded:
+            logger.warning(f"🩹 Bedrock circuit open, degraded sections: {degraded}")
+        return degraded
+
+    async def analyze_call(
+        self,
+        call_id: str,
+        transcript: str,
+        mode: Optional[str] = None,
+        allow_degraded: Optional[bool] = None,
+        priority: Optional[str] = None,
+        deadline_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Executes the full agent pipeline on a call transcript.
+        mode: "fanout" (one call per agent) or "fused" (single call with per-agent
+        fallback). Defaults to settings.ANALYSIS_MODE.
+        allow_degraded: fill sections that failed because Bedrock's breaker is open
+        with heuristic results flagged "degraded". Defaults to settings.ANALYSIS_DEGRADED_MODE.
+        priority: gateway scheduling class for every agent call ("live", "post_call",
+        "backfill"); defaults to LLM_TASK_PRIORITIES["analysis"].
+        deadline_seconds: end-to-end bound for every agent and gateway call;
+        defaults to settings.ANALYSIS_DEADLINE_SECONDS. Agents still running
+        then are cancelled and their sections come back flagged "timed_out"
+        (listed in pipeline.timed_out_sections) while the rest is kept.
         Comprehensive logging for debugging.
         """
+        mode = (mode or settings.ANALYSIS_MODE).lower()
+        if allow_degraded is None:
+            allow_degraded = settings.ANALYSIS_DEGRADED_MODE
+        if deadline_seconds is None:
+            deadline_seconds = settings.ANALYSIS_DEADLINE_SECONDS
+        
         logger.info("=" * 70)
         logger.info(f"🎬 STARTING ANALYSIS PIPELINE")
         logger.info(f"📞 Call ID: {call_id}")
+        logger.info(f"🧭 Mode: {mode}")
+        logger.info(f"⏰ Deadline: {f'{deadline_seconds:.0f}s' if deadline_seconds else 'none'}")
         logger.info(f"📝 Transcript length: {len(transcript)} chars")
         logger.info(f"📝 Transcript preview: {transcript[:200]}...")
         logger.info("=" * 70)
         
-        # Define tasks for parallel execution
-        logger.info("🚀 Launching all agents in parallel...")
+        if mode == "fused" and self.is_long(transcript):
+            # One fused call would read the whole long call end to end; chunked agents scale with chunk size
+            logger.info("🧩 Long transcript, using fan-out with map-reduce instead of fused")
+            mode = "fanout"
         
-        tasks = {
-            "sentiment": self.sentiment_agent.run(transcript),
-            "sop_compliance": self.sop_agent.run(transcript),
-            "risk_analysis": self.risk_agent.run(transcript),
-            "qa_score": self.qa_agent.run(transcript),
-            "coaching": self.coaching_agent.run(transcript)
+        started = time.perf_counter()
+        budget_report: Dict[str, Any] = {}
+        stage_report: Dict[str, Any] = {}
+        with priority_scope(priority), deadline_scope(deadline_seconds):
+            if mode == "fused":
+                logger.info("🧩 Running fused single-call analysis...")
+                clean_results, fallbacks = await self._run_fused(transcript, budget_report, stage_report)
+                llm_calls = 1 + len(fallbacks)
+            else:
+                logger.info("🚀 Launching all agents in parallel...")
+                clean_results = await self._run_agents(transcript, list(self.agents), budget_report, stage_report)
+                fallbacks = []
+                llm_calls = self.llm_calls(list(self.agents), budget_report)
+        degraded = self._degrade(transcript, clean_results) if allow_degraded else []
+        producers = {
+            key: self.fused_agent if mode == "fused" and key not in fallbacks else agent
+            for key, agent in self.agents.items()
         }
+        timed_out = [key for key, result in clean_results.items() if result.get("timed_out")]
+        if timed_out:
+            logger.warning(f"⏰ Deadline reached, finalizing without: {timed_out}")
+        duration_ms = round((time.perf_counter() - started) * 1000)
+
+        final_analysis = self.build_analysis(
+            call_id,
+            transcript,
+            clean_results,
+            # How the results were produced, for comparing fused vs fan-out
+            pipeline={
+                "mode": mode,
+                "llm_calls": llm_calls,
+                "fallback_agents": fallbacks,
+                "degraded_sections": degraded,
+                "timed_out_sections": timed_out,
+                "duration_ms": duration_ms,
+                "stages": stage_report.get("stages", {}),
+                "critical_path": stage_report.get("critical_path", [])
+            },
+            token_budget=budget_report,
+            fingerprints=self.fingerprints(transcript, clean_results, producers)
+        )
         
-        # Run all agents concurrently
-        logger.info(f"⏳ Awaiting {len(tasks)} agent results...")
-        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        logger.info("=" * 70)
+        logger.info(f"✅ ANALYSIS COMPLETE FOR {call_id} ({mode}, {llm_calls} LLM calls, {duration_ms} ms)")
+        logger.info("=" * 70)
         
-        # Map results back to keys
-        clean_results = {}
-        for key, result in zip(tasks.keys(), results):
-            if isinstance(result, Exception):
-                logger.error(f"❌ Agent [{key}] FAILED: {result}")
-                clean_results[key] = {"error": str(result)}
-            else:
-                logger.info(f"✅ Agent [{key}] completed successfully")
-                logger.debug(f"📊 [{key}] Result: {result}")
-                clean_results[key] = result
+        return final_analysis
+
+    async def refresh_analysis(
+        self,
+        call_id: str,
+        transcript: str,
+        previous: Dict[str, Any],
+        keys: Optional[List[str]] = None,
+        priority: Optional[str] = None,
+        deadline_seconds: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Re-runs only the given sections (default: the stale ones, see
+        stale_sections) through their dedicated agents and merges them into
+        the previous analysis; every other section, its fingerprint and token
+        estimate are kept as stored. Returns the new analysis and the keys re-run.
+        """
+        keys = self.stale_sections(previous, transcript) if keys is None else keys
+        if not keys:
+            logger.info(f"✅ {call_id}: every section is current, nothing to refresh")
+            return previous, []
+        
+        logger.info(f"♻️ Refreshing {call_id}: {keys}")
+        if deadline_seconds is None:
+            deadline_seconds = settings.ANALYSIS_DEADLINE_SECONDS
+        started = time.perf_counter()
+        budget_report: Dict[str, Any] = dict(previous.get("token_budget") or {})
+        stage_report: Dict[str, Any] = {}
+        with priority_scope(priority), deadline_scope(deadline_seconds):
+            fresh = await self._run_agents(transcript, keys, budget_report, stage_report)
+        
+        # Sections not re-run keep their previous value
+        clean_results = {key: previous.get(key) or {} for key in self.agents}
+        clean_results.update(fresh)
+        fingerprints = {key: value for key, value in (previous.get("fingerprints") or {}).items() if key not in fresh}
+        fingerprints.update(self.fingerprints(transcript, fresh, self.agents))
+        
+        analysis = self.build_analysis(
+            call_id,
+            transcript,
+            clean_results,
+            pipeline={
+                "mode": "refresh",
+                "llm_calls": self.llm_calls(keys, budget_report),
+                "refreshed_sections": keys,
+                "fallback_agents": [],
+                "timed_out_sections": [key for key, result in fresh.items() if result.get("timed_out")],
+                "duration_ms": round((time.perf_counter() - started) * 1000),
+                "stages": stage_report.get("stages", {}),
+                "critical_path": stage_report.get("critical_path", []),
+                "previous_mode": (previous.get("pipeline") or {}).get("mode")
+            },
+            token_budget=budget_report,
+            fingerprints=fingerprints
+        )
+        return analysis, keys
 
+    def build_analysis(
+        self,
+        call_id: str,
+        transcript: str,
+        clean_results: Dict[str, Dict[str, Any]],
+        pipeline: Dict[str, Any],
+        token_budget: Optional[Dict[str, Any]] = None,
+        fingerprints: Optional[Dict[str, Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Assembles the analysis document (sections + summary metrics) from per-agent results.
+        fingerprints (result key -> see BaseAgent.fingerprint) record what each section
+        was produced from, so stale ones can be recomputed alone later.
+        """
         # Log individual agent results
         logger.info("-" * 50)
         logger.info("📊 AGENT RESULTS SUMMARY:")
@@ -136,13 +574,13 @@ class OrchestratorAgent:
                 "sop_score": sop_score,
                 "qa_score": qa_score,
                 "risk_severity": risk_severity if risk_detected else "none"
-            }
+            },
+            "pipeline": pipeline,
+            # Estimated prompt tokens per agent and any budget policy applied
+            "token_budget": token_budget or {},
+            "fingerprints": fingerprints or {}
         }
         
-        logger.info("=" * 70)
-        logger.info(f"✅ ANALYSIS COMPLETE FOR {call_id}")
-        logger.info("=" * 70)
-        
         return final_analysis
 
 orchestrator = OrchestratorAgent()
@@ -0,0 +1,119 @@
+from typing import Any, Dict
+
+# Output schemas of the specialized agents (JSON Schema subset, see app.core.llm.schema.validate).
+# They are sent as the tool input schema for structured output and used to validate answers.
+
+PHASE_LABELS = ["Happy", "Satisfied", "Neutral", "Frustrated", "Angry"]
+
+SENTIMENT: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": -100, "maximum": 100},
+        "trajectory": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "phase": {"type": "string", "enum": ["Opening", "Middle", "Closing"]},
+                    "score": {"type": "integer", "minimum": -100, "maximum": 100},
+                    "label": {"type": "string", "enum": PHASE_LABELS},
+                },
+                "required": ["phase", "score", "label"],
+            },
+        },
+        "label": {"type": "string", "enum": ["Positive", "Neutral", "Negative"]},
+        "escalation_detected": {"type": "boolean"},
+    },
+    "required": ["score", "trajectory", "label", "escalation_detected"],
+}
+
+SOP_COMPLIANCE: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "adherence_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "compliant": {"type": "boolean"},
+        "missed_steps": {"type": "array", "items": {"type": "string"}},
+        "checklist": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "step": {"type": "string"},
+                    "status": {"type": "string", "enum": ["pass", "fail"]},
+                    "evidence": {"type": "string"},
+                },
+                "required": ["step", "status"],
+            },
+        },
+    },
+    "required": ["adherence_score", "compliant", "missed_steps", "checklist"],
+}
+
+RISK_ANALYSIS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "risk_detected": {"type": "boolean"},
+        "severity": {"type": "string", "enum": ["none", "low", "medium", "high", "critical"]},
+        "flags": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string", "enum": ["Churn", "Legal", "Compliance"]},
+                    "confidence": {"type": "string", "enum": ["low", "medium", "high"]},
+                    "quote": {"type": "string"},
+                },
+                "required": ["category", "confidence", "quote"],
+            },
+        },
+        "summary": {"type": "string"},
+    },
+    "required": ["risk_detected", "severity", "flags", "summary"],
+}
+
+QA_SCORE: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "total_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "breakdown": {
+            "type": "object",
+            "properties": {
+                "greeting": {"type": "integer", "minimum": 0, "maximum": 10},
+                "empathy": {"type": "integer", "minimum": 0, "maximum": 20},
+                "solution": {"type": "integer", "minimum": 0, "maximum": 40},
+                "efficiency": {"type": "integer", "minimum": 0, "maximum": 10},
+                "compliance": {"type": "integer", "minimum": 0, "maximum": 20},
+            },
+            "required": ["greeting", "empathy", "solution", "efficiency", "compliance"],
+        },
+        "critical_fail": {"type": "boolean"},
+        "comments": {"type": "string"},
+    },
+    "required": ["total_score", "breakdown", "critical_fail", "comments"],
+}
+
+COACHING: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "weaknesses": {"type": "array", "items": {"type": "string"}},
+        "actionable_feedback": {"type": "string"},
+        "recommended_training": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["strengths", "weaknesses", "actionable_feedback", "recommended_training"],
+}
+
+# Result key -> schema, mirroring OrchestratorAgent.agents
+SECTION_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "sentiment": SENTIMENT,
+    "sop_compliance": SOP_COMPLIANCE,
+    "risk_analysis": RISK_ANALYSIS,
+    "qa_score": QA_SCORE,
+    "coaching": COACHING,
+}
+
+FUSED: Dict[str, Any] = {
+    "type": "object",
+    "properties": dict(SECTION_SCHEMAS),
+    "required": list(SECTION_SCHEMAS),
+}
@@ -1,10 +1,15 @@
+from app.agents import schemas
 from app.agents.base import BaseAgent
+from app.models.analysis_results import CoachingResult
 from typing import Dict, Any, List
 import logging
 
 logger = logging.getLogger("COACHING_AGENT")
 
 class CoachingAgent(BaseAgent):
+    output_schema = schemas.COACHING
+    result_model = CoachingResult
+
     def __init__(self):
         super().__init__(
             name="CoachingAgent",
@@ -12,10 +17,8 @@ class CoachingAgent(BaseAgent):
         )
         logger.info("🎓 Coaching Agent initialized")
 
-    async def run(self, transcript: str) -> Dict[str, Any]:
-        logger.info(f"🎓 [COACHING] Generating feedback for call ({len(transcript)} chars)")
-        
-        prompt = f"""
+    def build_prompt(self, transcript: str) -> str:
+        return f"""
 Provide coaching feedback for the customer service agent based on this call transcript.
 
 TRANSCRIPT:
@@ -46,6 +49,11 @@ You MUST respond with ONLY this JSON format, no other text:
     "recommended_training": ["<Training Topic 1>", "<Training Topic 2>"]
 }}
 """
-        result = await self._invoke_llm(prompt)
+
+    async def run(self, transcript: str) -> Dict[str, Any]:
+        logger.info(f"🎓 [COACHING] Generating feedback for call ({len(transcript)} chars)")
+        
+        result = await self._analyze(transcript)
+        result = self.postprocess(result)
         logger.info(f"🎓 [COACHING] Complete - {len(result.get('strengths', []))} strengths, {len(result.get('weaknesses', []))} areas to improve")
         return result
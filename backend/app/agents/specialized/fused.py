@@ -0,0 +1,114 @@
+from app.agents import schemas
+from app.agents.base import BaseAgent
+from app.models.analysis_results import FusedResult
+from app.agents.specialized.sop import SOPComplianceAgent
+from typing import Dict, Any, List
+import logging
+
+logger = logging.getLogger("FUSED_AGENT")
+
+# Keys every fused section must carry before it is trusted over a dedicated agent call.
+SECTION_REQUIRED_KEYS: Dict[str, List[str]] = {
+    "sentiment": ["score", "label"],
+    "sop_compliance": ["adherence_score", "checklist"],
+    "risk_analysis": ["risk_detected", "severity"],
+    "qa_score": ["total_score", "breakdown"],
+    "coaching": ["strengths", "weaknesses", "actionable_feedback"],
+}
+
+
+class FusedAnalysisAgent(BaseAgent):
+    """
+    Single-invocation analysis: one Bedrock call returns the sentiment, SOP,
+    risk, QA and coaching sections together, so the transcript is sent once.
+    """
+
+    output_schema = schemas.FUSED
+    result_model = FusedResult
+
+    def __init__(self):
+        super().__init__(
+            name="FusedAnalysisAgent",
+            role="You are a senior Customer Service QA Analyst. You evaluate a call for sentiment, SOP compliance, risk, quality and coaching in one pass."
+        )
+        logger.info("🧩 Fused Analysis Agent initialized")
+
+    def build_prompt(self, transcript: str, sop_steps: List[str] = None) -> str:
+        steps = sop_steps or SOPComplianceAgent.DEFAULT_STEPS
+        steps_str = "\n".join([f"- {s}" for s in steps])
+
+        return f"""
+[TASK: FULL CALL ANALYSIS - Return ALL five sections in ONE JSON object]
+
+TRANSCRIPT TO ANALYZE:
+---
+{transcript}
+---
+
+SECTION "sentiment": Customer emotion from -100 (very angry) to +100 (very happy), 0 is neutral.
+Score the whole call and the Opening, Middle and Closing phases. Flag escalation (cancel threats, lawyers, extreme anger).
+
+SECTION "sop_compliance": Check each required SOP step (pass/fail) with evidence from the transcript.
+REQUIRED SOP STEPS:
+{steps_str}
+
+SECTION "risk_analysis": Look for CHURN ("cancel", "switch provider"), LEGAL ("lawyer", "sue") and COMPLIANCE (profanity, threats, data breach) risks.
+
+SECTION "qa_score": Greeting & Closing (0-10), Empathy & Tone (0-20), Solution Accuracy (0-40), Efficiency (0-10), Compliance (0-20). total_score is their sum.
+
+SECTION "coaching": Top 3 strengths, top 3 areas for improvement, one actionable tip and recommended training topics.
+
+RESPOND WITH THIS EXACT JSON STRUCTURE (no other text):
+{{
+    "sentiment": {{
+        "score": <INTEGER -100 to +100>,
+        "trajectory": [
+            {{ "phase": "Opening", "score": <INTEGER>, "label": "<Happy|Satisfied|Neutral|Frustrated|Angry>" }},
+            {{ "phase": "Middle", "score": <INTEGER>, "label": "<Happy|Satisfied|Neutral|Frustrated|Angry>" }},
+            {{ "phase": "Closing", "score": <INTEGER>, "label": "<Happy|Satisfied|Neutral|Frustrated|Angry>" }}
+        ],
+        "label": "<Positive|Neutral|Negative>",
+        "escalation_detected": <BOOLEAN>
+    }},
+    "sop_compliance": {{
+        "adherence_score": <INTEGER 0-100>,
+        "compliant": <BOOLEAN, true if adherence_score >= 80>,
+        "missed_steps": ["<step name>"],
+        "checklist": [ {{ "step": "<step name>", "status": "<pass|fail>", "evidence": "<quote>" }} ]
+    }},
+    "risk_analysis": {{
+        "risk_detected": <BOOLEAN>,
+        "severity": "<none|low|medium|high|critical>",
+        "flags": [ {{ "category": "<Churn|Legal|Compliance>", "confidence": "<low|medium|high>", "quote": "<exact words>" }} ],
+        "summary": "<ONE SENTENCE>"
+    }},
+    "qa_score": {{
+        "total_score": <INTEGER 0-100>,
+        "breakdown": {{ "greeting": <0-10>, "empathy": <0-20>, "solution": <0-40>, "efficiency": <0-10>, "compliance": <0-20> }},
+        "critical_fail": <BOOLEAN>,
+        "comments": "<ONE SENTENCE>"
+    }},
+    "coaching": {{
+        "strengths": ["<strength>", "<strength>", "<strength>"],
+        "weaknesses": ["<improvement>", "<improvement>", "<improvement>"],
+        "actionable_feedback": "<1-2 sentences>",
+        "recommended_training": ["<topic>", "<topic>"]
+    }}
+}}
+"""
+
+    @staticmethod
+    def section_is_valid(key: str, section: Any) -> bool:
+        """A section is usable only if it is an object carrying all of its required keys."""
+        if not isinstance(section, dict) or "error" in section:
+            return False
+        return all(field in section for field in SECTION_REQUIRED_KEYS.get(key, []))
+
+    async def run(self, transcript: str, sop_steps: List[str] = None) -> Dict[str, Any]:
+        logger.info(f"🧩 [FUSED] Analyzing transcript in a single call ({len(transcript)} chars)")
+
+        result = await self._analyze(transcript, sop_steps=sop_steps)
+
+        valid = [key for key in SECTION_REQUIRED_KEYS if self.section_is_valid(key, result.get(key))]
+        logger.info(f"🧩 [FUSED] Complete - {len(valid)}/{len(SECTION_REQUIRED_KEYS)} sections valid")
+        return result
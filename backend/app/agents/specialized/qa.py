@@ -1,10 +1,15 @@
+from app.agents import schemas
 from app.agents.base import BaseAgent
+from app.models.analysis_results import QAResult
 from typing import Dict, Any
 import logging
 
 logger = logging.getLogger("QA_AGENT")
 
 class QAScoringAgent(BaseAgent):
+    output_schema = schemas.QA_SCORE
+    result_model = QAResult
+
     def __init__(self):
         super().__init__(
             name="QAScoringAgent",
@@ -12,10 +17,8 @@ class QAScoringAgent(BaseAgent):
         )
         logger.info("📊 QA Scoring Agent initialized")
 
-    async def run(self, transcript: str) -> Dict[str, Any]:
-        logger.info(f"📊 [QA] Evaluating call quality ({len(transcript)} chars)")
-        
-        prompt = f"""
+    def build_prompt(self, transcript: str) -> str:
+        return f"""
 [TASK: QA SCORING - Return numerical scores ONLY]
 
 You are evaluating a CUSTOMER SERVICE CALL for Quality Assurance.
@@ -48,8 +51,8 @@ RESPOND WITH THIS EXACT JSON STRUCTURE (no other text):
     "comments": "<ONE SENTENCE summary>"
 }}}}
 """
-        result = await self._invoke_llm(prompt)
-        
+
+    def postprocess(self, result: Dict[str, Any]) -> Dict[str, Any]:
         # Ensure total_score exists
         if 'total_score' not in result and 'breakdown' in result:
             breakdown = result.get('breakdown', {})
@@ -63,6 +66,13 @@ RESPOND WITH THIS EXACT JSON STRUCTURE (no other text):
         elif 'total_score' not in result:
             # Fallback: try to extract from adherence_score if model confused
             result['total_score'] = result.get('adherence_score', 50)
+        return result
+
+    async def run(self, transcript: str) -> Dict[str, Any]:
+        logger.info(f"📊 [QA] Evaluating call quality ({len(transcript)} chars)")
+        
+        result = await self._analyze(transcript)
+        result = self.postprocess(result)
         
         logger.info(f"📊 [QA] Complete - Total Score: {result.get('total_score', 'N/A')}, Critical Fail: {result.get('critical_fail', 'N/A')}")
         return result
@@ -1,10 +1,15 @@
+from app.agents import schemas
 from app.agents.base import BaseAgent
+from app.models.analysis_results import RiskResult
 from typing import Dict, Any
 import logging
 
 logger = logging.getLogger("RISK_AGENT")
 
 class RiskDetectionAgent(BaseAgent):
+    output_schema = schemas.RISK_ANALYSIS
+    result_model = RiskResult
+
     def __init__(self):
         super().__init__(
             name="RiskDetectionAgent",
@@ -12,10 +17,8 @@ class RiskDetectionAgent(BaseAgent):
         )
         logger.info("⚠️ Risk Detection Agent initialized")
 
-    async def run(self, transcript: str) -> Dict[str, Any]:
-        logger.info(f"⚠️ [RISK] Scanning transcript for risk indicators ({len(transcript)} chars)")
-        
-        prompt = f"""
+    def build_prompt(self, transcript: str) -> str:
+        return f"""
 [TASK: RISK DETECTION - Identify threats and dangers ONLY]
 
 You are a RISK ANALYST scanning for dangerous situations in customer calls.
@@ -50,8 +53,8 @@ RESPOND WITH THIS EXACT JSON STRUCTURE (no other text):
 
 IF NO RISKS FOUND, return: {{"risk_detected": false, "severity": "none", "flags": [], "summary": "No risks detected"}}
 """
-        result = await self._invoke_llm(prompt)
-        
+
+    def postprocess(self, result: Dict[str, Any]) -> Dict[str, Any]:
         # Ensure required fields exist with defaults
         if 'risk_detected' not in result:
             result['risk_detected'] = False
@@ -61,6 +64,13 @@ IF NO RISKS FOUND, return: {{"risk_detected": false, "severity": "none", "flags"
             result['flags'] = []
         if 'summary' not in result:
             result['summary'] = 'No risks detected' if not result.get('risk_detected') else 'Risk analysis complete'
+        return result
+
+    async def run(self, transcript: str) -> Dict[str, Any]:
+        logger.info(f"⚠️ [RISK] Scanning transcript for risk indicators ({len(transcript)} chars)")
+        
+        result = await self._analyze(transcript)
+        result = self.postprocess(result)
         
         logger.info(f"⚠️ [RISK] Complete - Detected: {result.get('risk_detected', 'N/A')}, Severity: {result.get('severity', 'N/A')}")
         return result
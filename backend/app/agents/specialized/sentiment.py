@@ -1,10 +1,15 @@
+from app.agents import schemas
 from app.agents.base import BaseAgent
+from app.models.analysis_results import SentimentResult
 from typing import Dict, Any
 import logging
 
 logger = logging.getLogger("SENTIMENT_AGENT")
 
 class SentimentAgent(BaseAgent):
+    output_schema = schemas.SENTIMENT
+    result_model = SentimentResult
+
     def __init__(self):
         super().__init__(
             name="SentimentTrajectoryAgent",
@@ -12,10 +17,8 @@ class SentimentAgent(BaseAgent):
         )
         logger.info("🎭 Sentiment Agent initialized")
 
-    async def run(self, transcript: str) -> Dict[str, Any]:
-        logger.info(f"🎭 [SENTIMENT] Analyzing transcript ({len(transcript)} chars)")
-        
-        prompt = f"""
+    def build_prompt(self, transcript: str) -> str:
+        return f"""
 [TASK: SENTIMENT ANALYSIS - Return emotion scores ONLY]
 
 You are analyzing CUSTOMER EMOTIONS in a service call.
@@ -47,8 +50,8 @@ RESPOND WITH THIS EXACT JSON STRUCTURE (no other text):
 EXAMPLE for angry customer: {{"score": -60, "trajectory": [...], "label": "Negative", "escalation_detected": true}}
 EXAMPLE for happy customer: {{"score": 75, "trajectory": [...], "label": "Positive", "escalation_detected": false}}
 """
-        result = await self._invoke_llm(prompt)
-        
+
+    def postprocess(self, result: Dict[str, Any]) -> Dict[str, Any]:
         # Ensure required fields exist
         if 'score' not in result:
             result['score'] = 0
@@ -63,6 +66,13 @@ EXAMPLE for happy customer: {{"score": 75, "trajectory": [...], "label": "Positi
             ]
         if 'escalation_detected' not in result:
             result['escalation_detected'] = result.get('score', 0) < -50
+        return result
+
+    async def run(self, transcript: str) -> Dict[str, Any]:
+        logger.info(f"🎭 [SENTIMENT] Analyzing transcript ({len(transcript)} chars)")
+        
+        result = await self._analyze(transcript)
+        result = self.postprocess(result)
         
         logger.info(f"🎭 [SENTIMENT] Complete - Score: {result.get('score', 'N/A')}, Label: {result.get('label', 'N/A')}")
         return result
@@ -1,10 +1,15 @@
+from app.agents import schemas
 from app.agents.base import BaseAgent
+from app.models.analysis_results import SOPResult
 from typing import Dict, Any, List
 import logging
 
 logger = logging.getLogger("SOP_AGENT")
 
 class SOPComplianceAgent(BaseAgent):
+    output_schema = schemas.SOP_COMPLIANCE
+    result_model = SOPResult
+
     def __init__(self):
         super().__init__(
             name="SOPComplianceAgent",
@@ -12,20 +17,19 @@ class SOPComplianceAgent(BaseAgent):
         )
         logger.info("📋 SOP Compliance Agent initialized")
 
-    async def run(self, transcript: str, sop_steps: List[str] = None) -> Dict[str, Any]:
-        default_steps = [
-            "Professional Greeting",
-            "Customer Verification", 
-            "Empathetic Response",
-            "Solution Provided",
-            "Proper Closing"
-        ]
-        steps = sop_steps or default_steps
+    DEFAULT_STEPS = [
+        "Professional Greeting",
+        "Customer Verification", 
+        "Empathetic Response",
+        "Solution Provided",
+        "Proper Closing"
+    ]
+
+    def build_prompt(self, transcript: str, sop_steps: List[str] = None) -> str:
+        steps = sop_steps or self.DEFAULT_STEPS
         steps_str = "\n".join([f"- {s}" for s in steps])
         
-        logger.info(f"📋 [SOP] Checking compliance against {len(steps)} steps")
-        
-        prompt = f"""
+        return f"""
 Verify if the customer service agent followed these SOP steps in the transcript.
 
 REQUIRED SOP STEPS:
@@ -48,6 +52,11 @@ You MUST respond with ONLY this JSON format, no other text:
     ]
 }}
 """
-        result = await self._invoke_llm(prompt)
+
+    async def run(self, transcript: str, sop_steps: List[str] = None) -> Dict[str, Any]:
+        logger.info(f"📋 [SOP] Checking compliance against {len(sop_steps or self.DEFAULT_STEPS)} steps")
+        
+        result = await self._analyze(transcript, sop_steps=sop_steps)
+        result = self.postprocess(result)
         logger.info(f"📋 [SOP] Complete - Adherence: {result.get('adherence_score', 'N/A')}%, Compliant: {result.get('compliant', 'N/A')}")
         return result
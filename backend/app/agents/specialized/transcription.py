@@ -6,6 +6,10 @@ import asyncio
 import boto3
 import uuid
 import json
+import time
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, remaining
+from app.core.retry import boto_client_config, policy_from_settings
 
 logger = logging.getLogger("TRANSCRIPTION_AGENT")
 
@@ -22,8 +26,8 @@ def _get_aws_clients():
             # Use default credentials (IAM role on EC2/ECS, or ~/.aws/credentials locally)
             region = os.getenv("AWS_REGION", "us-east-1")
             
-            _transcribe_client = boto3.client('transcribe', region_name=region)
-            _s3_client = boto3.client('s3', region_name=region)
+            _transcribe_client = boto3.client('transcribe', region_name=region, config=boto_client_config())
+            _s3_client = boto3.client('s3', region_name=region, config=boto_client_config())
             
             logger.info(f"✅ [TRANSCRIPTION] AWS Transcribe client initialized (region: {region})")
         except Exception as e:
@@ -43,6 +47,8 @@ class TranscriptionAgent(BaseAgent):
         # S3 bucket for audio files (required for AWS Transcribe)
         self.s3_bucket = os.getenv("TRANSCRIBE_S3_BUCKET", "cognivista-audio-uploads")
         self.s3_prefix = os.getenv("TRANSCRIBE_S3_PREFIX", "audio-uploads/")
+        self.s3_retry = policy_from_settings("S3")
+        self.transcribe_retry = policy_from_settings("TRANSCRIBE")
         
         logger.info("🎤 Transcription Agent initialized (AWS Transcribe)")
         logger.info(f"   📦 S3 Bucket: {self.s3_bucket}")
@@ -79,10 +85,10 @@ class TranscriptionAgent(BaseAgent):
             logger.info(f"📤 [TRANSCRIPTION] Uploading to S3: s3://{self.s3_bucket}/{s3_key}")
             
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
+            await self.s3_retry.run(lambda: loop.run_in_executor(
                 None,
                 lambda: s3_client.upload_file(audio_path, self.s3_bucket, s3_key)
-            )
+            ))
             
             s3_uri = f"s3://{self.s3_bucket}/{s3_key}"
             logger.info(f"✅ [TRANSCRIPTION] Uploaded to {s3_uri}")
@@ -93,7 +99,7 @@ class TranscriptionAgent(BaseAgent):
             # Start transcription job
             logger.info(f"🚀 [TRANSCRIPTION] Starting job: {job_name}")
             
-            await loop.run_in_executor(
+            await self.transcribe_retry.run(lambda: loop.run_in_executor(
                 None,
                 lambda: transcribe_client.start_transcription_job(
                     TranscriptionJobName=job_name,
@@ -108,7 +114,7 @@ class TranscriptionAgent(BaseAgent):
                     IdentifyMultipleLanguages=True,
                     LanguageOptions=['hi-IN', 'en-US', 'en-IN'],
                 )
-            )
+            ))
             
             # Poll for completion
             logger.info("⏳ [TRANSCRIPTION] Waiting for job completion...")
@@ -116,10 +122,10 @@ class TranscriptionAgent(BaseAgent):
             
             # Clean up S3 file
             try:
-                await loop.run_in_executor(
+                await self.s3_retry.run(lambda: loop.run_in_executor(
                     None,
                     lambda: s3_client.delete_object(Bucket=self.s3_bucket, Key=s3_key)
-                )
+                ))
                 logger.info(f"🗑️ [TRANSCRIPTION] Cleaned up S3 file")
             except Exception as cleanup_err:
                 logger.warning(f"⚠️ [TRANSCRIPTION] Failed to clean up S3: {cleanup_err}")
@@ -145,15 +151,23 @@ class TranscriptionAgent(BaseAgent):
         return format_map.get(ext, 'mp3')
 
     async def _wait_for_job(self, client, job_name: str, loop) -> Dict[str, Any]:
-        """Poll AWS Transcribe until job completes"""
-        max_attempts = 120  # 10 minutes max (5s intervals)
+        """
+        Poll AWS Transcribe until job completes, for at most
+        TRANSCRIBE_MAX_WAIT_SECONDS or until the enclosing deadline.
+        """
+        max_wait = settings.TRANSCRIBE_MAX_WAIT_SECONDS
+        left = remaining()
+        bounded_by_deadline = left is not None and left < max_wait
+        if bounded_by_deadline:
+            max_wait = max(left, 0)
+        give_up_at = time.monotonic() + max_wait
         attempt = 0
         
-        while attempt < max_attempts:
-            response = await loop.run_in_executor(
+        while True:
+            response = await self.transcribe_retry.run(lambda: loop.run_in_executor(
                 None,
                 lambda: client.get_transcription_job(TranscriptionJobName=job_name)
-            )
+            ))
             
             status = response['TranscriptionJob']['TranscriptionJobStatus']
             
@@ -167,13 +181,18 @@ class TranscriptionAgent(BaseAgent):
                 raise RuntimeError(f"Transcription failed: {reason}")
             
             # Still in progress
-            if attempt % 6 == 0:  # Log every 30 seconds
+            if attempt % 6 == 0:  # Log every ~30 seconds
                 logger.info(f"⏳ [TRANSCRIPTION] Status: {status} (attempt {attempt + 1})")
             
-            await asyncio.sleep(5)
+            if time.monotonic() + settings.TRANSCRIBE_POLL_SECONDS > give_up_at:
+                break
+            await asyncio.sleep(settings.TRANSCRIBE_POLL_SECONDS)
             attempt += 1
         
-        raise RuntimeError("Transcription timed out after 10 minutes")
+        logger.error(f"❌ [TRANSCRIPTION] Job {job_name} still running after {max_wait:.0f}s, giving up")
+        if bounded_by_deadline:
+            raise DeadlineExceeded(f"Transcription not finished before the deadline ({max_wait:.0f}s)")
+        raise RuntimeError(f"Transcription timed out after {max_wait:.0f}s")
 
     async def _parse_result(self, response: dict, loop) -> Dict[str, Any]:
         """Parse AWS Transcribe result"""
@@ -185,10 +204,10 @@ class TranscriptionAgent(BaseAgent):
         # Download transcript JSON
         logger.info(f"📥 [TRANSCRIPTION] Downloading transcript...")
         
-        transcript_data = await loop.run_in_executor(
+        transcript_data = await self.s3_retry.run(lambda: loop.run_in_executor(
             None,
             lambda: json.loads(urllib.request.urlopen(transcript_uri).read().decode('utf-8'))
-        )
+        ))
         
         # Extract full transcript text
         results = transcript_data.get('results', {})
@@ -122,6 +122,21 @@ async def get_analysis(call_id: str):
     logger.info(f"✅ [API] Returning call data - Status: {call.get('status', 'unknown')}")
     return call
 
+@router.post("/{call_id}/refresh")
+async def refresh_analysis(call_id: str, background_tasks: BackgroundTasks, payload: Dict[str, Any] = None):
+    """Recompute a call's stale sections (or the given "sections") and merge them into its analysis"""
+    logger.info(f"📨 [API] POST /{call_id}/refresh")
+    
+    db = await get_database()
+    call = await db["calls"].find_one({"_id": call_id}, {"_id": 1})
+    if not call:
+        logger.warning(f"⚠️ [API] Call not found: {call_id}")
+        raise HTTPException(status_code=404, detail="Call not found")
+    
+    sections = (payload or {}).get("sections")
+    background_tasks.add_task(analysis_service.refresh_call, call_id, sections)
+    return {"status": "queued", "call_id": call_id, "sections": sections or "stale"}
+
 @router.get("/dashboard/stats")
 async def get_dashboard_stats():
     """Get aggregated dashboard statistics"""
@@ -1,6 +1,7 @@
 import os
+import json
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 # Load .env file from backend directory
@@ -24,9 +25,181 @@ class Settings(BaseSettings):
     AWS_BEARER_TOKEN_BEDROCK: Optional[str] = os.getenv("AWS_BEARER_TOKEN_BEDROCK")
     BEDROCK_MODEL_ID: str = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
     
+    # Model-tier routing by agent, task and input size. "standard" is BEDROCK_MODEL_ID.
+    LLM_ROUTING_ENABLED: bool = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+    LLM_MODEL_FAST: str = os.getenv("LLM_MODEL_FAST", "anthropic.claude-3-haiku-20240307-v1:0")
+    LLM_MODEL_LARGE: str = os.getenv("LLM_MODEL_LARGE", os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0"))
+    # Inputs up to SHORT go to the fast tier, from LONG on to the large tier (estimated tokens)
+    LLM_ROUTE_SHORT_TOKENS: int = int(os.getenv("LLM_ROUTE_SHORT_TOKENS", "1500"))
+    LLM_ROUTE_LONG_TOKENS: int = int(os.getenv("LLM_ROUTE_LONG_TOKENS", "6000"))
+    # JSON list of rules replacing the built-in ones, see app/core/llm/router.py
+    LLM_ROUTING_RULES: List[Dict] = json.loads(os.getenv("LLM_ROUTING_RULES", "[]"))
+    # JSON map of model id fragment -> [input, output] USD per 1K tokens, for route cost stats
+    LLM_MODEL_PRICES: Dict[str, List[float]] = json.loads(os.getenv("LLM_MODEL_PRICES", "{}"))
+    
+    # "bedrock" (real service) or "standin" (in-process fake, see app/core/llm/standin.py)
+    LLM_TRANSPORT: str = os.getenv("LLM_TRANSPORT", "bedrock")
+    # Override the bedrock-runtime endpoint, e.g. http://localhost:8765 for scripts/bedrock_standin_server.py
+    LLM_ENDPOINT_URL: Optional[str] = os.getenv("LLM_ENDPOINT_URL") or None
+    
+    # Stand-in latency/fault model (in-process transport and the stand-in server)
+    STANDIN_LATENCY_MEDIAN_MS: float = float(os.getenv("STANDIN_LATENCY_MEDIAN_MS", "1500"))
+    STANDIN_LATENCY_P99_MS: float = float(os.getenv("STANDIN_LATENCY_P99_MS", "6000"))
+    STANDIN_THROTTLE_RATE: float = float(os.getenv("STANDIN_THROTTLE_RATE", "0"))
+    STANDIN_BURST_RATE: float = float(os.getenv("STANDIN_BURST_RATE", "0"))
+    STANDIN_BURST_LENGTH: int = int(os.getenv("STANDIN_BURST_LENGTH", "5"))
+    STANDIN_SLOW_STREAM_RATE: float = float(os.getenv("STANDIN_SLOW_STREAM_RATE", "0"))
+    STANDIN_SLOW_STREAM_DELAY_MS: float = float(os.getenv("STANDIN_SLOW_STREAM_DELAY_MS", "500"))
+    STANDIN_SEED: Optional[int] = int(os.getenv("STANDIN_SEED")) if os.getenv("STANDIN_SEED") else None
+    
+    # Dedicated Bedrock transport: worker threads == pooled keep-alive connections
+    LLM_POOL_SIZE: int = int(os.getenv("LLM_POOL_SIZE", "64"))
+    LLM_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    LLM_READ_TIMEOUT_SECONDS: float = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "120"))
+    
+    # LLM response cache (memory LRU + optional disk tier; empty dir disables disk).
+    # The disk tier defaults to the user cache directory, outside the working tree.
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MEMORY_MAX_ENTRIES", "512"))
+    LLM_CACHE_MEMORY_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_MEMORY_TTL_SECONDS", "3600"))
+    LLM_CACHE_DISK_DIR: str = os.getenv(
+        "LLM_CACHE_DISK_DIR",
+        os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "cognivista_qa", "llm")
+    )
+    LLM_CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+    LLM_CACHE_DISK_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    # Identical concurrent LLM requests share one in-flight Bedrock call
+    LLM_SINGLEFLIGHT_ENABLED: bool = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+    
+    # Adaptive (AIMD) concurrency window for Bedrock calls, per model id
+    LLM_LIMIT_INITIAL: int = int(os.getenv("LLM_LIMIT_INITIAL", "8"))
+    LLM_LIMIT_MIN: int = int(os.getenv("LLM_LIMIT_MIN", "1"))
+    LLM_LIMIT_MAX: int = int(os.getenv("LLM_LIMIT_MAX", "64"))
+    LLM_LIMIT_LATENCY_TARGET_SECONDS: float = float(os.getenv("LLM_LIMIT_LATENCY_TARGET_SECONDS", "30"))
+    # JSON map of model id -> max window, e.g. {"anthropic.claude-3-sonnet-20240229-v1:0": 32}
+    LLM_LIMIT_MODEL_MAX: Dict[str, int] = json.loads(os.getenv("LLM_LIMIT_MODEL_MAX", "{}"))
+    # Priority classes (live, post_call, backfill) share each model's window by weight;
+    # reserved slots stay free for their class while it is idle.
+    LLM_PRIORITY_WEIGHTS: Dict[str, float] = json.loads(os.getenv("LLM_PRIORITY_WEIGHTS", '{"live": 100, "post_call": 10, "backfill": 1}'))
+    LLM_PRIORITY_RESERVED: Dict[str, int] = json.loads(os.getenv("LLM_PRIORITY_RESERVED", '{"live": 2}'))
+    # Class per gateway task when the caller sets none; anything else runs as post_call
+    LLM_TASK_PRIORITIES: Dict[str, str] = json.loads(os.getenv("LLM_TASK_PRIORITIES", '{"nudge": "live", "analysis": "post_call"}'))
+    
+    # Endpoint pool: JSON list of {"region", "model_id", "tier", "weight", "max_concurrency"}.
+    # Requests for a tier with endpoints are spread over them; empty keeps one region + model per tier.
+    LLM_ENDPOINTS: List[Dict] = json.loads(os.getenv("LLM_ENDPOINTS", "[]"))
+    
+    # Circuit breaker per model id: opens on error rate or slow-call rate over a sliding window
+    LLM_BREAKER_ENABLED: bool = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+    LLM_BREAKER_WINDOW_SECONDS: float = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+    LLM_BREAKER_ERROR_RATE: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "60"))
+    LLM_BREAKER_SLOW_CALL_RATE: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", "0.8"))
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+    LLM_BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "2"))
+    
+    # Hedged requests: duplicate a call still running after the given latency percentile
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "2"))
+    # Hedges allowed as a share of hedge-eligible requests
+    LLM_HEDGE_BUDGET_RATIO: float = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05"))
+    LLM_HEDGE_TASKS: List[str] = json.loads(os.getenv("LLM_HEDGE_TASKS", '["analysis"]'))
+    # Optional hedge target; defaults to the primary's model and region
+    LLM_HEDGE_MODEL_ID: Optional[str] = os.getenv("LLM_HEDGE_MODEL_ID") or None
+    LLM_HEDGE_REGION: Optional[str] = os.getenv("LLM_HEDGE_REGION") or None
+    
+    # Retry policy shared by Bedrock, S3 and Transcribe calls
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "20"))
+    RETRY_MAX_ELAPSED_SECONDS: float = float(os.getenv("RETRY_MAX_ELAPSED_SECONDS", "90"))
+    # Retries allowed per first attempt, plus a per-second floor for quiet periods
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    
+    # Agents read Bedrock responses as a stream and stop at the closed JSON object.
+    # Requires the bedrock:InvokeModelWithResponseStream permission.
+    LLM_STREAMING_ENABLED: bool = os.getenv("LLM_STREAMING_ENABLED", "false").lower() == "true"
+    
+    # Generation profiles (max_tokens, temperature, stop_sequences, prefill) by agent name or
+    # task, merged onto the built-in ones, e.g. {"QAScoringAgent": {"max_tokens": 512}}
+    LLM_GENERATION_PROFILES: Dict[str, Dict] = json.loads(os.getenv("LLM_GENERATION_PROFILES", "{}"))
+    # Start JSON agents' answers with an assistant "{" prefill (and stop at markdown fences).
+    # Only free-text answers use these: with LLM_STRUCTURED_OUTPUT on, agents with an output
+    # schema answer through a tool call, so prefill and stops only apply to nudges.
+    LLM_ASSISTANT_PREFILL: bool = os.getenv("LLM_ASSISTANT_PREFILL", "true").lower() == "true"
+    # Agents with an output schema answer through a forced tool call against it
+    LLM_STRUCTURED_OUTPUT: bool = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+    # Re-prompts for just the fields that fail the schema, before giving up on them
+    LLM_SCHEMA_REPAIR_ATTEMPTS: int = int(os.getenv("LLM_SCHEMA_REPAIR_ATTEMPTS", "1"))
+    
+    # Prompt layout: "inline" embeds the transcript in each agent prompt; "prefix" sends
+    # a shared system prompt + transcript first and the agent's task last, so the
+    # transcript is a cacheable prefix shared by all agents of a call.
+    PROMPT_LAYOUT: str = os.getenv("PROMPT_LAYOUT", "inline")
+    # Model id fragments that accept Bedrock prompt-cache points
+    LLM_PROMPT_CACHE_MODELS: List[str] = [
+        m.strip() for m in os.getenv(
+            "LLM_PROMPT_CACHE_MODELS",
+            "claude-3-7-sonnet,claude-3-5-haiku,claude-sonnet-4,claude-opus-4,claude-haiku-4"
+        ).split(",") if m.strip()
+    ]
+    # Bedrock ignores cache points on prefixes shorter than this
+    LLM_PROMPT_CACHE_MIN_TOKENS: int = int(os.getenv("LLM_PROMPT_CACHE_MIN_TOKENS", "1024"))
+    
+    # Prompt token budgets (estimated offline). Over-budget transcripts are fitted with
+    # LLM_BUDGET_POLICY: "head_tail", "speaker" (turn-aware trim) or "chunk".
+    LLM_TOKEN_BUDGET_DEFAULT: int = int(os.getenv("LLM_TOKEN_BUDGET_DEFAULT", "30000"))
+    # JSON map of agent name -> budget, e.g. {"CoachingAgent": 16000}
+    LLM_TOKEN_BUDGETS: Dict[str, int] = json.loads(os.getenv("LLM_TOKEN_BUDGETS", "{}"))
+    LLM_BUDGET_POLICY: str = os.getenv("LLM_BUDGET_POLICY", "speaker")
+    
+    # Batch inference for backfills: "bedrock", or "local" (file-based stand-in with canned
+    # answers, only applied to calls with backfill_analysis.py poll --allow-standin)
+    LLM_BATCH_BACKEND: str = os.getenv("LLM_BATCH_BACKEND", "bedrock")
+    LLM_BATCH_DIR: str = os.getenv("LLM_BATCH_DIR", ".llm_batch")
+    LLM_BATCH_S3_BUCKET: str = os.getenv("LLM_BATCH_S3_BUCKET", os.getenv("TRANSCRIBE_S3_BUCKET", "cognivista-audio-uploads"))
+    LLM_BATCH_S3_PREFIX: str = os.getenv("LLM_BATCH_S3_PREFIX", "llm-batch/")
+    # Service role Bedrock assumes to read/write the batch S3 prefix
+    LLM_BATCH_ROLE_ARN: Optional[str] = os.getenv("LLM_BATCH_ROLE_ARN")
+    LLM_BATCH_POLL_SECONDS: float = float(os.getenv("LLM_BATCH_POLL_SECONDS", "60"))
+    
+    # Analysis pipeline: "fanout" (one call per agent) or "fused" (single call, per-agent fallback)
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "fanout")
+    # While a breaker is open, fill failed sections with flagged keyword/lexicon heuristics
+    ANALYSIS_DEGRADED_MODE: bool = os.getenv("ANALYSIS_DEGRADED_MODE", "false").lower() == "true"
+    # When a breaker closes again, re-run up to this many needs_reanalysis calls in the background (0 = off)
+    ANALYSIS_RECOVERY_REANALYZE_LIMIT: int = int(os.getenv("ANALYSIS_RECOVERY_REANALYZE_LIMIT", "100"))
+    # End-to-end deadline per analysis (0 = none); agents still running are cancelled and re-run later
+    ANALYSIS_DEADLINE_SECONDS: float = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "90"))
+    # Tighter per-agent caps by result key ("fused" for the single call), e.g. {"coaching": 30}
+    ANALYSIS_AGENT_DEADLINES: dict = json.loads(os.getenv("ANALYSIS_AGENT_DEADLINES", "{}"))
+    # Re-run sections cut off by the deadline once, this many seconds later, at backfill priority (0 = off)
+    ANALYSIS_TIMEOUT_RETRY_DELAY_SECONDS: float = float(os.getenv("ANALYSIS_TIMEOUT_RETRY_DELAY_SECONDS", "30"))
+    # Map-reduce for long calls: sentiment, SOP and risk run on speaker-turn chunks in parallel
+    # once the transcript is over ANALYSIS_MAP_REDUCE_TOKENS (0 = only when LLM_BUDGET_POLICY=chunk requires it)
+    ANALYSIS_MAP_REDUCE_TOKENS: int = int(os.getenv("ANALYSIS_MAP_REDUCE_TOKENS", "6000"))
+    ANALYSIS_CHUNK_TOKENS: int = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "2500"))
+    ANALYSIS_CHUNK_OVERLAP_TURNS: int = int(os.getenv("ANALYSIS_CHUNK_OVERLAP_TURNS", "2"))
+    # Near-duplicate reuse: "off", "copy" (reuse every section) or "cheap" (re-run ANALYSIS_REUSE_RERUN)
+    ANALYSIS_REUSE_MODE: str = os.getenv("ANALYSIS_REUSE_MODE", "off")
+    # Estimated Jaccard similarity of word shingles (numbers ignored) needed to reuse
+    ANALYSIS_REUSE_THRESHOLD: float = float(os.getenv("ANALYSIS_REUSE_THRESHOLD", "0.9"))
+    ANALYSIS_REUSE_RERUN: list = json.loads(os.getenv("ANALYSIS_REUSE_RERUN", '["sentiment", "risk_analysis"]'))
+    ANALYSIS_REUSE_INDEX_SIZE: int = int(os.getenv("ANALYSIS_REUSE_INDEX_SIZE", "50000"))
+    # Recent completed calls indexed at startup
+    ANALYSIS_REUSE_WARM_LIMIT: int = int(os.getenv("ANALYSIS_REUSE_WARM_LIMIT", "5000"))
+    
     # AWS Transcribe (Speech-to-Text)
     TRANSCRIBE_S3_BUCKET: str = os.getenv("TRANSCRIBE_S3_BUCKET", "cognivista-audio-uploads")
     TRANSCRIBE_S3_PREFIX: str = os.getenv("TRANSCRIBE_S3_PREFIX", "audio-uploads/")
+    # Longest wait for a Transcribe job; an enclosing deadline can only shorten it
+    TRANSCRIBE_MAX_WAIT_SECONDS: float = float(os.getenv("TRANSCRIBE_MAX_WAIT_SECONDS", "600"))
+    TRANSCRIBE_POLL_SECONDS: float = float(os.getenv("TRANSCRIBE_POLL_SECONDS", "5"))
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "CHANGE_THIS_IN_PRODUCTION_SECRET_KEY")
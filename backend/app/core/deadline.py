@@ -0,0 +1,71 @@
+import asyncio
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+# Absolute time.monotonic() by which the current unit of work must finish
+_current_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(RuntimeError):
+    """
+    The enclosing deadline passed. Deliberately not a TimeoutError, so retry
+    policies treat it as fatal instead of retrying into a budget that is gone.
+    """
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Bounds everything awaited inside the block, including tasks started from
+    it (asyncio copies the context), to `seconds` from now. Nested scopes can
+    only tighten the enclosing deadline. None or 0 leaves it unchanged.
+    """
+    current = _current_deadline.get()
+    if seconds:
+        ends = time.monotonic() + seconds
+        current = ends if current is None else min(current, ends)
+    token = _current_deadline.set(current)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the enclosing deadline (may be negative), or None without one."""
+    ends = _current_deadline.get()
+    return None if ends is None else ends - time.monotonic()
+
+
+def check(label: str = ""):
+    """Raises DeadlineExceeded if the enclosing deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{label or 'Work'} past its deadline")
+
+
+async def within(awaitable: Awaitable[Any], seconds: Optional[float] = None, label: str = "") -> Any:
+    """
+    Awaits awaitable, cancelling it at the enclosing deadline or after
+    `seconds`, whichever comes first; raises DeadlineExceeded then.
+    Timeouts raised by the awaitable itself pass through unchanged.
+    """
+    limit = remaining()
+    if seconds:
+        limit = seconds if limit is None else min(limit, seconds)
+    if limit is None:
+        return await awaitable
+    if limit <= 0:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"{label or 'Work'} not started, deadline already passed")
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(awaitable, limit)
+    except asyncio.TimeoutError:
+        if time.monotonic() - started < limit:
+            raise
+        raise DeadlineExceeded(f"{label or 'Work'} cancelled after {limit:.1f}s deadline")
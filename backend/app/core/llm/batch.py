@@ -0,0 +1,264 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.llm.schema import response_text
+from app.core.retry import boto_client_config, policy_from_settings
+
+logger = logging.getLogger("LLM_BATCH")
+
+T = TypeVar("T")
+
+# Normalized job states; backends map their own status strings onto these
+PENDING, COMPLETED, FAILED = "pending", "completed", "failed"
+
+_BEDROCK_STATUS = {
+    "Submitted": PENDING,
+    "Validating": PENDING,
+    "Scheduled": PENDING,
+    "InProgress": PENDING,
+    "Stopping": PENDING,
+    "Completed": COMPLETED,
+    "PartiallyCompleted": COMPLETED,
+    "Failed": FAILED,
+    "Stopped": FAILED,
+    "Expired": FAILED,
+}
+
+
+class BatchRecord:
+    """One model request in a batch job. metadata travels with the job, not the model."""
+
+    __slots__ = ("record_id", "model_id", "payload", "metadata")
+
+    def __init__(self, record_id: str, model_id: str, payload: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
+        self.record_id = record_id
+        self.model_id = model_id
+        self.payload = payload
+        self.metadata = metadata or {}
+
+
+def write_jsonl(path: str, records: List[BatchRecord]):
+    """Bedrock batch input format: one {"recordId", "modelInput"} object per line."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps({"recordId": record.record_id, "modelInput": record.payload}, ensure_ascii=False) + "\n")
+
+
+def read_output(path: str, tools: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Parses a batch output file into record id -> {"text": ...} or {"error": ...}.
+    Lines carry "modelOutput" (a Messages API body) or "error" per record.
+    tools maps record ids to the tool their answer must come from (see response_text).
+    """
+    tools = tools or {}
+    results = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            record_id = row.get("recordId")
+            output = row.get("modelOutput")
+            if output and output.get("content"):
+                # Tool input, or text continuing from any assistant prefill in the input
+                text = response_text(row.get("modelInput") or {}, output, tools.get(record_id))
+                results[record_id] = {"text": text, "usage": output.get("usage", {})}
+            else:
+                error = row.get("error") or {}
+                results[record_id] = {"error": error.get("errorMessage") if isinstance(error, dict) else str(error)}
+    return results
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for Bedrock batch inference. submit() only records
+    the job next to its input; the first status() check runs it through the
+    Bedrock stand-in model and writes the output file. All job state is on
+    disk, so submit and poll can run in different processes; no network,
+    no cost. Its answers are canned, see BackfillService.poll.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def submit(self, job_name: str, model_id: str, input_path: str) -> str:
+        job_id = job_name
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        with open(os.path.join(job_dir, "job.json"), "w", encoding="utf-8") as f:
+            json.dump({"model_id": model_id, "input_path": os.path.abspath(input_path), "submitted_at": time.time()}, f)
+        return job_id
+
+    def _process(self, job_id: str):
+        from app.core.llm.standin import model_from_settings
+
+        job_dir = self._job_dir(job_id)
+        output_path = os.path.join(job_dir, "output.jsonl.out")
+        try:
+            with open(os.path.join(job_dir, "job.json"), "r", encoding="utf-8") as f:
+                input_path = json.load(f)["input_path"]
+            model = model_from_settings()
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            with open(input_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    row["modelOutput"] = model.body(row["modelInput"])
+                    dst.write(json.dumps(row, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, output_path)
+            logger.info(f"🧪 [BATCH] Local job {job_id} processed by the stand-in model")
+        except Exception as e:
+            logger.error(f"❌ [BATCH] Local job {job_id} failed: {e}")
+            with open(os.path.join(job_dir, "FAILED"), "w", encoding="utf-8") as f:
+                f.write(str(e))
+
+    def status(self, job_id: str) -> str:
+        job_dir = self._job_dir(job_id)
+        if not os.path.exists(os.path.join(job_dir, "output.jsonl.out")) and not os.path.exists(os.path.join(job_dir, "FAILED")):
+            if not os.path.exists(os.path.join(job_dir, "job.json")):
+                return FAILED
+            self._process(job_id)
+        if os.path.exists(os.path.join(job_dir, "FAILED")):
+            return FAILED
+        return COMPLETED
+
+    def output_paths(self, job_id: str) -> List[str]:
+        return [os.path.join(self._job_dir(job_id), "output.jsonl.out")]
+
+
+class BedrockBatchBackend:
+    """
+    Bedrock batch inference (CreateModelInvocationJob). Input JSONL is staged
+    in S3, the job runs at batch pricing outside the on-demand throughput used
+    by live traffic, and output files are downloaded when it completes.
+    Requires a service role that can read and write the S3 prefix.
+    """
+
+    name = "bedrock"
+
+    def __init__(self, region: str, bucket: str, prefix: str, role_arn: str, work_dir: str):
+        import boto3
+
+        if not role_arn:
+            raise RuntimeError("LLM_BATCH_ROLE_ARN is required for the bedrock batch backend")
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/"
+        self.role_arn = role_arn
+        self.work_dir = work_dir
+        self.bedrock = boto3.client("bedrock", region_name=region, config=boto_client_config())
+        self.s3 = boto3.client("s3", region_name=region, config=boto_client_config())
+
+    def submit(self, job_name: str, model_id: str, input_path: str) -> str:
+        input_key = f"{self.prefix}{job_name}/input.jsonl"
+        self.s3.upload_file(input_path, self.bucket, input_key)
+        response = self.bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{self.bucket}/{input_key}"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{self.bucket}/{self.prefix}{job_name}/output/"}},
+        )
+        return response["jobArn"]
+
+    def status(self, job_id: str) -> str:
+        job = self.bedrock.get_model_invocation_job(jobIdentifier=job_id)
+        return _BEDROCK_STATUS.get(job["status"], PENDING)
+
+    def output_paths(self, job_id: str) -> List[str]:
+        job = self.bedrock.get_model_invocation_job(jobIdentifier=job_id)
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+        output_prefix = output_uri.split(f"s3://{self.bucket}/", 1)[1]
+        local_dir = os.path.join(self.work_dir, job["jobName"], "output")
+        os.makedirs(local_dir, exist_ok=True)
+        paths = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=output_prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(".jsonl.out"):
+                    path = os.path.join(local_dir, os.path.basename(obj["Key"]))
+                    self.s3.download_file(self.bucket, obj["Key"], path)
+                    paths.append(path)
+        return paths
+
+
+def backend_from_settings():
+    """Batch backend selected by LLM_BATCH_BACKEND ("bedrock" or "local")."""
+    if settings.LLM_BATCH_BACKEND == "local":
+        logger.warning("🧪 [BATCH] Using the local stand-in backend - no real model calls")
+        return LocalBatchBackend(settings.LLM_BATCH_DIR)
+    return BedrockBatchBackend(
+        region=settings.AWS_REGION,
+        bucket=settings.LLM_BATCH_S3_BUCKET,
+        prefix=settings.LLM_BATCH_S3_PREFIX,
+        role_arn=settings.LLM_BATCH_ROLE_ARN,
+        work_dir=settings.LLM_BATCH_DIR,
+    )
+
+
+class BatchGateway:
+    """
+    Batch counterpart of LLMGateway.invoke_model: records are written to
+    JSONL job files, one job per model id, and submitted to the backend.
+    Jobs are plain dicts so callers can persist them and poll later, from
+    another process if need be. Blocking backend calls run in an executor
+    under the retry policy.
+    """
+
+    def __init__(self, backend=None, work_dir: Optional[str] = None):
+        self.backend = backend or backend_from_settings()
+        self.work_dir = work_dir or settings.LLM_BATCH_DIR
+        self.retry_policy = policy_from_settings("BEDROCK_BATCH")
+
+    async def _run(self, fn: Callable[[], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await self.retry_policy.run(lambda: loop.run_in_executor(None, fn), label="BEDROCK_BATCH")
+
+    async def submit(self, name: str, records: List[BatchRecord]) -> List[Dict[str, Any]]:
+        by_model: Dict[str, List[BatchRecord]] = {}
+        for record in records:
+            by_model.setdefault(record.model_id, []).append(record)
+
+        jobs = []
+        for model_id, model_records in by_model.items():
+            job_name = f"{name}-{uuid.uuid4().hex[:8]}"
+            input_path = os.path.join(self.work_dir, job_name, "input.jsonl")
+            write_jsonl(input_path, model_records)
+            job_id = await self._run(lambda: self.backend.submit(job_name, model_id, input_path))
+            logger.info(f"📦 [BATCH] Submitted {job_name}: {len(model_records)} records on {model_id} ({self.backend.name})")
+            jobs.append({
+                "job_id": job_id,
+                "job_name": job_name,
+                "backend": self.backend.name,
+                "model_id": model_id,
+                "record_count": len(model_records),
+                "records": [{"record_id": r.record_id, **r.metadata} for r in model_records],
+                "submitted_at": time.time(),
+            })
+        return jobs
+
+    async def status(self, job: Dict[str, Any]) -> str:
+        return await self._run(lambda: self.backend.status(job["job_id"]))
+
+    async def results(self, job: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        paths = await self._run(lambda: self.backend.output_paths(job["job_id"]))
+        results: Dict[str, Dict[str, Any]] = {}
+        tools = {r["record_id"]: r.get("tool") for r in job["records"]}
+        for path in paths:
+            results.update(read_output(path, tools))
+        missing = {r["record_id"] for r in job["records"]} - set(results)
+        for record_id in missing:
+            results[record_id] = {"error": "No output for record"}
+        return results
@@ -0,0 +1,223 @@
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.retry import classify_error
+
+logger = logging.getLogger("LLM_BREAKER")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose breaker is open."""
+
+    def __init__(self, name: str, retry_in_seconds: float):
+        super().__init__(f"Circuit open for {name}, retry in {retry_in_seconds:.1f}s")
+        self.name = name
+        self.retry_in_seconds = retry_in_seconds
+
+
+class CircuitBreaker:
+    """
+    Error-rate and slow-call breaker for one model.
+
+    Outcomes of the last window_seconds are kept. Once at least min_calls
+    are in the window, the breaker opens when the failure rate reaches
+    error_rate or the share of calls slower than slow_call_seconds reaches
+    slow_call_rate. While open every call fails fast with CircuitOpenError.
+    After open_seconds it lets half_open_calls probes through: all of them
+    healthy closes it, any failure or slow probe opens it again.
+    Only overload-type failures count (throttle, timeout, transient); a
+    rejected request says nothing about the service's health.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float,
+        min_calls: int,
+        error_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_calls: int = 1,
+        on_state_change: Optional[Callable[[str, str, str], None]] = None,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        # (timestamp, failed, slow) per finished call
+        self._window: Deque[Tuple[float, bool, bool]] = deque()
+        self._probes_started = 0
+        self._probes_ok = 0
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            logger.error(f"🔌 [BREAKER] {self.name}: {previous} -> open for {self.open_seconds}s")
+        else:
+            logger.warning(f"🔌 [BREAKER] {self.name}: {previous} -> {state}")
+        if state in (CLOSED, HALF_OPEN):
+            self._probes_started = 0
+            self._probes_ok = 0
+        if state == CLOSED:
+            self._window.clear()
+        if self.on_state_change:
+            self.on_state_change(self.name, previous, state)
+
+    def _prune(self, now: float):
+        while self._window and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+
+    def current_state(self) -> str:
+        """State, moving open -> half_open once the open period has passed."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self.state
+
+    def allows(self) -> bool:
+        """Whether a call would be let through right now (closed, or a probe slot is free)."""
+        state = self.current_state()
+        if state == OPEN:
+            return False
+        return state == CLOSED or self._probes_started < self.half_open_calls
+
+    def check(self):
+        """Raises CircuitOpenError if a call would be rejected right now."""
+        if not self.allows():
+            self.rejected += 1
+            retry_in = self.open_seconds - (time.monotonic() - self.opened_at) if self.state == OPEN else 0.0
+            raise CircuitOpenError(self.name, retry_in)
+
+    def _record(self, failed: bool, latency: float):
+        slow = latency >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._probes_ok += 1
+            if self._probes_ok >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            return
+
+        now = time.monotonic()
+        self._window.append((now, failed, slow))
+        self._prune(now)
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for _, f, _ in self._window if f)
+        slow_calls = sum(1 for _, _, s in self._window if s)
+        if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_call_rate:
+            logger.error(f"❌ [BREAKER] {self.name}: {failures}/{calls} failed, {slow_calls}/{calls} slow in {self.window_seconds}s")
+            self._transition(OPEN)
+
+    @asynccontextmanager
+    async def guard(self):
+        """Runs one call through the breaker; raises CircuitOpenError when rejected."""
+        self.check()
+        probe = self.state == HALF_OPEN
+        if probe:
+            self._probes_started += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            # A rejected request (fatal) still means the service answered
+            self._record(classify_error(e) != "fatal", time.monotonic() - started)
+            raise
+        except BaseException:
+            # Cancelled: no verdict on the service, but give the probe slot back
+            if probe and self.state == HALF_OPEN:
+                self._probes_started -= 1
+            raise
+        self._record(False, time.monotonic() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._prune(now)
+        calls = len(self._window)
+        return {
+            "state": self.current_state(),
+            "window_calls": calls,
+            "window_failures": sum(1 for _, f, _ in self._window if f),
+            "window_slow": sum(1 for _, _, s in self._window if s),
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per model id, built from shared thresholds."""
+
+    def __init__(self, enabled: bool = True, **config):
+        self.enabled = enabled
+        self.config = config
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._listeners: List[Callable[[str, str, str], None]] = []
+
+    def add_listener(self, listener: Callable[[str, str, str], None]):
+        """listener(model_id, previous_state, new_state) is called on every transition."""
+        self._listeners.append(listener)
+
+    def _notify(self, name: str, previous: str, state: str):
+        for listener in self._listeners:
+            try:
+                listener(name, previous, state)
+            except Exception as e:
+                logger.warning(f"⚠️ [BREAKER] State listener failed: {e}")
+
+    def get(self, model_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model_id)
+        if breaker is None:
+            breaker = CircuitBreaker(model_id, on_state_change=self._notify, **self.config)
+            self._breakers[model_id] = breaker
+        return breaker
+
+    def any_open(self) -> bool:
+        """Whether any model's calls are currently being rejected (open or probing)."""
+        return self.enabled and any(breaker.current_state() != CLOSED for breaker in self._breakers.values())
+
+    def is_open(self, model_id: str) -> bool:
+        """Whether calls to this model are currently being rejected (open or probing)."""
+        if not self.enabled or model_id not in self._breakers:
+            return False
+        return self._breakers[model_id].current_state() != CLOSED
+
+    def allows(self, model_id: str) -> bool:
+        """Whether a call to this model would be let through right now."""
+        if not self.enabled or model_id not in self._breakers:
+            return True
+        return self._breakers[model_id].allows()
+
+    @asynccontextmanager
+    async def guard(self, model_id: str):
+        if not self.enabled:
+            yield
+            return
+        async with self.get(model_id).guard():
+            yield
+
+    def check(self, model_id: str):
+        if self.enabled:
+            self.get(model_id).check()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {model_id: breaker.snapshot() for model_id, breaker in self._breakers.items()}
@@ -0,0 +1,193 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.llm.tokens import chars_for_tokens, estimate_tokens
+
+logger = logging.getLogger("TOKEN_BUDGET")
+
+POLICIES = ("head_tail", "speaker", "chunk")
+
+# "Agent: ...", "Customer: ...", "spk_0: ..." at the start of a line
+_TURN_START = re.compile(r"^\s*(spk_\d+|[A-Za-z][\w .]{0,24}?)\s*:\s+", re.MULTILINE)
+
+# Turns longer than this are shortened first by the speaker-aware policy
+MAX_TURN_TOKENS = 150
+
+# Sentence ends and line breaks, the units of unlabelled transcripts when chunking
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_turns(transcript: str) -> List[str]:
+    """Splits a speaker-labelled transcript into turns; [] if it has no labels."""
+    starts = [m.start() for m in _TURN_START.finditer(transcript)]
+    if len(starts) < 2:
+        return []
+    if starts[0] > 0:
+        starts.insert(0, 0)
+    return [transcript[a:b].strip() for a, b in zip(starts, starts[1:] + [len(transcript)])]
+
+
+def _cut_at_space(text: str, limit: int, from_end: bool = False) -> str:
+    """Cuts text to ~limit chars on a whitespace boundary."""
+    if len(text) <= limit:
+        return text
+    if from_end:
+        piece = text[len(text) - limit:]
+        space = piece.find(" ")
+        return piece[space + 1:] if 0 <= space < 40 else piece
+    piece = text[:limit]
+    space = piece.rfind(" ")
+    return piece[:space] if space > limit - 40 else piece
+
+
+def head_tail(transcript: str, max_tokens: int) -> str:
+    """Keeps the opening and closing halves of the call, drops the middle."""
+    head = _cut_at_space(transcript, chars_for_tokens(transcript, max_tokens // 2))
+    tail = _cut_at_space(transcript, chars_for_tokens(transcript, max_tokens // 2), from_end=True)
+    omitted = estimate_tokens(transcript) - estimate_tokens(head) - estimate_tokens(tail)
+    return f"{head}\n[... transcript truncated: ~{max(0, omitted)} tokens omitted ...]\n{tail}"
+
+
+def speaker_trim(transcript: str, max_tokens: int) -> str:
+    """
+    Turn-preserving trim: long monologues are shortened first so every turn
+    survives; if that is not enough, whole turns are dropped from the middle
+    of the call, keeping the opening and closing exchanges. Falls back to
+    head_tail for transcripts without speaker labels.
+    """
+    turns = split_turns(transcript)
+    if not turns:
+        return head_tail(transcript, max_tokens)
+
+    shortened = []
+    for turn in turns:
+        if estimate_tokens(turn) > MAX_TURN_TOKENS:
+            turn = _cut_at_space(turn, chars_for_tokens(turn, MAX_TURN_TOKENS)) + " …"
+        shortened.append(turn)
+    text = "\n".join(shortened)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    costs = [estimate_tokens(turn) + 1 for turn in shortened]
+    allowance = max_tokens - 20  # room for the omission marker
+    head, tail = [], []
+    head_cost = tail_cost = 0
+    i, j = 0, len(shortened) - 1
+    # Take turns from whichever end has used less, until the allowance runs out
+    while i <= j:
+        side_is_head = head_cost <= tail_cost
+        k = i if side_is_head else j
+        if costs[k] > allowance:
+            break
+        allowance -= costs[k]
+        if side_is_head:
+            head.append(k)
+            head_cost += costs[k]
+            i += 1
+        else:
+            tail.append(k)
+            tail_cost += costs[k]
+            j -= 1
+    omitted = len(shortened) - len(head) - len(tail)
+    parts = [shortened[k] for k in head]
+    if omitted:
+        parts.append(f"[... {omitted} turns omitted ...]")
+    parts.extend(shortened[k] for k in reversed(tail))
+    return "\n".join(parts)
+
+
+def chunk_turns(transcript: str, max_tokens: int, overlap_turns: int = 2) -> List[str]:
+    """
+    Splits a transcript into chunks of at most ~max_tokens on speaker-turn
+    boundaries (sentences for unlabelled transcripts). Each chunk repeats the
+    last overlap_turns turns of the previous one, so an exchange cut at a
+    boundary is seen whole by one chunk. A single turn over max_tokens is
+    split on whitespace.
+    """
+    turns = split_turns(transcript) or [s.strip() for s in _SENTENCE_END.split(transcript) if s.strip()]
+    units = []
+    for turn in turns:
+        while estimate_tokens(turn) > max_tokens:
+            piece = _cut_at_space(turn, chars_for_tokens(turn, max_tokens)) or turn[:chars_for_tokens(turn, max_tokens)]
+            units.append(piece)
+            turn = turn[len(piece):].lstrip()
+        if turn:
+            units.append(turn)
+
+    costs = [estimate_tokens(unit) + 1 for unit in units]
+    chunks = []
+    start = 0
+    while start < len(units):
+        end, used = start, 0
+        while end < len(units) and (end == start or used + costs[end] <= max_tokens):
+            used += costs[end]
+            end += 1
+        chunks.append("\n".join(units[start:end]))
+        if end >= len(units):
+            break
+        # Always move forward, even when the overlap would cover the whole chunk
+        start = max(start + 1, end - overlap_turns)
+    return chunks
+
+
+class TranscriptBudget:
+    """
+    Per-agent prompt token budgets.
+
+    fit() estimates the full prompt (agent instructions + transcript) and,
+    when it is over budget, applies the policy to the transcript only:
+      head_tail - keep the beginning and end of the call
+      speaker   - shorten long turns, then drop whole middle turns
+      chunk     - leave the transcript intact and report action "chunk" so the
+                  caller can process it in pieces (see chunk_turns)
+    """
+
+    def __init__(self, default_tokens: int, agent_tokens: Dict[str, int], policy: str):
+        if policy not in POLICIES:
+            logger.warning(f"⚠️ [BUDGET] Unknown policy '{policy}', using head_tail")
+            policy = "head_tail"
+        self.default_tokens = default_tokens
+        self.agent_tokens = agent_tokens
+        self.policy = policy
+
+    def budget_for(self, agent_name: str) -> int:
+        return self.agent_tokens.get(agent_name, self.default_tokens)
+
+    def fit(
+        self,
+        agent_name: str,
+        transcript: str,
+        overhead_tokens: int,
+        policy: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Returns (transcript to send, estimate report for the call document)."""
+        policy = policy or self.policy
+        budget = self.budget_for(agent_name)
+        transcript_tokens = estimate_tokens(transcript)
+        report = {
+            "budget_tokens": budget,
+            "estimated_prompt_tokens": overhead_tokens + transcript_tokens,
+            "transcript_tokens": transcript_tokens,
+            "action": "none",
+        }
+        if overhead_tokens + transcript_tokens <= budget:
+            return transcript, report
+
+        if policy == "chunk":
+            report["action"] = "chunk"
+            return transcript, report
+
+        allowed = max(0, budget - overhead_tokens)
+        fitted = speaker_trim(transcript, allowed) if policy == "speaker" else head_tail(transcript, allowed)
+        fitted_tokens = estimate_tokens(fitted)
+        report.update({
+            "action": policy,
+            "estimated_prompt_tokens": overhead_tokens + fitted_tokens,
+            "transcript_tokens_sent": fitted_tokens,
+        })
+        logger.warning(
+            f"✂️ [BUDGET] {agent_name}: ~{overhead_tokens + transcript_tokens} tokens over budget {budget}, "
+            f"applied {policy} -> ~{overhead_tokens + fitted_tokens}"
+        )
+        return fitted, report
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("LLM_CACHE")
+
+
+class LRUCache:
+    """Bounded in-memory tier. Least recently used entries are evicted first."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class DiskCache:
+    """
+    Persistent tier: one JSON file per entry under `directory`, sharded by key
+    prefix. Survives restarts, so re-runs after a crash are served locally.
+    All methods are blocking; ResponseCache calls them from an executor.
+    """
+
+    def __init__(self, directory: str, max_entries: int, ttl_seconds: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._count = sum(1 for _ in self._files())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("created_at", 0) + self.ttl_seconds < time.time():
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("value")
+
+    def set(self, key: str, value: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existed = os.path.exists(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+        if not existed:
+            self._count += 1
+        if self._count > self.max_entries:
+            self._prune()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            self._count -= 1
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Drop the oldest entries (by mtime) down to 90% of capacity."""
+        files = sorted(self._files(), key=lambda p: os.path.getmtime(p))
+        self._count = len(files)
+        excess = self._count - int(self.max_entries * 0.9)
+        for path in files[:max(0, excess)]:
+            self._remove(path)
+            self.evictions += 1
+        logger.info(f"🧹 [CACHE] Disk tier pruned {max(0, excess)} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "directory": self.directory,
+        }
+
+
+class ResponseCache:
+    """
+    Two-tier LLM response cache: in-memory LRU in front of an optional disk
+    tier. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    @staticmethod
+    def make_key(
+        model_id: str,
+        system: Optional[str],
+        prompt: str,
+        params: Dict[str, Any],
+        prefix: Optional[str] = None,
+        stream: bool = False
+    ) -> str:
+        # Streamed responses stop at the first closed JSON object, so they are keyed apart
+        raw = json.dumps(
+            {"model_id": model_id, "system": system or "", "prefix": prefix or "", "prompt": prompt, "params": params, "stream": stream},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        loop = asyncio.get_running_loop()
+        try:
+            value = await loop.run_in_executor(None, self.disk.get, key)
+        except Exception as e:
+            logger.warning(f"⚠️ [CACHE] Disk read failed: {e}")
+            return None
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.disk.set, key, value)
+        except Exception as e:
+            logger.warning(f"⚠️ [CACHE] Disk write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk else None,
+        }
@@ -1,10 +1,29 @@
-import boto3
-import json
 import logging
 import asyncio
 import os
-from typing import Optional
+import time
+from typing import Callable, NamedTuple, Optional, Set, Tuple, Union
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, within
+from app.core.llm.breaker import BreakerRegistry, CircuitOpenError
+from app.core.llm.cache import DiskCache, LRUCache, ResponseCache
+from app.core.llm.hedge import Hedger
+from app.core.llm.limiter import LimiterRegistry
+from app.core.llm.pool import EndpointPool
+from app.core.llm.priority import PriorityTicket, resolve_priority
+from app.core.llm.profiles import GenerationProfile, ProfileRegistry
+from app.core.llm.router import ModelRouter, Route, default_rules
+from app.core.llm.schema import answer_tool, force_tool, response_text as message_text, shared_tools
+from app.core.llm.singleflight import SingleFlight
+from app.core.llm.tokens import estimate_tokens
+from app.core.llm.transport import BedrockTransport
+from app.core.metrics import (
+    LLM_CIRCUIT_REJECTED, LLM_CIRCUIT_STATE, LLM_CIRCUIT_TRIPS, LLM_COALESCED, LLM_CONCURRENCY_LIMIT,
+    LLM_ENDPOINT_AVAILABLE, LLM_ENDPOINT_HEALTH, LLM_HEDGE_WINS, LLM_HEDGES, LLM_IN_FLIGHT, LLM_LATENCY, LLM_OUTPUT_CAPPED, LLM_OUTPUT_TOKENS, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_REQUESTS, LLM_RETRIES,
+    LLM_RETRY_BUDGET_EXHAUSTED, LLM_RETRY_GIVEUPS, LLM_THROTTLES, LLM_TIMEOUTS, LLM_TOKENS,
+    LLM_TRANSPORT_ACTIVE, metrics
+)
+from app.core.retry import classify_error, global_retry_budget, policy_from_settings
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +34,18 @@ logging.basicConfig(
 logger = logging.getLogger("BEDROCK_GATEWAY")
 
 
+def _has_json_object(text: str) -> bool:
+    """Cheap validity check for hedged responses: a {...} span is present."""
+    start = text.find("{")
+    return start != -1 and text.rfind("}") > start
+
+
+class Completion(NamedTuple):
+    """Text of one Bedrock response, and whether max_tokens cut it off."""
+    text: str
+    truncated: bool = False
+
+
 class LLMGateway:
     """
     AWS Bedrock LLM Gateway - Real API calls only, no fallbacks.
@@ -28,118 +59,554 @@ class LLMGateway:
         
         self.region = os.environ.get("AWS_DEFAULT_REGION") or settings.AWS_REGION
         self.model_id = os.environ.get("BEDROCK_MODEL_ID") or settings.BEDROCK_MODEL_ID
-        self.bedrock_client = None
         
         logger.info(f"📍 Region: {self.region}")
         logger.info(f"🤖 Model: {self.model_id}")
         
-        # Initialize Bedrock client with proper credentials
-        self._init_bedrock_client()
+        # Dedicated client + thread pool, sized independently of the default executor
+        self.transport = self._create_transport(self.region)
+        # Region -> transport; other regions serve pool endpoints and hedges
+        self.transports = {self.region: self.transport}
+        self.cache = self._init_cache()
+        self.profiles = ProfileRegistry(settings.LLM_GENERATION_PROFILES, prefill_enabled=settings.LLM_ASSISTANT_PREFILL)
+        self.router = ModelRouter(
+            tiers={
+                "fast": settings.LLM_MODEL_FAST,
+                "standard": self.model_id,
+                "large": settings.LLM_MODEL_LARGE
+            },
+            rules=settings.LLM_ROUTING_RULES or default_rules(
+                settings.LLM_ROUTE_SHORT_TOKENS,
+                settings.LLM_ROUTE_LONG_TOKENS
+            ),
+            enabled=settings.LLM_ROUTING_ENABLED,
+            prices=settings.LLM_MODEL_PRICES
+        )
+        self.limiters = LimiterRegistry(
+            initial=settings.LLM_LIMIT_INITIAL,
+            min_limit=settings.LLM_LIMIT_MIN,
+            max_limit=settings.LLM_LIMIT_MAX,
+            latency_target_seconds=settings.LLM_LIMIT_LATENCY_TARGET_SECONDS,
+            model_max_limits=settings.LLM_LIMIT_MODEL_MAX,
+            weights=settings.LLM_PRIORITY_WEIGHTS,
+            reservations=settings.LLM_PRIORITY_RESERVED
+        )
+        self.breakers = BreakerRegistry(
+            enabled=settings.LLM_BREAKER_ENABLED,
+            window_seconds=settings.LLM_BREAKER_WINDOW_SECONDS,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            error_rate=settings.LLM_BREAKER_ERROR_RATE,
+            slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            half_open_calls=settings.LLM_BREAKER_HALF_OPEN_CALLS
+        )
+        self.retry_policy = policy_from_settings("BEDROCK")
+        self.hedger = None
+        if settings.LLM_HEDGE_ENABLED:
+            self.hedger = Hedger(
+                percentile=settings.LLM_HEDGE_PERCENTILE,
+                min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+                min_delay_seconds=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+                budget_ratio=settings.LLM_HEDGE_BUDGET_RATIO
+            )
+            hedge_region = settings.LLM_HEDGE_REGION
+            if hedge_region and hedge_region not in self.transports:
+                self.transports[hedge_region] = self._create_transport(hedge_region)
+            logger.info(
+                f"🪞 Hedging: p{settings.LLM_HEDGE_PERCENTILE:g}, budget {settings.LLM_HEDGE_BUDGET_RATIO:.0%}, "
+                f"target {hedge_region or self.region}/{settings.LLM_HEDGE_MODEL_ID or 'same model'}"
+            )
+        self.pool = None
+        if settings.LLM_ENDPOINTS:
+            self.pool = EndpointPool(
+                settings.LLM_ENDPOINTS,
+                default_region=self.region,
+                limiters=self.limiters,
+                breakers=self.breakers,
+                latency_target_seconds=settings.LLM_LIMIT_LATENCY_TARGET_SECONDS
+            )
+            for region in sorted(self.pool.regions):
+                if region not in self.transports:
+                    self.transports[region] = self._create_transport(region)
+            logger.info(f"🌐 Endpoint pool: {', '.join(self.pool.snapshot())}")
+        self.single_flight = SingleFlight() if settings.LLM_SINGLEFLIGHT_ENABLED else None
+        # Cumulative token usage as reported by Bedrock, including prompt-cache reads/writes
+        self.usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0
+        }
+        metrics.add_collector(self._collect_metrics)
+        if self.router.enabled:
+            logger.info(f"🧭 Model routing: fast={settings.LLM_MODEL_FAST}, large={settings.LLM_MODEL_LARGE}")
+        logger.info(f"🚦 Adaptive limiter: start={settings.LLM_LIMIT_INITIAL}, range={settings.LLM_LIMIT_MIN}-{settings.LLM_LIMIT_MAX}")
         
         logger.info("=" * 60)
 
-    def _init_bedrock_client(self):
-        """Initialize Bedrock client with available credentials."""
-        try:
-            # Check for environment credentials first (ECS task role injects these)
-            if os.environ.get("AWS_ACCESS_KEY_ID"):
-                self.bedrock_client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=self.region
-                )
-                logger.info("🔑 Auth: Environment/Task Role credentials")
-                logger.info("✅ Bedrock client initialized")
-                return
-            
-            # Check for settings-based credentials
-            if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-                self.bedrock_client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=self.region,
-                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+    @staticmethod
+    def _create_transport(region: str) -> BedrockTransport:
+        return BedrockTransport(
+            region,
+            pool_size=settings.LLM_POOL_SIZE,
+            connect_timeout_seconds=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            read_timeout_seconds=settings.LLM_READ_TIMEOUT_SECONDS
+        )
+
+    def _transport(self, route: Route) -> BedrockTransport:
+        return self.transports.get(route.region or self.region, self.transport)
+
+    def _init_cache(self) -> Optional[ResponseCache]:
+        """Build the response cache tiers from settings."""
+        if not settings.LLM_CACHE_ENABLED:
+            logger.info("💾 Response cache: disabled")
+            return None
+        
+        memory = LRUCache(settings.LLM_CACHE_MEMORY_MAX_ENTRIES, settings.LLM_CACHE_MEMORY_TTL_SECONDS)
+        disk = None
+        if settings.LLM_CACHE_DISK_DIR:
+            try:
+                disk = DiskCache(
+                    settings.LLM_CACHE_DISK_DIR,
+                    settings.LLM_CACHE_DISK_MAX_ENTRIES,
+                    settings.LLM_CACHE_DISK_TTL_SECONDS
                 )
-                logger.info("🔑 Auth: Settings-based IAM credentials")
-                logger.info("✅ Bedrock client initialized")
-                return
-            
-            # Try default credential chain (instance profile, etc.)
-            self.bedrock_client = boto3.client('bedrock-runtime', region_name=self.region)
-            logger.info("🔑 Auth: Default credential chain")
-            logger.info("✅ Bedrock client initialized")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Bedrock client: {e}")
-            raise RuntimeError(f"Cannot initialize Bedrock: {e}. Ensure AWS credentials are configured.")
+            except OSError as e:
+                logger.warning(f"⚠️ Disk cache unavailable ({e}), using memory tier only")
+        
+        logger.info(f"💾 Response cache: memory={memory.max_entries} entries, disk={settings.LLM_CACHE_DISK_DIR if disk else 'off'}")
+        return ResponseCache(memory, disk)
+
+    def stats(self) -> dict:
+        """Point-in-time gateway state: cache counters and per-model concurrency windows."""
+        return {
+            "transport": self.transport.stats(),
+            "regional_transports": [t.stats() for region, t in self.transports.items() if region != self.region],
+            "endpoints": self.pool.snapshot() if self.pool else None,
+            "cache": self.cache.stats() if self.cache else None,
+            "limiters": self.limiters.snapshot(),
+            "breakers": self.breakers.snapshot(),
+            "retries": self.retry_policy.stats(),
+            "retry_budget": global_retry_budget.stats(),
+            "single_flight": self.single_flight.stats() if self.single_flight else None,
+            "hedging": self.hedger.stats() if self.hedger else None,
+            "usage": dict(self.usage),
+            "generation": self.profiles.stats(),
+            "routing": self.router.stats()
+        }
 
-    async def invoke_model(self, prompt: str, system_instruction: str = None) -> str:
+    def _collect_metrics(self):
+        """Copies limiter, retry, transport and single-flight state into the metrics registry."""
+        for model_id, limiter in self.limiters.snapshot().items():
+            for priority, counts in limiter["classes"].items():
+                LLM_IN_FLIGHT.set(counts["in_flight"], model=model_id, priority=priority)
+                LLM_QUEUE_DEPTH.set(counts["waiting"], model=model_id, priority=priority)
+            LLM_CONCURRENCY_LIMIT.set(limiter["limit"], model=model_id)
+            LLM_THROTTLES.set_total(limiter["throttles"], model=model_id)
+            LLM_TIMEOUTS.set_total(limiter["timeouts"], model=model_id)
+        for model_id, breaker in self.breakers.snapshot().items():
+            LLM_CIRCUIT_STATE.set({"closed": 0, "half_open": 1, "open": 2}[breaker["state"]], model=model_id)
+            LLM_CIRCUIT_TRIPS.set_total(breaker["trips"], model=model_id)
+            LLM_CIRCUIT_REJECTED.set_total(breaker["rejected"], model=model_id)
+        LLM_RETRIES.set_total(self.retry_policy.retries, policy=self.retry_policy.name)
+        LLM_RETRY_GIVEUPS.set_total(self.retry_policy.giveups, policy=self.retry_policy.name)
+        LLM_RETRY_BUDGET_EXHAUSTED.set_total(global_retry_budget.exhausted)
+        LLM_TRANSPORT_ACTIVE.set(self.transport.active)
+        if self.pool:
+            for key, endpoint in self.pool.snapshot().items():
+                LLM_ENDPOINT_HEALTH.set(endpoint["health"], endpoint=key)
+                LLM_ENDPOINT_AVAILABLE.set(1 if endpoint["available"] else 0, endpoint=key)
+        if self.hedger:
+            LLM_HEDGES.set_total(self.hedger.hedged)
+            LLM_HEDGE_WINS.set_total(self.hedger.hedge_wins)
+        if self.single_flight:
+            LLM_COALESCED.set_total(self.single_flight.coalesced)
+
+    def circuit_open(self, agent_name: str = None, task: str = None, text: str = "") -> bool:
+        """Whether the model (or every pool endpoint) this request would route to is failing fast."""
+        route = self.route(agent_name, task, text)
+        if self.pool and self.pool.serves(route):
+            return not self.pool.available(route)
+        return self.breakers.is_open(route.key)
+
+    def supports_prompt_cache(self, model_id: str = None) -> bool:
+        """Whether cache-point markers should be sent for this model."""
+        model_id = model_id or self.model_id
+        return any(marker in model_id for marker in settings.LLM_PROMPT_CACHE_MODELS)
+
+    def route(self, agent_name: str = None, task: str = None, text: str = "") -> Route:
+        """Picks the model for a request from its agent, task and input size."""
+        return self.router.select(agent_name, task, estimate_tokens(text))
+
+    def _record_usage(self, usage: dict, route: Route, agent_name: str = None):
+        self.router.record_usage(route, usage)
+        for key in self.usage:
+            self.usage[key] += usage.get(key) or 0
+        for key, token_type in (
+            ("input_tokens", "input"),
+            ("output_tokens", "output"),
+            ("cache_read_input_tokens", "cache_read"),
+            ("cache_creation_input_tokens", "cache_write")
+        ):
+            if usage.get(key):
+                LLM_TOKENS.inc(usage[key], agent=agent_name, model=route.model_id, type=token_type)
+        if usage:
+            logger.info(
+                f"🧮 Tokens: in={usage.get('input_tokens', 0)}, out={usage.get('output_tokens', 0)}, "
+                f"cache_read={usage.get('cache_read_input_tokens', 0)}, cache_write={usage.get('cache_creation_input_tokens', 0)}"
+            )
+
+    def _user_content(self, prompt: str, prefix: Optional[str], model_id: str = None):
         """
-        Invoke Bedrock model with real API call.
-        No fallbacks - raises exception on failure.
+        Message content. With a prefix, the prefix goes first as its own block,
+        marked as a cache point when the model supports prompt caching, so
+        every request sharing it (same system prompt + prefix) reads it from cache.
         """
-        if not self.bedrock_client:
-            raise RuntimeError("Bedrock client not initialized. Check AWS credentials.")
+        if prefix is None:
+            return prompt
+        prefix_block = {"type": "text", "text": prefix}
+        if self.supports_prompt_cache(model_id):
+            prefix_block["cache_control"] = {"type": "ephemeral"}
+        return [prefix_block, {"type": "text", "text": prompt}]
+
+    async def warm_prefix(self, prefix: str, system_instruction: str = None, agent_names: list = None, toolset: dict = None):
+        """
+        Writes a shared prefix into Bedrock's prompt cache with a 1-token request,
+        so requests fanned out right after it read the cache instead of racing to
+        write it. Prompt caches are per model, so one request is sent per model the
+        given agents route to. No-op for models without prompt caching or when the
+        prefix is too short.
+        The cached prefix starts with the tools, so with structured output the
+        warm-up carries the toolset the agents share (see force_tool); without
+        one their per-agent tools would not match it and nothing is written.
+        """
+        if settings.LLM_STRUCTURED_OUTPUT and not toolset:
+            logger.info("🔥 Prompt cache warm-up skipped: agents send their own tools")
+            return
+        if estimate_tokens(prefix) < settings.LLM_PROMPT_CACHE_MIN_TOKENS:
+            return
+        routes = {}
+        for agent_name in agent_names or [None]:
+            route = self.route(agent_name, "analysis", prefix)
+            if self.supports_prompt_cache(route.model_id):
+                routes.setdefault(route.model_id, route)
         
-        logger.info("-" * 40)
-        logger.info(f"📨 LLM Request | Prompt: {len(prompt)} chars")
+        async def warm(route: Route):
+            payload = {
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": 1,
+                "messages": [{"role": "user", "content": self._user_content("", prefix, route.model_id)[:1]}]
+            }
+            if settings.LLM_STRUCTURED_OUTPUT:
+                payload["tools"] = shared_tools(toolset)
+                payload["tool_choice"] = {"type": "any"}
+            if system_instruction:
+                payload["system"] = system_instruction
+            try:
+                await self._invoke_uncached(payload, route, task="warmup")
+                logger.info(f"🔥 Prompt cache warmed on {route.model_id}: {len(prefix)} chars")
+            except Exception as e:
+                logger.warning(f"⚠️ Prompt cache warm-up failed, continuing uncached: {e}")
         
-        # Build payload for Claude
+        await asyncio.gather(*(warm(route) for route in routes.values()))
+
+    def build_payload(
+        self,
+        prompt: str,
+        system_instruction: str = None,
+        prefix: Optional[str] = None,
+        agent_name: str = None,
+        task: str = None,
+        schema: Optional[dict] = None,
+        toolset: Optional[dict] = None,
+        route: Optional[Route] = None
+    ) -> Tuple[Route, dict]:
+        """
+        Routes a request and builds its Claude Messages payload, without sending it.
+        Generation parameters come from the agent's (else the task's) profile.
+        With a schema (and LLM_STRUCTURED_OUTPUT on) the answer is a forced tool
+        call, and the profile's prefill and stop sequences are not used.
+        toolset (name -> schema) offers the tools of every agent sharing a
+        prefix instead of just this one; see force_tool.
+        route skips routing, e.g. to keep related batch records on one model.
+        """
+        route = route or self.route(agent_name, task, (prefix or "") + prompt)
         payload = {
             "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4096,
-            "temperature": 0.2,  # Lower temp for more consistent structured output
-            "messages": [{"role": "user", "content": prompt}]
+            "messages": [{"role": "user", "content": self._user_content(prompt, prefix, route.model_id)}]
         }
-        
+        tool_call = bool(schema and settings.LLM_STRUCTURED_OUTPUT)
+        self.profiles.get(agent_name, task).apply(payload, tool_call=tool_call)
+        if tool_call:
+            force_tool(payload, schema, agent_name or task, toolset)
         if system_instruction:
             payload["system"] = system_instruction
+        return route, payload
+
+    async def invoke_model(
+        self,
+        prompt: str,
+        system_instruction: str = None,
+        use_cache: bool = True,
+        stream: bool = False,
+        prefix: Optional[str] = None,
+        agent_name: str = None,
+        task: str = None,
+        priority: Optional[str] = None,
+        schema: Optional[dict] = None,
+        cacheable: Optional[Callable[[str], bool]] = None,
+        toolset: Optional[dict] = None
+    ) -> str:
+        """
+        Invoke Bedrock model with real API call.
+        Responses are cached on (model, system prompt, prompt, generation params,
+        stream); pass use_cache=False to force a fresh call. Only responses that
+        were not cut off at max_tokens and pass cacheable(text), when given, are
+        stored, so a malformed answer is not replayed for the cache TTL.
+        Identical requests already in flight are joined rather than sent again,
+        cached or not.
+        stream=True reads the response incrementally and returns as soon as the
+        first top-level JSON object closes - only for callers expecting JSON.
+        prefix is sent ahead of the prompt as a separate, cacheable block; use it
+        for content shared by many requests (e.g. the transcript).
+        agent_name and task ("analysis", "nudge", ...) select the model tier
+        together with the input size; see ModelRouter.
+        priority ("live", "post_call", "backfill") sets the scheduling class for
+        limiter slots; defaults to the enclosing priority_scope, then
+        LLM_TASK_PRIORITIES[task]. See AdaptiveLimiter. Joining an in-flight
+        request with a more urgent class promotes it to that class.
+        schema (JSON Schema of the expected object) makes the model answer
+        through a forced tool call; the tool input is returned as JSON text.
+        toolset shares one tool list among requests with a common prefix.
+        No fallbacks - raises exception on failure.
+        """
+        logger.info("-" * 40)
+        logger.info(f"📨 LLM Request | Prompt: {len(prompt)} chars" + (f" + prefix {len(prefix)} chars" if prefix else ""))
+        
+        priority = resolve_priority(priority, task)
+        route, payload = self.build_payload(prompt, system_instruction, prefix, agent_name, task, schema, toolset)
+        if self.router.enabled:
+            logger.info(f"🧭 Route: {route.name} -> {route.tier} ({route.model_id})")
+        if system_instruction:
             logger.info(f"📋 System instruction: {len(system_instruction)} chars")
         
+        params = {k: v for k, v in payload.items() if k not in ("messages", "system")}
+        request_key = ResponseCache.make_key(route.model_id, system_instruction, prompt, params, prefix, stream)
+        write_cache = bool(self.cache and use_cache)
+        
+        if write_cache:
+            cached = await self.cache.get(request_key)
+            if cached is not None:
+                logger.info(f"⚡ Cache hit: {len(cached)} chars")
+                LLM_REQUESTS.inc(agent=agent_name, model=route.model_id, task=task, outcome="cache_hit")
+                return cached
+        
+        async def fetch(ticket: PriorityTicket) -> str:
+            completion = await self._invoke_uncached(payload, route, stream, agent_name, task, ticket)
+            if write_cache and not completion.truncated and (cacheable is None or cacheable(completion.text)):
+                await self.cache.set(request_key, completion.text)
+            elif write_cache:
+                reason = "cut off at max_tokens" if completion.truncated else "rejected by the caller's check"
+                logger.info(f"💾 Response not cached: {reason}")
+            return completion.text
+        
+        if self.single_flight:
+            return await self.single_flight.do(request_key, fetch, priority)
+        return await fetch(PriorityTicket(priority))
+
+    async def _invoke_uncached(
+        self,
+        payload: dict,
+        route: Route,
+        stream: bool = False,
+        agent_name: str = None,
+        task: str = None,
+        priority: Union[str, PriorityTicket, None] = None
+    ) -> Completion:
+        """
+        Send the payload to the route's model under the retry policy.
+        With an endpoint pool serving the route's tier, every attempt goes to
+        the pool's pick, avoiding endpoints this request already tried.
+        Raises CircuitOpenError without calling Bedrock while the model's
+        breaker (or every pool endpoint's) is open.
+        Tasks listed in LLM_HEDGE_TASKS are hedged; see Hedger.
+        Every attempt is cancelled at the enclosing deadline_scope's deadline,
+        and no retry is started that could not finish before it.
+        """
+        attempt = self._invoke_once_stream if stream else self._invoke_once
+        # With a shared toolset only this agent's tool call is its answer
+        tool = answer_tool(payload, agent_name or task)
+        if not isinstance(priority, PriorityTicket):
+            priority = PriorityTicket(resolve_priority(priority, task))
+        profile = None if task == "warmup" else self.profiles.get(agent_name, task)
+        pooled = bool(self.pool and self.pool.serves(route))
+        hedged = bool(self.hedger and task in settings.LLM_HEDGE_TASKS)
+        tried: Set[str] = set()
+        
+        async def attempt_on(target: Optional[Route] = None) -> Completion:
+            if target is None:
+                target = self.pool.select(route, avoid=tried) if pooled else route
+            tried.add(target.key)
+            target_payload = payload if target.model_id == route.model_id else self._retarget(payload, target.model_id)
+            attempt_started = time.monotonic()
+            try:
+                completion = await within(
+                    attempt(target_payload, target, agent_name, priority, profile, tool),
+                    label=f"Bedrock call ({agent_name or task})"
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if self.pool and classify_error(e) != "fatal":
+                    self.pool.record(target, False, time.monotonic() - attempt_started)
+                raise
+            elapsed = time.monotonic() - attempt_started
+            if self.pool:
+                self.pool.record(target, True, elapsed)
+            if hedged:
+                self.hedger.latencies.record(self._latency_key(route, stream), elapsed)
+            return completion
+        
+        def primary():
+            return self.retry_policy.run(attempt_on, label="BEDROCK")
+        
+        started = time.monotonic()
         try:
-            # Run in executor to avoid blocking
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.bedrock_client.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps(payload)
+            if not pooled:
+                self.breakers.check(route.key)
+            if hedged:
+                completion = await self.hedger.run(
+                    self._latency_key(route, stream),
+                    primary,
+                    # One attempt only: a failing hedge just leaves the primary running
+                    lambda: attempt_on(self._hedge_route(route, pooled)),
+                    is_valid=lambda completion: not completion.truncated and _has_json_object(completion.text)
                 )
-            )
-            
-            # Parse response
-            response_body = json.loads(response['body'].read())
-            response_text = response_body['content'][0]['text']
-            
-            logger.info(f"✅ Response received: {len(response_text)} chars")
-            
-            return response_text
-            
-        except self.bedrock_client.exceptions.ThrottlingException as e:
-            logger.warning(f"⏳ Throttled, retrying... {e}")
-            # Wait and retry once
-            await asyncio.sleep(2)
-            return await self._retry_invoke(payload)
-            
+            else:
+                completion = await primary()
+        except CircuitOpenError as e:
+            LLM_REQUESTS.inc(agent=agent_name, model=route.model_id, task=task, outcome="rejected")
+            logger.error(f"🔌 Bedrock call rejected: {e}")
+            raise
+        except DeadlineExceeded as e:
+            # The caller ran out of time; says nothing about the model's health
+            LLM_REQUESTS.inc(agent=agent_name, model=route.model_id, task=task, outcome="deadline")
+            logger.warning(f"⏰ Bedrock call abandoned: {e}")
+            raise
         except Exception as e:
+            self._record_call(route, time.monotonic() - started, False, agent_name, task)
             logger.error(f"❌ Bedrock invocation failed: {e}")
             raise RuntimeError(f"LLM invocation failed: {e}")
+        self._record_call(route, time.monotonic() - started, True, agent_name, task)
+        return completion
 
-    async def _retry_invoke(self, payload: dict) -> str:
-        """Single retry for throttled requests."""
-        try:
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.bedrock_client.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps(payload)
-                )
-            )
-            response_body = json.loads(response['body'].read())
-            return response_body['content'][0]['text']
-        except Exception as e:
-            logger.error(f"❌ Retry failed: {e}")
-            raise RuntimeError(f"LLM retry failed: {e}")
+    def _hedge_route(self, route: Route, pooled: bool = False) -> Optional[Route]:
+        """
+        Where a hedge for this route goes: LLM_HEDGE_MODEL_ID / LLM_HEDGE_REGION,
+        else the same target, or None to let the pool pick an untried endpoint.
+        """
+        if pooled and not (settings.LLM_HEDGE_MODEL_ID or settings.LLM_HEDGE_REGION):
+            return None
+        region = settings.LLM_HEDGE_REGION or route.region
+        return Route(
+            f"{route.name}:hedge",
+            route.tier,
+            settings.LLM_HEDGE_MODEL_ID or route.model_id,
+            None if region == self.region else region
+        )
+
+    def _retarget(self, payload: dict, model_id: str) -> dict:
+        """The payload for another model: cache points are dropped if it has no prompt caching."""
+        if self.supports_prompt_cache(model_id):
+            return payload
+        messages = []
+        for message in payload["messages"]:
+            content = message["content"]
+            if isinstance(content, list):
+                content = [{k: v for k, v in block.items() if k != "cache_control"} for block in content]
+            messages.append({**message, "content": content})
+        return {**payload, "messages": messages}
+
+    @staticmethod
+    def _latency_key(route: Route, stream: bool) -> str:
+        # Streamed calls stop at the closing brace, so they are tracked apart
+        return f"{route.key}:stream" if stream else route.key
+
+    def _record_call(self, route: Route, latency: float, ok: bool, agent_name: str = None, task: str = None):
+        self.router.record_call(route, latency, ok=ok)
+        LLM_REQUESTS.inc(agent=agent_name, model=route.model_id, task=task, outcome="ok" if ok else "error")
+        LLM_LATENCY.observe(latency, agent=agent_name, model=route.model_id)
+
+    def _record_output(self, usage: dict, profile: Optional[GenerationProfile]):
+        """Feeds a response's output size into its profile's stats, for tuning max_tokens."""
+        if profile is None or not usage.get("output_tokens"):
+            return
+        output_tokens = usage["output_tokens"]
+        self.profiles.record(profile, output_tokens)
+        LLM_OUTPUT_TOKENS.observe(output_tokens, profile=profile.name)
+        if output_tokens >= profile.max_tokens:
+            LLM_OUTPUT_CAPPED.inc(profile=profile.name)
+
+    async def _invoke_once(
+        self,
+        payload: dict,
+        route: Route,
+        agent_name: str = None,
+        priority: Optional[PriorityTicket] = None,
+        profile: Optional[GenerationProfile] = None,
+        tool: Optional[str] = None
+    ) -> Completion:
+        """Single Bedrock attempt."""
+        # The limiter bounds in-flight calls; the transport runs them on its own pool.
+        # The breaker only times the call itself, not the wait for a limiter slot.
+        # An abandoned call keeps its slot until its thread returns (hold_until).
+        async with self.limiters.slot(route.key, priority) as lease, self.breakers.guard(route.key):
+            LLM_QUEUE_WAIT.observe(lease.queue_wait, model=route.key, priority=priority.priority)
+            response_body = await self._transport(route).invoke(route.model_id, payload, hold=lease.hold_until)
+        
+        self._record_usage(response_body.get('usage', {}), route, agent_name)
+        self._record_output(response_body.get('usage', {}), profile)
+        # Tool input as JSON, or the text with any prefill put back in front
+        response_text = message_text(payload, response_body, tool)
+        
+        logger.info(f"✅ Response received: {len(response_text)} chars")
+        
+        return Completion(response_text, response_body.get("stop_reason") == "max_tokens")
+
+    async def _invoke_once_stream(
+        self,
+        payload: dict,
+        route: Route,
+        agent_name: str = None,
+        priority: Optional[PriorityTicket] = None,
+        profile: Optional[GenerationProfile] = None,
+        tool: Optional[str] = None
+    ) -> Completion:
+        """Single streaming Bedrock attempt that stops reading once the JSON object closes."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self.limiters.slot(route.key, priority) as lease, self.breakers.guard(route.key):
+            LLM_QUEUE_WAIT.observe(lease.queue_wait, model=route.key, priority=priority.priority)
+            response_text, closed_early, usage = await self._transport(route).invoke_stream_until_object(route.model_id, payload, hold=lease.hold_until, tool=tool)
+        
+        self._record_usage(usage, route, agent_name)
+        if not closed_early:
+            # Closed streams stop before the model finishes, so their sizes would skew the stats
+            self._record_output(usage, profile)
+        elapsed = loop.time() - started
+        if closed_early:
+            logger.info(f"✅ Streamed JSON object closed after {elapsed:.2f}s: {len(response_text)} chars")
+        else:
+            logger.warning(f"⚠️ Stream ended without a closed JSON object after {elapsed:.2f}s: {len(response_text)} chars")
+        # The stream's stop reason is not kept; reaching the cap without closing the object means it was cut off
+        truncated = not closed_early and (usage.get("output_tokens") or 0) >= payload.get("max_tokens", float("inf"))
+        return Completion(response_text, truncated)
+
+    def close(self):
+        """Release the transports' thread pools."""
+        for transport in self.transports.values():
+            transport.close()
 
 
 # Singleton instance
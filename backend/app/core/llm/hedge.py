@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.core.retry import RetryBudget
+
+logger = logging.getLogger("LLM_HEDGE")
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful calls per key, for percentile lookups."""
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.size)
+        samples.append(seconds)
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key) or ())
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None without samples."""
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+class Hedger:
+    """
+    Request hedging: if the primary call has not answered after the
+    `percentile`-th percentile of recent latency for its model, a duplicate
+    is sent and the first valid answer wins; the other call is cancelled.
+
+    Hedges are paid for from a token bucket that earns `budget_ratio` tokens
+    per hedge-eligible request, so they add at most that share of traffic.
+    The bucket starts empty: a fresh process earns its hedges before sending any.
+    No hedge is sent until `min_samples` latencies are known for the model,
+    nor earlier than `min_delay_seconds`.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_samples: int,
+        min_delay_seconds: float,
+        budget_ratio: float,
+        window: int = 200,
+    ):
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.min_delay_seconds = min_delay_seconds
+        self.latencies = LatencyTracker(window)
+        self.budget = RetryBudget(ratio=budget_ratio, min_per_second=0.0, max_tokens=10.0, initial_tokens=0.0)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging a call on `key`; None while there are too few samples."""
+        if self.latencies.count(key) < self.min_samples:
+            return None
+        return max(self.min_delay_seconds, self.latencies.percentile(key, self.percentile))
+
+    async def run(
+        self,
+        key: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        is_valid: Callable[[T], bool] = lambda result: True,
+    ) -> T:
+        """
+        Awaits primary(), starting hedge() if it is still running after delay(key).
+        Returns the first result that passes is_valid; if both calls fail, the
+        primary's error is raised.
+        """
+        self.requests += 1
+        self.budget.record_request()
+        delay = self.delay(key)
+        primary_task = asyncio.ensure_future(primary())
+        hedge_task = None
+        try:
+            if delay is None:
+                return await primary_task
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                return primary_task.result()
+            if not self.budget.try_spend():
+                self.budget_denied += 1
+                return await primary_task
+
+            self.hedged += 1
+            logger.info(f"🪞 [HEDGE] {key}: no answer after {delay:.2f}s, sending hedge")
+            hedge_task = asyncio.ensure_future(hedge())
+            pending = {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and is_valid(task.result()):
+                        if task is hedge_task:
+                            self.hedge_wins += 1
+                            logger.info(f"🪞 [HEDGE] {key}: hedge answered first")
+                        return task.result()
+                    logger.warning(f"⚠️ [HEDGE] {key}: {'hedge' if task is hedge_task else 'primary'} returned no valid answer")
+            if primary_task.exception() is not None:
+                raise primary_task.exception()
+            return primary_task.result()
+        finally:
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "budget": self.budget.stats(),
+        }
@@ -0,0 +1,146 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used without it
+    orjson = None
+
+logger = logging.getLogger("JSON_EXTRACT")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def loads(text: str) -> Any:
+    """json.loads via orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON text (UTF-8, not ASCII-escaped), via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+_DECODE_ERRORS: Tuple[type, ...] = (ValueError,) + ((orjson.JSONDecodeError,) if orjson is not None else ())
+
+
+class _Scan:
+    """
+    One pass over a candidate object: where it ends, trailing commas to drop,
+    and - if the text stops early - the brackets still open at each point
+    where the text could be cut cleanly.
+    """
+
+    def __init__(self, text: str, start: int):
+        self.end: Optional[int] = None
+        self.trailing_commas: List[int] = []
+        self.cut_points: List[Tuple[int, str]] = []
+        self.open_stack: List[str] = []
+        self.in_string = False
+        self._run(text, start)
+
+    def _run(self, text: str, start: int):
+        stack: List[str] = []
+        in_string = escape = False
+        last_comma = -1
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                continue
+            if ch == '"':
+                in_string = True
+                last_comma = -1
+            elif ch in "{[":
+                stack.append(ch)
+                last_comma = -1
+            elif ch in "}]":
+                if last_comma != -1:
+                    self.trailing_commas.append(last_comma)
+                    last_comma = -1
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self.end = i + 1
+                    return
+                # Cutting right after a closed value keeps everything before it
+                self.cut_points.append((i + 1, "".join(_CLOSERS[b] for b in reversed(stack))))
+            elif ch == ",":
+                last_comma = i
+                self.cut_points.append((i, "".join(_CLOSERS[b] for b in reversed(stack))))
+            elif not ch.isspace():
+                last_comma = -1
+        self.open_stack = stack
+        self.in_string = in_string
+
+
+def _without(text: str, positions: List[int]) -> str:
+    if not positions:
+        return text
+    parts, previous = [], 0
+    for position in positions:
+        parts.append(text[previous:position])
+        previous = position + 1
+    parts.append(text[previous:])
+    return "".join(parts)
+
+
+def extract_object(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    The first JSON object in a model response, or None.
+
+    Fast path: the text is the object itself (tool input, prefilled JSON).
+    Otherwise anything before the first "{" (markdown fences, preamble) and
+    after the object is ignored, trailing commas are dropped, and a
+    truncated object (max_tokens reached) is closed at the last complete
+    value.
+    """
+    if not text:
+        return None
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            value = loads(stripped)
+            if isinstance(value, dict):
+                return value
+        except _DECODE_ERRORS:
+            pass
+
+    start = text.find("{")
+    if start == -1:
+        return None
+    scan = _Scan(text, start)
+    if scan.end is not None:
+        candidate = text[start:scan.end]
+        try:
+            return loads(_without(candidate, [p - start for p in scan.trailing_commas]))
+        except _DECODE_ERRORS as e:
+            logger.warning(f"⚠️ [JSON] Object found but not parseable: {e}")
+            return None
+
+    # Truncated: close what is open, else back off to the last clean cut
+    tail = text[start:].rstrip()
+    if scan.in_string:
+        tail += '"'
+    attempts = [(len(text), tail.rstrip(","), "".join(_CLOSERS[b] for b in reversed(scan.open_stack)))]
+    attempts += [(position, text[start:position], closers) for position, closers in reversed(scan.cut_points[-8:])]
+    for position, body, closers in attempts:
+        body = _without(body, [p - start for p in scan.trailing_commas if p < position])
+        try:
+            value = loads(body + closers)
+        except _DECODE_ERRORS:
+            continue
+        if isinstance(value, dict):
+            logger.warning(f"⚠️ [JSON] Truncated object closed after {len(body)} chars")
+            return value
+    return None
@@ -0,0 +1,63 @@
+from typing import List, Optional
+
+
+class JSONObjectScanner:
+    """
+    Incremental scanner for the first top-level JSON object in a text stream.
+
+    Text before the first "{" (preamble, markdown fences) is skipped. Braces
+    inside strings and escaped quotes are tracked so feed() only returns once
+    the outermost object is actually closed; anything the model writes after
+    that is never read.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.result: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.result is not None
+
+    def feed(self, text: str) -> Optional[str]:
+        """Consumes a chunk; returns the object text once it closes, else None."""
+        if self.result is not None:
+            return self.result
+
+        start = 0
+        if not self._started:
+            start = text.find("{")
+            if start == -1:
+                return None
+            self._started = True
+
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[start:i + 1])
+                    self.result = "".join(self._parts)
+                    return self.result
+
+        self._parts.append(text[start:])
+        return None
+
+    def partial(self) -> str:
+        """Whatever has been collected so far, from the first "{" on."""
+        return "".join(self._parts)
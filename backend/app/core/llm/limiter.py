@@ -0,0 +1,295 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Union
+
+from app.core.llm.priority import PriorityTicket
+from app.core.retry import classify_error
+
+logger = logging.getLogger("LLM_LIMITER")
+
+def classify_overload(exc: BaseException) -> str:
+    """Maps an exception to a limiter outcome: "throttle", "timeout" or "error"."""
+    kind = classify_error(exc)
+    return kind if kind in ("throttle", "timeout") else "error"
+
+
+class Lease:
+    """
+    A granted limiter slot, yielded by AdaptiveLimiter.slot. A caller whose
+    blocking work outlives it (a worker thread that cannot be interrupted)
+    calls hold_until with that work's future, and the slot stays taken until
+    the future finishes instead of being freed when the caller gives up.
+    """
+
+    __slots__ = ("queue_wait", "priority", "held")
+
+    def __init__(self, queue_wait: float, priority: str):
+        self.queue_wait = queue_wait
+        self.priority = priority
+        self.held: Optional[concurrent.futures.Future] = None
+
+    def hold_until(self, future: concurrent.futures.Future):
+        self.held = future
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency window for one model.
+
+    Each healthy response (latency under target) grows the window by
+    increase/window, i.e. roughly +increase per full window of requests.
+    A throttle or timeout multiplies it by `decrease`, at most once per
+    `cooldown_seconds` so one burst of rejections counts as a single event.
+
+    Callers queue per priority class and free slots are handed out by
+    stride scheduling: each grant advances its class by 1/weight, and the
+    waiting class furthest behind goes next, so a class with weight 100
+    is served ~100x as often as one with weight 1 while both are queued.
+    `reservations` keeps that many slots per class free for it; other
+    classes can only use them while the owner does not need them.
+    A caller queued with a PriorityTicket moves to its new class's queue
+    when the ticket is promoted.
+    A slot whose Lease is held (see Lease.hold_until) counts as in flight
+    until the held work returns, so abandoned calls still bound concurrency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target_seconds: float,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown_seconds: float = 1.0,
+        weights: Optional[Dict[str, float]] = None,
+        reservations: Optional[Dict[str, int]] = None,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target_seconds = latency_target_seconds
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown_seconds = cooldown_seconds
+        self.weights = weights or {}
+        self.reservations = reservations or {}
+        self.in_flight = 0
+        self.in_flight_by_class: Dict[str, int] = {}
+        self.throttles = 0
+        self.timeouts = 0
+        self.held = 0
+        self._last_cut = 0.0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        # Stride scheduling state: per-class pass and the pass of the last grant
+        self._pass: Dict[str, float] = {}
+        self._virtual_time = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self.window))
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _can_admit(self, priority: str) -> bool:
+        if self.in_flight >= self.limit:
+            return False
+        # Unused reservations of other classes; at least one slot always stays shared
+        held = sum(
+            max(0, reserved - self.in_flight_by_class.get(cls, 0))
+            for cls, reserved in self.reservations.items() if cls != priority
+        )
+        return self.in_flight + min(held, self.limit - 1) < self.limit
+
+    def _grant(self, priority: str):
+        self.in_flight += 1
+        self.in_flight_by_class[priority] = self.in_flight_by_class.get(priority, 0) + 1
+        self._virtual_time = self._pass.get(priority, 0.0)
+        self._pass[priority] = self._virtual_time + 1.0 / max(self.weights.get(priority, 1.0), 1e-6)
+
+    def _dispatch(self):
+        """Hands free slots to queued callers, most-behind admissible class first."""
+        while True:
+            ready = [cls for cls, queue in self._queues.items() if queue and self._can_admit(cls)]
+            if not ready:
+                return
+            priority = min(ready, key=lambda cls: (self._pass.get(cls, 0.0), -self.weights.get(cls, 1.0)))
+            waiter = self._queues[priority].popleft()
+            if waiter.done():
+                continue
+            self._grant(priority)
+            waiter.set_result(priority)
+
+    def _enqueue(self, priority: str, waiter: asyncio.Future):
+        queue = self._queues.setdefault(priority, deque())
+        if not queue:
+            # A class returning from idle does not get credit for the time it was away
+            self._pass[priority] = max(self._pass.get(priority, 0.0), self._virtual_time)
+        queue.append(waiter)
+
+    async def acquire(self, priority: Union[str, PriorityTicket] = "default") -> str:
+        """Waits for a slot; returns the class it was granted under."""
+        ticket = priority if isinstance(priority, PriorityTicket) else None
+        queued_as = ticket.priority if ticket else priority
+        waiter = asyncio.get_running_loop().create_future()
+        self._enqueue(queued_as, waiter)
+
+        def promoted(new_priority: str):
+            nonlocal queued_as
+            queue = self._queues.get(queued_as)
+            if waiter.done() or queue is None or waiter not in queue:
+                return
+            queue.remove(waiter)
+            queued_as = new_priority
+            self._enqueue(new_priority, waiter)
+            self._dispatch()
+
+        stop_listening = ticket.listen(promoted) if ticket else None
+        self._dispatch()
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller was cancelled: hand the slot back
+                self._free(waiter.result())
+            else:
+                queue = self._queues.get(queued_as)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+            raise
+        finally:
+            if stop_listening:
+                stop_listening()
+
+    def _free(self, priority: str):
+        self.in_flight -= 1
+        self.in_flight_by_class[priority] -= 1
+        self._dispatch()
+
+    async def release(self, outcome: str, latency: float, priority: str = "default"):
+        self._release(outcome, latency, priority)
+
+    def _release(self, outcome: str, latency: float, priority: str):
+        try:
+            if outcome == "ok":
+                if latency <= self.latency_target_seconds:
+                    self.window = min(self.max_limit, self.window + self.increase / self.window)
+            elif outcome in ("throttle", "timeout"):
+                if outcome == "throttle":
+                    self.throttles += 1
+                else:
+                    self.timeouts += 1
+                now = time.monotonic()
+                if now - self._last_cut >= self.cooldown_seconds:
+                    self._last_cut = now
+                    previous = self.limit
+                    self.window = max(self.min_limit, self.window * self.decrease)
+                    logger.warning(f"📉 [LIMITER] {self.name}: {outcome}, window {previous} -> {self.limit}")
+        finally:
+            self._free(priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: Union[str, PriorityTicket] = "default"):
+        """
+        Holds one in-flight slot and feeds the outcome back into the window.
+        Yields the slot's Lease; a held lease is released when its work returns.
+        """
+        queued = time.monotonic()
+        priority = await self.acquire(priority)
+        started = time.monotonic()
+        lease = Lease(started - queued, priority)
+        outcome = "error"
+        try:
+            yield lease
+            outcome = "ok"
+        except BaseException as e:
+            outcome = classify_overload(e)
+            raise
+        finally:
+            if lease.held is not None and not lease.held.done():
+                self._hold(lease.held, outcome, started, priority)
+            else:
+                await self.release(outcome, time.monotonic() - started, priority)
+
+    def _hold(self, work: concurrent.futures.Future, outcome: str, started: float, priority: str):
+        """Keeps a slot taken until work (running on another thread) finishes."""
+        loop = asyncio.get_running_loop()
+        self.held += 1
+
+        def returned():
+            self.held -= 1
+            self._release(outcome, time.monotonic() - started, priority)
+
+        def done(_):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(returned)
+
+        work.add_done_callback(done)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "throttles": self.throttles,
+            "timeouts": self.timeouts,
+            "held": self.held,
+            "classes": {
+                cls: {"in_flight": self.in_flight_by_class.get(cls, 0), "waiting": len(self._queues.get(cls) or ())}
+                for cls in sorted(set(self.in_flight_by_class) | set(self._queues))
+            },
+        }
+
+
+class LimiterRegistry:
+    """One AdaptiveLimiter per model id, with optional per-model max limits and shared class weights."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target_seconds: float,
+        model_max_limits: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        reservations: Optional[Dict[str, int]] = None,
+    ):
+        self.weights = weights or {}
+        self.reservations = reservations or {}
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_seconds = latency_target_seconds
+        self.model_max_limits = model_max_limits or {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def get(self, model_id: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(model_id)
+        if limiter is None:
+            max_limit = self.model_max_limits.get(model_id, self.max_limit)
+            limiter = AdaptiveLimiter(
+                model_id,
+                initial=min(self.initial, max_limit),
+                min_limit=self.min_limit,
+                max_limit=max_limit,
+                latency_target_seconds=self.latency_target_seconds,
+                weights=self.weights,
+                reservations=self.reservations,
+            )
+            self._limiters[model_id] = limiter
+        return limiter
+
+    def slot(self, model_id: str, priority: Union[str, PriorityTicket] = "default"):
+        return self.get(model_id).slot(priority)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {model_id: limiter.snapshot() for model_id, limiter in self._limiters.items()}
@@ -0,0 +1,170 @@
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.llm.breaker import BreakerRegistry, CircuitOpenError
+from app.core.llm.limiter import LimiterRegistry
+from app.core.llm.router import Route
+
+logger = logging.getLogger("LLM_POOL")
+
+
+class Endpoint:
+    """One region + model pair serving a tier, with its weight and health."""
+
+    def __init__(
+        self,
+        region: str,
+        model_id: str,
+        tier: str = "standard",
+        weight: float = 1.0,
+        max_concurrency: Optional[int] = None,
+        default_region: Optional[str] = None,
+    ):
+        self.region = region
+        self.model_id = model_id
+        self.tier = tier
+        self.weight = max(0.0, weight)
+        self.max_concurrency = max_concurrency
+        # The gateway's own region is left implicit so keys match non-pooled routes
+        self.route_region = None if region == default_region else region
+        # EWMAs: success (1 ok / 0 failed) and latency of successful calls
+        self.success = 1.0
+        self.latency: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def route(self, name: str) -> Route:
+        return Route(name, self.tier, self.model_id, self.route_region)
+
+    @property
+    def key(self) -> str:
+        return self.route("").key
+
+    def health(self, latency_target_seconds: float) -> float:
+        """0..1: success rate, scaled down when latency runs over target."""
+        latency_factor = 1.0
+        if self.latency and self.latency > latency_target_seconds:
+            latency_factor = latency_target_seconds / self.latency
+        return self.success * latency_factor
+
+
+class EndpointPool:
+    """
+    Bedrock endpoints (region + model) per routing tier.
+
+    For every attempt the pool picks among the tier's endpoints whose
+    circuit breaker lets calls through: endpoints with a free limiter slot
+    are drawn at random weighted by weight x health; if all are saturated,
+    the one with the shortest queue relative to its limit wins. Endpoints
+    already tried by the request are avoided while others remain, so
+    retries fail over to another region or model.
+
+    Ejection and reinstatement are the circuit breaker's: an endpoint
+    whose breaker opens receives no traffic until its probes succeed.
+    Health (EWMA of success and latency) only shifts the weights.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Dict[str, Any]],
+        default_region: str,
+        limiters: LimiterRegistry,
+        breakers: BreakerRegistry,
+        latency_target_seconds: float,
+        alpha: float = 0.2,
+    ):
+        self.limiters = limiters
+        self.breakers = breakers
+        self.latency_target_seconds = latency_target_seconds
+        self.alpha = alpha
+        self._random = random.Random()
+        self.endpoints: List[Endpoint] = []
+        for spec in endpoints:
+            endpoint = Endpoint(
+                region=spec.get("region", default_region),
+                model_id=spec["model_id"],
+                tier=spec.get("tier", "standard"),
+                weight=float(spec.get("weight", 1.0)),
+                max_concurrency=spec.get("max_concurrency"),
+                default_region=default_region,
+            )
+            if endpoint.max_concurrency:
+                limiters.model_max_limits[endpoint.key] = int(endpoint.max_concurrency)
+            self.endpoints.append(endpoint)
+        self._by_key = {e.key: e for e in self.endpoints}
+
+    @property
+    def regions(self) -> Set[str]:
+        return {e.region for e in self.endpoints}
+
+    def candidates(self, route: Route) -> List[Endpoint]:
+        return [e for e in self.endpoints if e.tier == route.tier and e.weight > 0]
+
+    def serves(self, route: Route) -> bool:
+        return bool(self.candidates(route))
+
+    def available(self, route: Route) -> bool:
+        """Whether any endpoint for the route's tier is taking calls."""
+        return any(self.breakers.allows(e.key) for e in self.candidates(route))
+
+    def select(self, route: Route, avoid: Optional[Set[str]] = None) -> Route:
+        """
+        The route to use for the next attempt. Routes for tiers without pool
+        endpoints are returned unchanged. Raises CircuitOpenError when every
+        endpoint of the tier is ejected.
+        """
+        candidates = self.candidates(route)
+        if not candidates:
+            return route
+        eligible = [e for e in candidates if self.breakers.allows(e.key)]
+        if not eligible:
+            raise CircuitOpenError(f"{route.tier} pool ({len(candidates)} endpoints)", 0.0)
+        if avoid:
+            eligible = [e for e in eligible if e.key not in avoid] or eligible
+
+        free = []
+        for endpoint in eligible:
+            limiter = self.limiters.get(endpoint.key)
+            if limiter.in_flight < limiter.limit:
+                free.append(endpoint)
+        if free:
+            weights = [max(0.01, e.weight * e.health(self.latency_target_seconds)) for e in free]
+            chosen = self._random.choices(free, weights=weights)[0]
+        else:
+            def pressure(endpoint: Endpoint) -> float:
+                limiter = self.limiters.get(endpoint.key)
+                return (limiter.in_flight + limiter.waiting) / (limiter.limit * max(endpoint.weight, 0.01))
+            chosen = min(eligible, key=pressure)
+        return chosen.route(route.name)
+
+    def record(self, route: Route, ok: bool, latency: float):
+        """Feeds an attempt's outcome into the endpoint's health."""
+        endpoint = self._by_key.get(route.key)
+        if endpoint is None:
+            return
+        endpoint.calls += 1
+        endpoint.success += self.alpha * ((1.0 if ok else 0.0) - endpoint.success)
+        if ok:
+            endpoint.latency = latency if endpoint.latency is None else endpoint.latency + self.alpha * (latency - endpoint.latency)
+        else:
+            endpoint.failures += 1
+            endpoint.last_failure = time.time()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            e.key: {
+                "region": e.region,
+                "model_id": e.model_id,
+                "tier": e.tier,
+                "weight": e.weight,
+                "health": round(e.health(self.latency_target_seconds), 3),
+                "latency_ewma": round(e.latency, 3) if e.latency is not None else None,
+                "calls": e.calls,
+                "failures": e.failures,
+                "available": self.breakers.allows(e.key),
+            }
+            for e in self.endpoints
+        }
@@ -0,0 +1,71 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger("LLM_PRIORITY")
+
+# Scheduling classes, most urgent first
+LIVE, POST_CALL, BACKFILL = "live", "post_call", "backfill"
+PRIORITY_CLASSES = (LIVE, POST_CALL, BACKFILL)
+
+_current_priority: ContextVar[Optional[str]] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def priority_scope(priority: Optional[str]):
+    """
+    Sets the priority class for every LLM request made inside the block,
+    including tasks started from it (asyncio copies the context).
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def more_urgent(priority: str, than: str) -> bool:
+    """Whether class `priority` is served ahead of class `than`."""
+    return PRIORITY_CLASSES.index(priority) < PRIORITY_CLASSES.index(than)
+
+
+class PriorityTicket:
+    """
+    The priority class of one gateway request, which can be raised while the
+    request waits: when a more urgent caller joins a coalesced request (see
+    SingleFlight), the shared call moves up to that caller's class. Listeners,
+    e.g. a limiter queue entry, are told about every raise.
+    """
+
+    __slots__ = ("priority", "_listeners")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self._listeners: List[Callable[[str], None]] = []
+
+    def promote(self, priority: str) -> bool:
+        """Raises the class to `priority` if that is more urgent; returns whether it changed."""
+        if not more_urgent(priority, self.priority):
+            return False
+        logger.info(f"⏫ [PRIORITY] Request promoted {self.priority} -> {priority}")
+        self.priority = priority
+        for listener in list(self._listeners):
+            listener(priority)
+        return True
+
+    def listen(self, listener: Callable[[str], None]) -> Callable[[], None]:
+        """Calls listener(new_class) on every promotion; returns a function that stops it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+
+def resolve_priority(priority: Optional[str] = None, task: Optional[str] = None) -> str:
+    """Explicit priority, else the enclosing priority_scope, else LLM_TASK_PRIORITIES[task], else post_call."""
+    resolved = priority or _current_priority.get() or settings.LLM_TASK_PRIORITIES.get(task or "") or POST_CALL
+    if resolved not in PRIORITY_CLASSES:
+        logger.warning(f"⚠️ [PRIORITY] Unknown class '{resolved}', using {POST_CALL}")
+        return POST_CALL
+    return resolved
@@ -0,0 +1,172 @@
+import logging
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger("LLM_PROFILES")
+
+JSON_PREFILL = "{"
+
+
+class GenerationProfile:
+    """
+    Generation parameters for one agent or task: output cap, temperature,
+    stop sequences and an optional assistant prefill. With prefill "{" the
+    model starts inside the JSON object instead of writing a preamble; the
+    gateway puts the prefill back in front of the response text.
+    Prefill and stop sequences only shape free-text answers: a forced tool
+    call (structured output) gets just the output cap and temperature.
+    """
+
+    __slots__ = ("name", "max_tokens", "temperature", "stop_sequences", "prefill")
+
+    def __init__(
+        self,
+        name: str,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+        stop_sequences: Optional[List[str]] = None,
+        prefill: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stop_sequences = list(stop_sequences or [])
+        self.prefill = prefill or None
+
+    def apply(self, payload: Dict[str, Any], tool_call: bool = False) -> Dict[str, Any]:
+        """
+        Sets this profile's parameters on a Messages payload, appending the
+        prefill turn. With tool_call the answer is tool input, which neither
+        a prefill nor stop sequences apply to, so both are left out.
+        """
+        payload["max_tokens"] = self.max_tokens
+        payload["temperature"] = self.temperature
+        if tool_call:
+            return payload
+        if self.stop_sequences:
+            payload["stop_sequences"] = list(self.stop_sequences)
+        if self.prefill:
+            payload["messages"].append({"role": "assistant", "content": self.prefill})
+        return payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stop_sequences": self.stop_sequences,
+            "prefill": self.prefill,
+        }
+
+
+def default_profiles() -> Dict[str, Dict[str, Any]]:
+    """
+    Built-in profiles keyed by agent name or task. Caps sit well above the
+    measured output of each agent's schema; "default" keeps the previous
+    4096-token, no-prefill behaviour for callers without a profile.
+    A stop at a markdown fence only makes sense once the prefill has
+    opened the object, so it is set together with it. With
+    LLM_STRUCTURED_OUTPUT on, agents with an output schema answer through
+    a tool call and only use the caps and temperatures; prefill and stops
+    then only shape nudges.
+    """
+    json_agent = {"temperature": 0.2, "stop_sequences": ["```"], "prefill": JSON_PREFILL}
+    return {
+        "default": {"max_tokens": 4096, "temperature": 0.2},
+        "SentimentTrajectoryAgent": {**json_agent, "max_tokens": 1024},
+        "SOPComplianceAgent": {**json_agent, "max_tokens": 1536},
+        "RiskDetectionAgent": {**json_agent, "max_tokens": 768},
+        "QAScoringAgent": {**json_agent, "max_tokens": 768},
+        "CoachingAgent": {**json_agent, "max_tokens": 1024},
+        "FusedAnalysisAgent": {**json_agent, "max_tokens": 4096},
+        "nudge": {**json_agent, "max_tokens": 256},
+    }
+
+
+def assistant_prefill(payload: Dict[str, Any]) -> str:
+    """Text of a trailing assistant turn (the prefill) in a Messages payload, else ""."""
+    messages = payload.get("messages") or []
+    if messages and messages[-1].get("role") == "assistant":
+        content = messages[-1].get("content")
+        if isinstance(content, str):
+            return content
+        return "".join(block.get("text", "") for block in content or [])
+    return ""
+
+
+class OutputSizes:
+    """Output token counts of the last `size` calls per profile, for tuning the caps."""
+
+    def __init__(self, size: int = 500):
+        self.size = size
+        self.calls: Dict[str, int] = {}
+        self.capped: Dict[str, int] = {}
+        self._samples: Dict[str, Deque[int]] = {}
+
+    def record(self, name: str, output_tokens: int, max_tokens: int):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.size)
+        samples.append(output_tokens)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if output_tokens >= max_tokens:
+            # Hit the cap: the JSON is most likely cut off
+            self.capped[name] = self.capped.get(name, 0) + 1
+            logger.warning(f"✂️ [PROFILES] {name}: output reached max_tokens={max_tokens}")
+
+    def percentile(self, name: str, pct: float) -> Optional[int]:
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered)))) - 1]
+
+    def summary(self, name: str) -> Dict[str, Any]:
+        samples = self._samples.get(name) or ()
+        return {
+            "calls": self.calls.get(name, 0),
+            "capped": self.capped.get(name, 0),
+            "p50": self.percentile(name, 50),
+            "p95": self.percentile(name, 95),
+            "p99": self.percentile(name, 99),
+            "max": max(samples) if samples else None,
+        }
+
+
+class ProfileRegistry:
+    """
+    Generation profiles by agent name, falling back to the task, then to
+    "default". Overrides (e.g. LLM_GENERATION_PROFILES) are merged field by
+    field onto the built-in profiles.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None, prefill_enabled: bool = True):
+        specs = default_profiles()
+        for name, fields in (overrides or {}).items():
+            specs[name] = {**specs.get(name, specs["default"]), **fields}
+        if not prefill_enabled:
+            for spec in specs.values():
+                spec.pop("prefill", None)
+                spec.pop("stop_sequences", None)
+        self.profiles = {name: GenerationProfile(name, **spec) for name, spec in specs.items()}
+        self.outputs = OutputSizes()
+
+    def get(self, agent_name: Optional[str] = None, task: Optional[str] = None) -> GenerationProfile:
+        return self.profiles.get(agent_name or "") or self.profiles.get(task or "") or self.profiles["default"]
+
+    def record(self, profile: GenerationProfile, output_tokens: int):
+        self.outputs.record(profile.name, output_tokens, profile.max_tokens)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per profile: its settings and the measured output sizes, with a suggested cap."""
+        result = {}
+        for name, profile in self.profiles.items():
+            outputs = self.outputs.summary(name)
+            p99 = outputs["p99"]
+            result[name] = {
+                **profile.to_dict(),
+                "output_tokens": outputs,
+                # 25% headroom over the observed p99
+                "suggested_max_tokens": int(math.ceil(p99 * 1.25 / 64) * 64) if p99 else None,
+            }
+        return result
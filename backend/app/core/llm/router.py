@@ -0,0 +1,176 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("LLM_ROUTER")
+
+# USD per 1K (input, output) tokens, by model id fragment. Overridable via LLM_MODEL_PRICES.
+DEFAULT_MODEL_PRICES: Dict[str, List[float]] = {
+    "claude-3-haiku": [0.00025, 0.00125],
+    "claude-3-5-haiku": [0.0008, 0.004],
+    "claude-3-sonnet": [0.003, 0.015],
+    "claude-3-5-sonnet": [0.003, 0.015],
+    "claude-3-7-sonnet": [0.003, 0.015],
+    "claude-sonnet-4": [0.003, 0.015],
+    "claude-3-opus": [0.015, 0.075],
+}
+
+
+def default_rules(short_tokens: int, long_tokens: int) -> List[Dict[str, Any]]:
+    """
+    Built-in routing rules, first match wins:
+    live nudges and short calls go to the fast tier, risk analysis and long
+    calls to the large tier, everything else to the standard model.
+    """
+    return [
+        {"name": "nudge", "tasks": ["nudge"], "tier": "fast"},
+        {"name": "risk", "agents": ["RiskDetectionAgent"], "tier": "large"},
+        {"name": "long_call", "min_tokens": long_tokens, "tier": "large"},
+        {"name": "short_call", "max_tokens": short_tokens, "tier": "fast"},
+    ]
+
+
+class Route:
+    """
+    Outcome of a routing decision: the matched rule, its tier and the model id.
+    region is None for the gateway's own region.
+    """
+
+    __slots__ = ("name", "tier", "model_id", "region")
+
+    def __init__(self, name: str, tier: str, model_id: str, region: Optional[str] = None):
+        self.name = name
+        self.tier = tier
+        self.model_id = model_id
+        self.region = region
+
+    @property
+    def key(self) -> str:
+        """Limiter/breaker key: the model id, qualified by region when not the default one."""
+        return f"{self.region}/{self.model_id}" if self.region else self.model_id
+
+    def __repr__(self) -> str:
+        return f"Route({self.name} -> {self.tier}: {self.key})"
+
+
+class RouteStats:
+    """Calls, latency, tokens and estimated cost for one route."""
+
+    def __init__(self, route: Route):
+        self.tier = route.tier
+        self.model_id = route.model_id
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "model_id": self.model_id,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency_seconds": round(self.total_latency / self.calls, 3) if self.calls else 0.0,
+            "max_latency_seconds": round(self.max_latency, 3),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class ModelRouter:
+    """
+    Maps (agent name, task, input token size) to a model tier.
+
+    Rules are dicts checked in order; every condition present must hold:
+      agents     - list of agent names
+      tasks      - list of task types ("analysis", "nudge", ...)
+      min_tokens - input size at least this many tokens
+      max_tokens - input size at most this many tokens
+    The first matching rule's "tier" is looked up in `tiers`. With routing
+    disabled, or when nothing matches, the "standard" tier is used.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, str],
+        rules: List[Dict[str, Any]],
+        enabled: bool = True,
+        prices: Optional[Dict[str, List[float]]] = None
+    ):
+        self.tiers = tiers
+        self.rules = rules
+        self.enabled = enabled
+        self.prices = {**DEFAULT_MODEL_PRICES, **(prices or {})}
+        self._stats: Dict[str, RouteStats] = {}
+
+    def _default(self) -> Route:
+        return Route("default", "standard", self.tiers["standard"])
+
+    @staticmethod
+    def _matches(rule: Dict[str, Any], agent_name: Optional[str], task: Optional[str], tokens: int) -> bool:
+        if "agents" in rule and agent_name not in rule["agents"]:
+            return False
+        if "tasks" in rule and task not in rule["tasks"]:
+            return False
+        if "min_tokens" in rule and tokens < rule["min_tokens"]:
+            return False
+        if "max_tokens" in rule and tokens > rule["max_tokens"]:
+            return False
+        return True
+
+    def select(self, agent_name: Optional[str] = None, task: Optional[str] = None, tokens: int = 0) -> Route:
+        if not self.enabled:
+            return self._default()
+        for rule in self.rules:
+            if not self._matches(rule, agent_name, task, tokens):
+                continue
+            tier = rule.get("tier", "standard")
+            model_id = self.tiers.get(tier)
+            if not model_id:
+                logger.warning(f"⚠️ [ROUTER] Rule '{rule.get('name')}' targets unknown tier '{tier}', skipping")
+                continue
+            return Route(rule.get("name", tier), tier, model_id)
+        return self._default()
+
+    def _route_stats(self, route: Route) -> RouteStats:
+        stats = self._stats.get(route.name)
+        if stats is None:
+            stats = self._stats[route.name] = RouteStats(route)
+        return stats
+
+    def price(self, model_id: str) -> Optional[List[float]]:
+        """(input, output) USD per 1K tokens; the longest matching fragment wins."""
+        matches = [key for key in self.prices if key in model_id]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def record_call(self, route: Route, latency_seconds: float, ok: bool):
+        stats = self._route_stats(route)
+        stats.calls += 1
+        if not ok:
+            stats.errors += 1
+        stats.total_latency += latency_seconds
+        stats.max_latency = max(stats.max_latency, latency_seconds)
+
+    def record_usage(self, route: Route, usage: Dict[str, int]):
+        stats = self._route_stats(route)
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        input_tokens = (usage.get("input_tokens") or 0) + cache_read + cache_write
+        output_tokens = usage.get("output_tokens") or 0
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        price = self.price(route.model_id)
+        if price:
+            # Prompt-cache reads bill at 10% of the input price, writes at 125%
+            billed_input = input_tokens - cache_read - cache_write + 0.1 * cache_read + 1.25 * cache_write
+            stats.cost_usd += billed_input / 1000 * price[0] + output_tokens / 1000 * price[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "tiers": dict(self.tiers),
+            "routes": {name: s.stats() for name, s in self._stats.items()},
+        }
@@ -0,0 +1,171 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.llm.json_extract import dumps
+from app.core.llm.profiles import assistant_prefill
+
+logger = logging.getLogger("LLM_SCHEMA")
+
+# Python types per JSON Schema type; bool is not an integer here
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+class SchemaIssue:
+    """One schema violation: where (path of keys/indexes) and what."""
+
+    __slots__ = ("path", "message")
+
+    def __init__(self, path: Tuple[Any, ...], message: str):
+        self.path = path
+        self.message = message
+
+    @property
+    def field(self) -> Optional[str]:
+        """Top-level field the issue is in, or None for the document itself."""
+        return self.path[0] if self.path else None
+
+    def __str__(self) -> str:
+        location = ".".join(str(p) for p in self.path) or "<root>"
+        return f"{location}: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"SchemaIssue({self})"
+
+
+def _type_ok(value: Any, expected: str) -> bool:
+    if expected == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if expected == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _TYPES.get(expected, object))
+
+
+def validate(instance: Any, schema: Dict[str, Any], path: Tuple[Any, ...] = ()) -> List[SchemaIssue]:
+    """
+    Checks instance against the JSON Schema subset our agent schemas use:
+    type, enum, minimum/maximum, required/properties and items.
+    Returns every issue found, empty when valid.
+    """
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_type_ok(instance, t) for t in types):
+            return [SchemaIssue(path, f"expected {' or '.join(types)}, got {type(instance).__name__}")]
+
+    issues = []
+    if "enum" in schema and instance not in schema["enum"]:
+        issues.append(SchemaIssue(path, f"{instance!r} is not one of {schema['enum']}"))
+    if isinstance(instance, (int, float)) and not isinstance(instance, bool):
+        if "minimum" in schema and instance < schema["minimum"]:
+            issues.append(SchemaIssue(path, f"{instance} is below the minimum {schema['minimum']}"))
+        if "maximum" in schema and instance > schema["maximum"]:
+            issues.append(SchemaIssue(path, f"{instance} is above the maximum {schema['maximum']}"))
+    if isinstance(instance, dict):
+        for name in schema.get("required", []):
+            if name not in instance:
+                issues.append(SchemaIssue(path + (name,), "is required"))
+        for name, subschema in (schema.get("properties") or {}).items():
+            if name in instance:
+                issues.extend(validate(instance[name], subschema, path + (name,)))
+    if isinstance(instance, list) and "items" in schema:
+        for i, item in enumerate(instance):
+            issues.extend(validate(item, schema["items"], path + (i,)))
+    return issues
+
+
+def field_schema(schema: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """An object schema with only the given top-level fields, all required (for repair prompts)."""
+    properties = schema.get("properties") or {}
+    return {
+        "type": "object",
+        "properties": {name: properties[name] for name in fields if name in properties},
+        "required": [name for name in fields if name in properties],
+    }
+
+
+def tool_name(name: Optional[str]) -> str:
+    """Tool names allow letters, digits, _ and - only."""
+    cleaned = "".join(ch if ch.isalnum() or ch in "_-" else "_" for ch in (name or "result"))
+    return f"record_{cleaned}"[:64]
+
+
+def _tool(name: Optional[str], schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": tool_name(name),
+        "description": "Record the analysis result. The input must follow the schema exactly.",
+        "input_schema": schema,
+    }
+
+
+def shared_tools(toolset: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tool definitions for a toolset (name -> schema), in a stable order."""
+    return [_tool(name, schema) for name, schema in sorted(toolset.items())]
+
+
+def _append_text(payload: Dict[str, Any], text: str):
+    """Adds text to the end of the last user turn."""
+    message = payload["messages"][-1]
+    if isinstance(message["content"], str):
+        message["content"] = f"{message['content']}\n\n{text}"
+    else:
+        message["content"] = message["content"] + [{"type": "text", "text": text}]
+
+
+def force_tool(
+    payload: Dict[str, Any],
+    schema: Dict[str, Any],
+    name: Optional[str] = None,
+    toolset: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Turns a Messages payload into a forced tool call whose input must follow
+    schema, so the model answers with a JSON object instead of free text.
+    A JSON prefill and stop sequences do not apply to tool input and are dropped.
+    With a toolset (name -> schema, including this one) every tool in it is
+    offered with tool_choice "any" and the prompt names the tool to call.
+    Requests of different agents then carry the same tools and tool_choice,
+    which come first in Bedrock's prompt-cache prefix (tools -> system ->
+    messages), so a shared transcript block can be read from cache across them.
+    """
+    if assistant_prefill(payload):
+        payload["messages"] = payload["messages"][:-1]
+    payload.pop("stop_sequences", None)
+    tool = tool_name(name)
+    if toolset:
+        payload["tools"] = shared_tools(toolset)
+        payload["tool_choice"] = {"type": "any"}
+        _append_text(payload, f"Record your answer by calling the {tool} tool.")
+        return payload
+    payload["tools"] = [_tool(name, schema)]
+    payload["tool_choice"] = {"type": "tool", "name": tool}
+    return payload
+
+
+def answer_tool(payload: Dict[str, Any], name: Optional[str]) -> Optional[str]:
+    """The tool a payload built by force_tool for name expects the answer in; None for free text."""
+    return tool_name(name) if payload.get("tools") else None
+
+
+def response_text(payload: Dict[str, Any], body: Dict[str, Any], tool: Optional[str] = None) -> str:
+    """
+    Text of a Messages API response body: a forced tool call's input as JSON,
+    else the text blocks behind any assistant prefill of the request.
+    With a shared toolset the model may call another agent's tool; only a
+    call to tool (see answer_tool) counts, and calls to others alone give ""
+    so the caller sees no answer and repairs it.
+    """
+    content = body.get("content") or []
+    calls = [block for block in content if block.get("type") == "tool_use"]
+    for block in calls:
+        if tool is None or block.get("name") == tool:
+            return dumps(block.get("input") or {})
+    if calls:
+        logger.warning(f"⚠️ Expected a {tool} call, got {[block.get('name') for block in calls]}")
+        return ""
+    return assistant_prefill(payload) + "".join(block.get("text", "") for block in content if block.get("type", "text") == "text")
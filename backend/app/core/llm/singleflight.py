@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.deadline import DeadlineExceeded, remaining, within
+from app.core.llm.priority import PriorityTicket
+
+logger = logging.getLogger("LLM_SINGLEFLIGHT")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests: the first caller for a key starts
+    the work, later callers with the same key await the same task instead of
+    issuing their own. The key is forgotten as soon as the task finishes, so
+    this never serves stale results - that is the cache's job.
+
+    The shared call runs with a PriorityTicket: a caller joining with a more
+    urgent class promotes it. Each caller waits under its own deadline; one
+    whose deadline is looser than the leader's, when the leader's cuts the
+    shared call short, starts a call of its own instead of failing with it.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._tickets: Dict[str, PriorityTicket] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.promoted = 0
+
+    async def do(self, key: str, fn: Callable[[PriorityTicket], Awaitable[Any]], priority: str) -> Any:
+        """Runs fn(ticket) once per key among concurrent callers; every caller gets its result."""
+        task = self._in_flight.get(key)
+        if task is None:
+            ticket = PriorityTicket(priority)
+            task = asyncio.ensure_future(fn(ticket))
+            self._in_flight[key] = task
+            self._tickets[key] = ticket
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"🔗 [SINGLEFLIGHT] Joined in-flight request ({self.coalesced} coalesced so far)")
+            if self._tickets[key].promote(priority):
+                self.promoted += 1
+        try:
+            # Shielded so one caller being cancelled does not cancel the shared call
+            return await within(asyncio.shield(task), label="Coalesced LLM request")
+        except DeadlineExceeded:
+            left = remaining()
+            if not task.done() or (left is not None and left <= 0):
+                raise
+            # The shared call ran out of the leader's time, not this caller's
+            logger.info("🔗 [SINGLEFLIGHT] Shared call hit another caller's deadline, retrying with this one's")
+            return await self.do(key, fn, priority)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            del self._tickets[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "promoted": self.promoted,
+            "in_flight": len(self._in_flight),
+        }
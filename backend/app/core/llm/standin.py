@@ -0,0 +1,479 @@
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.core.llm.profiles import assistant_prefill
+from app.core.llm.tokens import estimate_tokens
+
+logger = logging.getLogger("BEDROCK_STANDIN")
+
+NEGATIVE_WORDS = ["angry", "frustrated", "unacceptable", "problem", "issue", "complaint", "wrong", "damaged", "hate", "terrible", "worst"]
+POSITIVE_WORDS = ["thank", "resolved", "happy", "great", "excellent", "appreciate", "perfect", "helpful", "wonderful"]
+RISK_WORDS = {
+    "Churn": ["cancel", "leave", "competitor", "switch provider", "close account", "close my account"],
+    "Legal": ["lawsuit", "lawyer", "attorney", "sue", "court", "legal action"],
+    "Compliance": ["damn", "threat", "data breach", "harass"],
+}
+
+_RUNNING_AS = re.compile(r"You are running as: (\w+)")
+_FENCED = re.compile(r"---\n(.*?)\n---", re.DOTALL)
+_TRANSCRIPT_BLOCK = re.compile(r"TRANSCRIPT:\n(.*?)\n\n(?:For each step|TASK:)", re.DOTALL)
+_SOP_STEPS = re.compile(r"REQUIRED SOP STEPS:\n((?:- .*\n?)+)")
+_SNIPPET = re.compile(r'said: "(.*?)"', re.DOTALL)
+
+
+def _text_of(payload: Dict[str, Any]) -> str:
+    """System prompt plus every text block of the user message."""
+    parts = [payload.get("system") or ""]
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content or [])
+    return "\n".join(parts)
+
+
+def _forced_tool(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Name of the tool the request forces the model to call, if any. With
+    tool_choice "any" the model calls the tool the prompt names.
+    """
+    choice = payload.get("tool_choice") or {}
+    if choice.get("type") == "tool":
+        return choice.get("name")
+    if choice.get("type") == "any":
+        tools = [tool["name"] for tool in payload.get("tools") or []]
+        text = _text_of(payload)
+        return next((name for name in tools if name in text), tools[0] if tools else None)
+    return None
+
+
+class StandInResponder:
+    """
+    Deterministic, schema-correct answers for the specialized agents, the
+    fused agent and live nudges. The agent is identified by the
+    "You are running as: <name>" line every agent prompt carries; scores are
+    derived from simple keyword counts so different transcripts give
+    different, plausible results.
+    """
+
+    def agent_of(self, text: str) -> Optional[str]:
+        match = _RUNNING_AS.search(text)
+        if match:
+            return match.group(1)
+        if "nudge_needed" in text:
+            return "Nudge"
+        return None
+
+    @staticmethod
+    def transcript_of(text: str) -> str:
+        for pattern in (_FENCED, _TRANSCRIPT_BLOCK, _SNIPPET):
+            match = pattern.search(text)
+            if match:
+                return match.group(1)
+        return text
+
+    @staticmethod
+    def _sentiment_score(text: str) -> int:
+        lowered = text.lower()
+        negative = sum(lowered.count(w) for w in NEGATIVE_WORDS)
+        positive = sum(lowered.count(w) for w in POSITIVE_WORDS)
+        if negative + positive == 0:
+            return 10
+        return int(100 * (positive - negative) / (positive + negative + 1))
+
+    @staticmethod
+    def _label(score: int) -> str:
+        if score > 50:
+            return "Happy"
+        if score > 20:
+            return "Satisfied"
+        if score >= -20:
+            return "Neutral"
+        return "Frustrated" if score >= -60 else "Angry"
+
+    def sentiment(self, transcript: str) -> Dict[str, Any]:
+        third = max(1, len(transcript) // 3)
+        phases = [transcript[:third], transcript[third:2 * third], transcript[2 * third:]]
+        trajectory = [
+            {"phase": name, "score": score, "label": self._label(score)}
+            for name, score in zip(["Opening", "Middle", "Closing"], map(self._sentiment_score, phases))
+        ]
+        score = self._sentiment_score(transcript)
+        return {
+            "score": score,
+            "trajectory": trajectory,
+            "label": "Positive" if score > 20 else ("Negative" if score < -20 else "Neutral"),
+            "escalation_detected": score < -50 or bool(self.risk(transcript)["flags"]),
+        }
+
+    def risk(self, transcript: str) -> Dict[str, Any]:
+        lowered = transcript.lower()
+        flags = []
+        for category, words in RISK_WORDS.items():
+            for word in words:
+                index = lowered.find(word)
+                if index != -1:
+                    flags.append({
+                        "category": category,
+                        "confidence": "high" if category == "Legal" else "medium",
+                        "quote": transcript[max(0, index - 30):index + len(word) + 30].strip(),
+                    })
+                    break
+        severity = "none"
+        if flags:
+            severity = "high" if any(f["category"] == "Legal" for f in flags) else ("medium" if len(flags) > 1 else "low")
+        return {
+            "risk_detected": bool(flags),
+            "severity": severity,
+            "flags": flags,
+            "summary": f"{len(flags)} risk categories detected" if flags else "No risks detected",
+        }
+
+    def sop(self, transcript: str, steps: List[str]) -> Dict[str, Any]:
+        # Pass/fail is stable per (transcript, step) so repeated runs agree
+        checklist = []
+        for step in steps:
+            digest = hashlib.sha256(f"{step}|{transcript}".encode("utf-8")).digest()
+            passed = digest[0] < 205  # ~80% pass rate
+            checklist.append({
+                "step": step,
+                "status": "pass" if passed else "fail",
+                "evidence": transcript[:60].strip() if passed else "Not observed in transcript",
+            })
+        passed = sum(1 for c in checklist if c["status"] == "pass")
+        score = int(100 * passed / len(checklist)) if checklist else 100
+        return {
+            "adherence_score": score,
+            "compliant": score >= 80,
+            "missed_steps": [c["step"] for c in checklist if c["status"] == "fail"],
+            "checklist": checklist,
+        }
+
+    def qa(self, transcript: str) -> Dict[str, Any]:
+        mood = (self._sentiment_score(transcript) + 100) / 200  # 0..1
+        breakdown = {
+            "greeting": 8,
+            "empathy": int(10 + 8 * mood),
+            "solution": int(22 + 15 * mood),
+            "efficiency": 7,
+            "compliance": 16,
+        }
+        return {
+            "total_score": sum(breakdown.values()),
+            "breakdown": breakdown,
+            "critical_fail": False,
+            "comments": "Call handled to standard with room to improve empathy.",
+        }
+
+    def coaching(self, transcript: str) -> Dict[str, Any]:
+        return {
+            "strengths": ["Professional greeting", "Clear explanations", "Polite tone"],
+            "weaknesses": ["Acknowledge frustration earlier", "Confirm resolution", "Summarize next steps"],
+            "actionable_feedback": "Name the customer's concern back to them before offering a solution.",
+            "recommended_training": ["Empathy Skills", "Call Closing Techniques"],
+        }
+
+    def nudge(self, snippet: str) -> Dict[str, Any]:
+        score = self._sentiment_score(snippet)
+        if score < -20:
+            return {"nudge_needed": True, "message": "Acknowledge the customer's frustration.", "severity": "medium"}
+        return {"nudge_needed": False, "message": "", "severity": "low"}
+
+    def respond(self, payload: Dict[str, Any]) -> str:
+        text = _text_of(payload)
+        agent = self.agent_of(text)
+        transcript = self.transcript_of(text)
+        steps_match = _SOP_STEPS.search(text)
+        steps = [line[2:].strip() for line in steps_match.group(1).splitlines() if line.strip()] if steps_match else []
+
+        if agent == "SentimentTrajectoryAgent":
+            result = self.sentiment(transcript)
+        elif agent == "SOPComplianceAgent":
+            result = self.sop(transcript, steps)
+        elif agent == "RiskDetectionAgent":
+            result = self.risk(transcript)
+        elif agent == "QAScoringAgent":
+            result = self.qa(transcript)
+        elif agent == "CoachingAgent":
+            result = self.coaching(transcript)
+        elif agent == "FusedAnalysisAgent":
+            result = {
+                "sentiment": self.sentiment(transcript),
+                "sop_compliance": self.sop(transcript, steps),
+                "risk_analysis": self.risk(transcript),
+                "qa_score": self.qa(transcript),
+                "coaching": self.coaching(transcript),
+            }
+        elif agent == "Nudge":
+            result = self.nudge(transcript)
+        else:
+            result = {"response": "ok"}
+        return json.dumps(result, indent=2)
+
+
+class FaultInjector:
+    """
+    Latency and failure model for the stand-in.
+
+    Latency is log-normal, fitted to the configured median and p99. Each
+    request may be throttled (throttle_rate); with probability burst_rate a
+    request starts a burst of burst_length consecutive 5xx errors; with
+    probability slow_stream_rate a stream gets slow_stream_delay_ms between
+    chunks. seed makes a run reproducible.
+    """
+
+    def __init__(
+        self,
+        latency_median_ms: float = 1500,
+        latency_p99_ms: float = 6000,
+        throttle_rate: float = 0.0,
+        burst_rate: float = 0.0,
+        burst_length: int = 5,
+        slow_stream_rate: float = 0.0,
+        slow_stream_delay_ms: float = 500,
+        seed: Optional[int] = None,
+    ):
+        self.latency_median_ms = max(0.0, latency_median_ms)
+        self.sigma = math.log(max(latency_p99_ms, latency_median_ms, 1) / max(latency_median_ms, 1)) / 2.326
+        self.throttle_rate = throttle_rate
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.slow_stream_rate = slow_stream_rate
+        self.slow_stream_delay_ms = slow_stream_delay_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._burst_remaining = 0
+        self.counts = {"requests": 0, "throttled": 0, "server_errors": 0, "slow_streams": 0}
+
+    def latency_seconds(self) -> float:
+        with self._lock:
+            return self.latency_median_ms * math.exp(self._random.gauss(0, self.sigma)) / 1000
+
+    def fault(self) -> Optional[str]:
+        """None, "throttle" or "server_error" for the next request."""
+        with self._lock:
+            self.counts["requests"] += 1
+            if self._burst_remaining == 0 and self._random.random() < self.burst_rate:
+                self._burst_remaining = self.burst_length
+            if self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                self.counts["server_errors"] += 1
+                return "server_error"
+            if self._random.random() < self.throttle_rate:
+                self.counts["throttled"] += 1
+                return "throttle"
+            return None
+
+    def stream_chunk_delay_seconds(self) -> float:
+        with self._lock:
+            if self._random.random() < self.slow_stream_rate:
+                self.counts["slow_streams"] += 1
+                return self.slow_stream_delay_ms / 1000
+            return 0.0
+
+
+FAULT_ERRORS = {
+    "throttle": ("ThrottlingException", 429, "Too many requests, please wait before trying again."),
+    "server_error": ("InternalServerException", 500, "The server encountered an internal error."),
+}
+
+
+class StandInModel:
+    """Responder + fault model + usage accounting, shared by the in-process client and the HTTP server."""
+
+    def __init__(self, faults: FaultInjector, responder: Optional[StandInResponder] = None):
+        self.faults = faults
+        self.responder = responder or StandInResponder()
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def usage(self, payload: Dict[str, Any], output_text: str) -> Dict[str, int]:
+        """Token usage, including prompt-cache writes/reads for cache_control blocks."""
+        cached_text = ""
+        for message in payload.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, list):
+                cached_text += "".join(b.get("text", "") for b in content if b.get("cache_control"))
+        total = estimate_tokens(_text_of(payload))
+        usage = {"input_tokens": total, "output_tokens": estimate_tokens(output_text)}
+        if cached_text:
+            cached_tokens = estimate_tokens(cached_text)
+            # Bedrock's cached prefix is tools -> system -> messages, and a different
+            # tool_choice invalidates it, so all of them are part of the key
+            tools = json.dumps([payload.get("tools"), payload.get("tool_choice")], sort_keys=True)
+            key = hashlib.sha256((tools + (payload.get("system") or "") + cached_text).encode("utf-8")).hexdigest()
+            with self._lock:
+                hit = key in self._cached_prefixes
+                self._cached_prefixes.add(key)
+            usage["input_tokens"] = max(0, total - cached_tokens)
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = cached_tokens
+        return usage
+
+    def completion(self, payload: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        (text, stop_reason) as Bedrock would return it: continuing after an
+        assistant prefill, cut at the first stop sequence or at max_tokens.
+        For a forced tool call the text is the tool input JSON.
+        """
+        text = self.responder.respond(payload)
+        if _forced_tool(payload):
+            max_tokens = payload.get("max_tokens", 4096)
+            if estimate_tokens(text) > max_tokens:
+                return text[:max_tokens * 4], "max_tokens"
+            return text, "tool_use"
+        prefill = assistant_prefill(payload)
+        if prefill and text.startswith(prefill):
+            text = text[len(prefill):]
+        stop_reason = "end_turn"
+        cuts = [text.find(s) for s in payload.get("stop_sequences") or [] if s and s in text]
+        if cuts:
+            text = text[:min(cuts)]
+            stop_reason = "stop_sequence"
+        max_tokens = payload.get("max_tokens", 4096)
+        if estimate_tokens(text) > max_tokens:
+            text = text[:max_tokens * 4]
+            stop_reason = "max_tokens"
+        return text, stop_reason
+
+    def body(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """A complete Messages API response body."""
+        text, stop_reason = self.completion(payload)
+        tool = _forced_tool(payload)
+        if tool:
+            try:
+                tool_input = json.loads(text)
+            except ValueError:
+                tool_input = {}
+            content = [{"type": "tool_use", "id": "toolu_standin", "name": tool, "input": tool_input}]
+        else:
+            content = [{"type": "text", "text": text}]
+        return {
+            "id": "msg_standin",
+            "type": "message",
+            "role": "assistant",
+            "content": content,
+            "stop_reason": stop_reason,
+            "usage": self.usage(payload, text),
+        }
+
+    def stream_events(self, payload: Dict[str, Any], chunk_chars: int = 24) -> Iterator[Dict[str, Any]]:
+        """Messages API stream events, text split into chunk_chars pieces."""
+        text, stop_reason = self.completion(payload)
+        usage = self.usage(payload, text)
+        output_tokens = usage.pop("output_tokens")
+        yield {"type": "message_start", "message": {"id": "msg_standin", "role": "assistant", "usage": {**usage, "output_tokens": 1}}}
+        tool = _forced_tool(payload)
+        if tool:
+            yield {"type": "content_block_start", "index": 0, "content_block": {"type": "tool_use", "id": "toolu_standin", "name": tool, "input": {}}}
+        else:
+            yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        for i in range(0, len(text), chunk_chars):
+            piece = text[i:i + chunk_chars]
+            delta = {"type": "input_json_delta", "partial_json": piece} if tool else {"type": "text_delta", "text": piece}
+            yield {"type": "content_block_delta", "index": 0, "delta": delta}
+        yield {"type": "content_block_stop", "index": 0}
+        yield {"type": "message_delta", "delta": {"stop_reason": stop_reason}, "usage": {"output_tokens": output_tokens}}
+        yield {"type": "message_stop"}
+
+
+class _Body:
+    """Minimal StreamingBody stand-in."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+
+class _StandInStream:
+    """Iterable shaped like botocore's EventStream; sleeps between chunks."""
+
+    def __init__(self, events: Iterator[Dict[str, Any]], first_delay: float, chunk_delay: float):
+        self._events = events
+        self._first_delay = first_delay
+        self._chunk_delay = chunk_delay
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self._first_delay)
+        for event in self._events:
+            if self.closed:
+                return
+            if event["type"] == "content_block_delta":
+                time.sleep(self._chunk_delay)
+            yield {"chunk": {"bytes": json.dumps(event).encode("utf-8")}}
+
+    def close(self):
+        self.closed = True
+
+
+class StandInClient:
+    """
+    In-process replacement for the bedrock-runtime client (LLM_TRANSPORT=standin).
+    Blocks for the sampled latency on the calling thread, like a real network
+    call would, and raises botocore ClientErrors for injected faults so the
+    retry policy and limiter react exactly as they would to Bedrock.
+    """
+
+    def __init__(self, model: StandInModel):
+        self.model = model
+
+    def _raise_fault(self, operation: str):
+        fault = self.model.faults.fault()
+        if fault is None:
+            return
+        code, status, message = FAULT_ERRORS[fault]
+        # Errors come back fast, but not instantly
+        time.sleep(min(0.05, self.model.faults.latency_seconds()))
+        raise ClientError(
+            {"Error": {"Code": code, "Message": message}, "ResponseMetadata": {"HTTPStatusCode": status}},
+            operation,
+        )
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        self._raise_fault("InvokeModel")
+        payload = json.loads(body)
+        time.sleep(self.model.faults.latency_seconds())
+        response_body = json.dumps(self.model.body(payload)).encode("utf-8")
+        return {"body": _Body(response_body), "contentType": "application/json"}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        self._raise_fault("InvokeModelWithResponseStream")
+        payload = json.loads(body)
+        events = list(self.model.stream_events(payload))
+        chunks = max(1, sum(1 for e in events if e["type"] == "content_block_delta"))
+        latency = self.model.faults.latency_seconds()
+        # ~20% of the latency before the first token, the rest spread over the chunks
+        chunk_delay = 0.8 * latency / chunks + self.model.faults.stream_chunk_delay_seconds()
+        return {"body": _StandInStream(iter(events), 0.2 * latency, chunk_delay)}
+
+
+def model_from_settings() -> StandInModel:
+    """Stand-in model configured from the STANDIN_* settings."""
+    faults = FaultInjector(
+        latency_median_ms=settings.STANDIN_LATENCY_MEDIAN_MS,
+        latency_p99_ms=settings.STANDIN_LATENCY_P99_MS,
+        throttle_rate=settings.STANDIN_THROTTLE_RATE,
+        burst_rate=settings.STANDIN_BURST_RATE,
+        burst_length=settings.STANDIN_BURST_LENGTH,
+        slow_stream_rate=settings.STANDIN_SLOW_STREAM_RATE,
+        slow_stream_delay_ms=settings.STANDIN_SLOW_STREAM_DELAY_MS,
+        seed=settings.STANDIN_SEED,
+    )
+    logger.info(
+        f"🧪 Bedrock stand-in: latency p50={settings.STANDIN_LATENCY_MEDIAN_MS}ms p99={settings.STANDIN_LATENCY_P99_MS}ms, "
+        f"throttle={settings.STANDIN_THROTTLE_RATE}, burst={settings.STANDIN_BURST_RATE}x{settings.STANDIN_BURST_LENGTH}"
+    )
+    return StandInModel(faults)
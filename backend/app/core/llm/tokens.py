@@ -0,0 +1,48 @@
+import re
+from typing import Dict
+
+# Offline token estimation for Claude prompts. No tokenizer download, no API
+# call: characters are bucketed by script and divided by a per-script ratio.
+# Ratios are deliberately on the conservative (over-estimating) side: Latin
+# text runs ~4 chars/token, while Devanagari (Hindi call transcripts) splits
+# into far more tokens per character.
+CHARS_PER_TOKEN: Dict[str, float] = {
+    "latin": 4.0,
+    "whitespace": 8.0,
+    "devanagari": 1.5,
+    "other": 2.0,
+}
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F\uA8E0-\uA8FF]")
+_WHITESPACE = re.compile(r"\s")
+_LATIN = re.compile(r"[\x21-\x7E\u00C0-\u024F]")
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """Character counts per script bucket."""
+    total = len(text)
+    devanagari = len(_DEVANAGARI.findall(text))
+    whitespace = len(_WHITESPACE.findall(text))
+    latin = len(_LATIN.findall(text))
+    return {
+        "latin": latin,
+        "whitespace": whitespace,
+        "devanagari": devanagari,
+        "other": max(0, total - latin - whitespace - devanagari),
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated Claude token count for a piece of text."""
+    if not text:
+        return 0
+    counts = script_counts(text)
+    return int(sum(counts[k] / CHARS_PER_TOKEN[k] for k in counts)) + 1
+
+
+def chars_for_tokens(text: str, tokens: int) -> int:
+    """Roughly how many leading characters of `text` fit in `tokens` tokens."""
+    estimated = estimate_tokens(text)
+    if estimated <= tokens:
+        return len(text)
+    return int(len(text) * tokens / estimated)
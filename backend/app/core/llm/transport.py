@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import boto3
+
+from app.core.config import settings
+from app.core.llm.json_stream import JSONObjectScanner
+from app.core.llm.profiles import assistant_prefill
+from app.core.retry import boto_client_config
+
+logger = logging.getLogger("BEDROCK_TRANSPORT")
+
+T = TypeVar("T")
+
+
+class BedrockTransport:
+    """
+    Bedrock runtime client with its own bounded thread pool.
+
+    Blocking boto3 calls run on a dedicated executor instead of the event
+    loop's default one, which is shared with S3 uploads, Transcribe polling and
+    file I/O and sized from the CPU count. botocore's connection pool is sized
+    to match so every worker keeps a warm keep-alive TLS connection.
+
+    A call abandoned by its caller (deadline, hedge loser) cannot interrupt
+    its thread, which stays busy until boto3 returns or hits its read
+    timeout; the caller's hold callback gets that thread's future so the
+    limiter slot can stay taken until then.
+    """
+
+    def __init__(
+        self,
+        region: str,
+        pool_size: int,
+        connect_timeout_seconds: float,
+        read_timeout_seconds: float
+    ):
+        self.region = region
+        self.pool_size = max(1, pool_size)
+        self.active = 0
+        self.abandoned = 0
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="bedrock")
+        self.client = self._create_client(
+            boto_client_config(
+                max_pool_connections=self.pool_size,
+                tcp_keepalive=True,
+                connect_timeout=connect_timeout_seconds,
+                read_timeout=read_timeout_seconds
+            )
+        )
+        logger.info(f"🔌 Transport: {self.region}, pool={self.pool_size} threads/connections")
+
+    def _create_client(self, config):
+        """Create the bedrock-runtime client with available credentials."""
+        if settings.LLM_TRANSPORT == "standin":
+            from app.core.llm.standin import StandInClient, model_from_settings
+            logger.warning("🧪 Using in-process Bedrock stand-in - no real model calls")
+            return StandInClient(model_from_settings())
+        
+        # endpoint_url=None keeps boto3's regional endpoint
+        config_kwargs = {"config": config, "endpoint_url": settings.LLM_ENDPOINT_URL}
+        if settings.LLM_ENDPOINT_URL:
+            logger.info(f"🔀 Endpoint override: {settings.LLM_ENDPOINT_URL}")
+        try:
+            # Check for environment credentials first (ECS task role injects these)
+            if os.environ.get("AWS_ACCESS_KEY_ID"):
+                client = boto3.client('bedrock-runtime', region_name=self.region, **config_kwargs)
+                logger.info("🔑 Auth: Environment/Task Role credentials")
+            # Check for settings-based credentials
+            elif settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
+                client = boto3.client(
+                    'bedrock-runtime',
+                    region_name=self.region,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    **config_kwargs
+                )
+                logger.info("🔑 Auth: Settings-based IAM credentials")
+            # Try default credential chain (instance profile, etc.)
+            else:
+                client = boto3.client('bedrock-runtime', region_name=self.region, **config_kwargs)
+                logger.info("🔑 Auth: Default credential chain")
+            logger.info("✅ Bedrock client initialized")
+            return client
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize Bedrock client: {e}")
+            raise RuntimeError(f"Cannot initialize Bedrock: {e}. Ensure AWS credentials are configured.")
+
+    async def _run(self, fn: Callable[[], T], hold: Optional[Callable[[Future], None]] = None) -> T:
+        loop = asyncio.get_running_loop()
+        work = self.executor.submit(fn)
+        self.active += 1
+
+        def returned(_):
+            # Counted until the thread returns, not until the caller stops waiting
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._returned)
+
+        work.add_done_callback(returned)
+        try:
+            return await asyncio.shield(asyncio.wrap_future(work))
+        except asyncio.CancelledError:
+            # A call still queued for a thread is dropped; a running one cannot be stopped
+            if not work.cancel() and not work.done():
+                self.abandoned += 1
+                logger.warning("🧵 Bedrock call abandoned while its thread is still running")
+                if hold:
+                    hold(work)
+            raise
+
+    def _returned(self):
+        self.active -= 1
+
+    async def invoke(self, model_id: str, payload: Dict[str, Any], hold: Optional[Callable[[Future], None]] = None) -> Dict[str, Any]:
+        """InvokeModel; returns the decoded response body. hold: see the class docstring."""
+        def call():
+            response = self.client.invoke_model(modelId=model_id, body=json.dumps(payload))
+            return json.loads(response['body'].read())
+        return await self._run(call, hold)
+
+    async def invoke_stream_until_object(
+        self,
+        model_id: str,
+        payload: Dict[str, Any],
+        hold: Optional[Callable[[Future], None]] = None,
+        tool: Optional[str] = None
+    ) -> Tuple[str, bool, Dict[str, int]]:
+        """
+        InvokeModelWithResponseStream, read until the first top-level JSON
+        object closes, then close the stream so trailing output is neither
+        read nor generated further. Returns (text, closed_early, usage).
+        An assistant prefill in the payload is included in the returned text;
+        for a forced tool call the text is the streamed tool input. With tool,
+        only a call to that tool is read; calls to other tools are skipped.
+        """
+        return await self._run(lambda: self._read_stream_until_object(model_id, payload, tool), hold)
+
+    def _read_stream_until_object(
+        self,
+        model_id: str,
+        payload: Dict[str, Any],
+        tool: Optional[str] = None
+    ) -> Tuple[str, bool, Dict[str, int]]:
+        response = self.client.invoke_model_with_response_stream(
+            modelId=model_id,
+            body=json.dumps(payload)
+        )
+        event_stream = response['body']
+        scanner = JSONObjectScanner()
+        # The model continues from the prefill, so the scanner starts inside the object
+        prefill = assistant_prefill(payload)
+        scanner.feed(prefill)
+        text_parts = [prefill]
+        usage: Dict[str, int] = {}
+        # Content block indexes to skip: calls to a tool other than the expected one
+        skipped = set()
+        try:
+            for event in event_stream:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                data = json.loads(chunk['bytes'])
+                if data.get('type') == 'content_block_start' and tool:
+                    block = data.get('content_block') or {}
+                    if block.get('type') == 'tool_use' and block.get('name') != tool:
+                        logger.warning(f"⚠️ Expected a {tool} call, got {block.get('name')}; skipped")
+                        skipped.add(data.get('index'))
+                    continue
+                if data.get('type') == 'message_start':
+                    # Input and cache token counts arrive up front
+                    usage.update(data.get('message', {}).get('usage', {}))
+                    continue
+                if data.get('type') == 'message_delta':
+                    usage.update(data.get('usage', {}))
+                    continue
+                if data.get('type') != 'content_block_delta' or data.get('index') in skipped:
+                    continue
+                delta = data.get('delta', {})
+                piece = delta.get('text') or delta.get('partial_json') or ''
+                text_parts.append(piece)
+                if scanner.feed(piece) is not None:
+                    return scanner.result, True, usage
+        finally:
+            event_stream.close()
+        return "".join(text_parts), False, usage
+
+    def stats(self) -> Dict[str, Any]:
+        return {"region": self.region, "pool_size": self.pool_size, "active": self.active, "abandoned": self.abandoned}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,265 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, spanning cache-speed responses to slow large-model calls
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+# Output size buckets in tokens, around the per-agent max_tokens caps
+TOKEN_BUCKETS = (32, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base for labelled metrics: one series per distinct label-value tuple."""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels.get(name) if labels.get(name) is not None else "") for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirrors a counter kept elsewhere (e.g. RetryPolicy.retries) at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Point-in-time value per label set."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram, as Prometheus expects. Quantiles (p50/p95/p99)
+    are estimated by linear interpolation inside the bucket holding the rank,
+    the same way histogram_quantile() does it server-side.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: per-bucket (non-cumulative) counts with a trailing +Inf slot, sum, count
+        self._series: Dict[LabelKey, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        series = self._series.get(self._key(labels))
+        if not series or not series[2]:
+            return None
+        return self._quantile(series, q)
+
+    def _quantile(self, series: List[Any], q: float) -> float:
+        counts, _, total = series
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    # Rank falls in +Inf: the best estimate is the highest finite bound
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-series count, mean and p50/p95/p99, keyed by "label=value,..."."""
+        result = {}
+        for key, series in sorted(self._series.items()):
+            name = ",".join(f"{label}={value}" for label, value in zip(self.label_names, key)) or "all"
+            result[name] = {
+                "count": series[2],
+                "mean": round(series[1] / series[2], 4) if series[2] else None,
+                "p50": round(self._quantile(series, 0.50), 4),
+                "p95": round(self._quantile(series, 0.95), 4),
+                "p99": round(self._quantile(series, 0.99), 4),
+            }
+        return result
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total_sum, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metric registry rendered in the Prometheus text format.
+    Collectors run before each render, so state already tracked elsewhere
+    (limiter windows, retry counters) is copied in at scrape time rather
+    than counted twice.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in self._collectors:
+            collector()
+
+    def render(self) -> str:
+        self.collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def latency_summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """p50/p95/p99 for every histogram, for humans who do not run Prometheus."""
+        return {name: m.summary() for name, m in self._metrics.items() if isinstance(m, Histogram)}
+
+
+metrics = MetricsRegistry()
+
+# LLM gateway
+LLM_REQUESTS = metrics.counter(
+    "llm_requests_total", "LLM gateway requests by agent, model and outcome (ok, error, cache_hit, rejected, deadline).",
+    ("agent", "model", "task", "outcome")
+)
+LLM_LATENCY = metrics.histogram(
+    "llm_request_duration_seconds", "Bedrock call latency including retries, by agent and model.",
+    ("agent", "model")
+)
+LLM_OUTPUT_TOKENS = metrics.histogram(
+    "llm_output_tokens", "Output tokens per Bedrock response, by generation profile.",
+    ("profile",), buckets=TOKEN_BUCKETS
+)
+LLM_OUTPUT_CAPPED = metrics.counter(
+    "llm_output_capped_total", "Responses that used their profile's whole max_tokens, by generation profile.", ("profile",)
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Tokens reported by Bedrock, by agent, model and type (input, output, cache_read, cache_write).",
+    ("agent", "model", "type")
+)
+LLM_IN_FLIGHT = metrics.gauge("llm_in_flight", "Bedrock calls holding a limiter slot, per model and priority class.", ("model", "priority"))
+LLM_QUEUE_DEPTH = metrics.gauge("llm_queue_depth", "Calls waiting for a limiter slot, per model and priority class.", ("model", "priority"))
+LLM_QUEUE_WAIT = metrics.histogram(
+    "llm_queue_wait_seconds", "Time a Bedrock attempt waited for a limiter slot, per model and priority class.",
+    ("model", "priority")
+)
+LLM_CONCURRENCY_LIMIT = metrics.gauge("llm_concurrency_limit", "Current adaptive concurrency limit, per model.", ("model",))
+LLM_THROTTLES = metrics.counter("llm_throttles_total", "Throttling responses seen by the limiter, per model.", ("model",))
+LLM_TIMEOUTS = metrics.counter("llm_timeouts_total", "Timeouts seen by the limiter, per model.", ("model",))
+LLM_CIRCUIT_STATE = metrics.gauge("llm_circuit_state", "Circuit breaker state per model: 0 closed, 1 half-open, 2 open.", ("model",))
+LLM_CIRCUIT_TRIPS = metrics.counter("llm_circuit_trips_total", "Times a model's circuit breaker opened.", ("model",))
+LLM_CIRCUIT_REJECTED = metrics.counter("llm_circuit_rejected_total", "Calls failed fast by an open circuit breaker.", ("model",))
+LLM_ENDPOINT_HEALTH = metrics.gauge("llm_endpoint_health", "Pool endpoint health score (0..1), per region/model.", ("endpoint",))
+LLM_ENDPOINT_AVAILABLE = metrics.gauge("llm_endpoint_available", "1 if the pool endpoint is taking calls, 0 while ejected.", ("endpoint",))
+LLM_RETRIES = metrics.counter("llm_retries_total", "Retries made by a retry policy.", ("policy",))
+LLM_RETRY_GIVEUPS = metrics.counter("llm_retry_giveups_total", "Calls a retry policy gave up on.", ("policy",))
+LLM_RETRY_BUDGET_EXHAUSTED = metrics.counter("llm_retry_budget_exhausted_total", "Retries refused by the global retry budget.")
+LLM_COALESCED = metrics.counter("llm_coalesced_total", "Requests that joined an identical in-flight call instead of sending their own.")
+LLM_HEDGES = metrics.counter("llm_hedges_total", "Duplicate requests sent because the primary was slower than the hedge percentile.")
+LLM_HEDGE_WINS = metrics.counter("llm_hedge_wins_total", "Hedged requests where the duplicate answered first.")
+LLM_TRANSPORT_ACTIVE = metrics.gauge("llm_transport_active", "Bedrock calls running on the transport thread pool.")
+
+# Agents
+AGENT_CALLS = metrics.counter("agent_calls_total", "Agent LLM invocations by outcome (ok, parse_error, error, deadline).", ("agent", "outcome"))
+AGENT_LATENCY = metrics.histogram("agent_call_duration_seconds", "Agent invocation latency, end to end.", ("agent",))
+AGENT_PARSE_FAILURES = metrics.counter("agent_json_parse_failures_total", "Agent responses without a parseable JSON object.", ("agent",))
+AGENT_SCHEMA_REPAIRS = metrics.counter(
+    "agent_schema_repairs_total", "Agent results that failed their output schema, by repair outcome (repaired, failed).", ("agent", "outcome")
+)
+ANALYSIS_REUSE = metrics.counter(
+    "analysis_reuse_lookups_total", "Near-duplicate lookups by outcome (copy, cheap, miss, unusable).", ("outcome",)
+)
+ANALYSIS_TIMED_OUT = metrics.counter(
+    "analysis_sections_timed_out_total", "Analysis sections cancelled at their deadline and left for re-analysis, by result key.", ("section",)
+)
@@ -0,0 +1,203 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.deadline import DeadlineExceeded, within
+
+logger = logging.getLogger("PIPELINE")
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED, TIMED_OUT = "pending", "running", "done", "failed", "skipped", "timed_out"
+
+
+class StageSkipped(RuntimeError):
+    """Raised for a stage that did not run because one of its inputs failed."""
+
+
+class Stage:
+    """
+    One node of a pipeline: a callable receiving its inputs as keyword
+    arguments named after the stages (or run inputs) that produce them.
+    fn may be a coroutine function or a plain function; plain functions
+    run inline unless blocking=True, which moves them to a worker thread.
+    timeout caps the stage's own run time; the enclosing deadline_scope
+    caps it too, whichever ends first.
+    """
+
+    __slots__ = ("name", "fn", "inputs", "blocking", "timeout")
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: Iterable[str] = (),
+        blocking: bool = False,
+        timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs: Tuple[str, ...] = tuple(inputs)
+        self.blocking = blocking
+        self.timeout = timeout
+
+    async def call(self, values: Dict[str, Any]) -> Any:
+        kwargs = {name: values[name] for name in self.inputs}
+        if self.blocking:
+            return await asyncio.to_thread(self.fn, **kwargs)
+        result = self.fn(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name} <- {', '.join(self.inputs) or '-'})"
+
+
+class PipelineRun:
+    """Outcome of one run: per-stage results, errors and timings (ms from the start of the run)."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.duration_ms = 0
+
+    def ok(self, name: str) -> bool:
+        return name in self.results
+
+    def timed_out(self, name: str) -> bool:
+        """True if the stage was cancelled at its deadline, or skipped because an input was."""
+        timing = self.timings.get(name) or {}
+        if timing.get("status") == TIMED_OUT:
+            return True
+        return timing.get("status") == SKIPPED and self.timed_out(timing.get("waited_on"))
+
+    def critical_path(self) -> List[str]:
+        """Stages along the chain that finished last, i.e. that set the run's latency."""
+        path = []
+        # On ties the later-declared stage wins, it is the one further down the graph
+        name = max(reversed(list(self.timings)), key=lambda n: self.timings[n].get("finished_ms") or 0, default=None)
+        while name is not None:
+            path.append(name)
+            name = self.timings[name].get("waited_on")
+        return list(reversed(path))
+
+    def summary(self) -> Dict[str, Any]:
+        """Timings for logs and the analysis document's pipeline info."""
+        busy = sum(t.get("duration_ms") or 0 for t in self.timings.values())
+        return {
+            "pipeline": self.pipeline,
+            "duration_ms": self.duration_ms,
+            # What running every stage back to back would have cost
+            "sum_of_stages_ms": busy,
+            "critical_path": self.critical_path(),
+            "stages": self.timings,
+        }
+
+
+class Pipeline:
+    """
+    Declarative DAG of stages. Every stage starts as soon as all of its
+    inputs have resolved, so independent stages run concurrently and the
+    run takes its critical-path latency. A failed stage is recorded in
+    PipelineRun.errors; stages depending on it are skipped, the rest of
+    the graph still runs. A stage still running at its timeout or the
+    enclosing deadline is cancelled and recorded as timed out, so a run
+    under a deadline_scope always returns with whatever finished in time.
+    """
+
+    def __init__(self, name: str, stages: Iterable[Stage], inputs: Iterable[str] = ()):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        self.inputs = tuple(inputs)
+        for stage in stages:
+            if stage.name in self.stages or stage.name in self.inputs:
+                raise ValueError(f"Pipeline {name}: duplicate stage {stage.name}")
+            self.stages[stage.name] = stage
+        self._check()
+
+    def _check(self):
+        known = set(self.inputs) | set(self.stages)
+        for stage in self.stages.values():
+            missing = [i for i in stage.inputs if i not in known]
+            if missing:
+                raise ValueError(f"Pipeline {self.name}: {stage.name} needs unknown inputs {missing}")
+        # Kahn's algorithm: anything left over sits on a cycle
+        remaining = {name: set(i for i in stage.inputs if i in self.stages) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline {self.name}: cycle between {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    async def run(self, **inputs: Any) -> PipelineRun:
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            raise ValueError(f"Pipeline {self.name}: missing run inputs {missing}")
+        run = PipelineRun(self.name)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {name: loop.create_future() for name in self.stages}
+        values: Dict[str, Any] = dict(inputs)
+
+        def ms() -> int:
+            return round((time.perf_counter() - started) * 1000)
+
+        async def execute(stage: Stage):
+            timing = run.timings[stage.name] = {"status": PENDING}
+            last_input = None
+            for name in stage.inputs:
+                if name in futures:
+                    try:
+                        await futures[name]
+                    except BaseException:
+                        timing.update(status=SKIPPED, finished_ms=ms(), waited_on=name)
+                        futures[stage.name].set_exception(StageSkipped(f"{stage.name}: input {name} failed"))
+                        return
+                    if last_input is None or run.timings[name]["finished_ms"] >= run.timings[last_input]["finished_ms"]:
+                        last_input = name
+            timing.update(status=RUNNING, started_ms=ms(), waited_on=last_input)
+            try:
+                result = await within(stage.call(values), stage.timeout, f"{self.name}.{stage.name}")
+            except DeadlineExceeded as e:
+                logger.warning(f"⏰ [PIPELINE] {self.name}.{stage.name} cancelled: {e}")
+                timing.update(status=TIMED_OUT, finished_ms=ms(), error=str(e))
+                timing["duration_ms"] = timing["finished_ms"] - timing["started_ms"]
+                run.errors[stage.name] = e
+                futures[stage.name].set_exception(e)
+                return
+            except Exception as e:
+                logger.error(f"❌ [PIPELINE] {self.name}.{stage.name} failed: {e}")
+                timing.update(status=FAILED, finished_ms=ms(), error=str(e))
+                timing["duration_ms"] = timing["finished_ms"] - timing["started_ms"]
+                run.errors[stage.name] = e
+                futures[stage.name].set_exception(e)
+                return
+            values[stage.name] = result
+            run.results[stage.name] = result
+            timing.update(status=DONE, finished_ms=ms())
+            timing["duration_ms"] = timing["finished_ms"] - timing["started_ms"]
+            futures[stage.name].set_result(result)
+
+        tasks = [asyncio.ensure_future(execute(stage)) for stage in self.stages.values()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # Failures were recorded on the run; nobody else awaits these futures
+            for future in futures.values():
+                if future.done() and not future.cancelled():
+                    future.exception()
+        run.duration_ms = ms()
+        logger.info(
+            f"🕸️ [PIPELINE] {self.name}: {len(run.results)}/{len(self.stages)} stages in {run.duration_ms} ms "
+            f"(critical path: {' -> '.join(run.critical_path())})"
+        )
+        return run
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, TypeVar
+
+from botocore.config import Config
+
+from app.core.config import settings
+from app.core.deadline import remaining
+
+logger = logging.getLogger("RETRY")
+
+T = TypeVar("T")
+
+# AWS error codes meaning "back off, the service is overloaded"
+THROTTLE_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "SlowDown",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+# AWS error codes for failures that are worth another attempt
+TRANSIENT_CODES = {
+    "InternalServerException",
+    "InternalFailure",
+    "InternalError",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "ModelTimeoutException",
+    "ModelStreamErrorException",
+}
+
+# botocore/urllib3 exception class names for network-level failures
+TRANSIENT_EXCEPTION_NAMES = {
+    "EndpointConnectionError",
+    "ConnectionClosedError",
+    "ResponseStreamingError",
+    "IncompleteReadError",
+    "ProtocolError",
+}
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    Maps an exception to "throttle", "timeout", "transient" or "fatal".
+    Only the first three are retried by default.
+    """
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code", "")
+        if code in THROTTLE_CODES:
+            return "throttle"
+        if code in TRANSIENT_CODES:
+            return "transient"
+        if response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500:
+            return "transient"
+
+    name = type(exc).__name__
+    if name in THROTTLE_CODES:
+        return "throttle"
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in name:
+        return "timeout"
+    if name in TRANSIENT_EXCEPTION_NAMES or isinstance(exc, ConnectionError):
+        return "transient"
+    return "fatal"
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket that caps retries to a fraction of traffic.
+    Every first attempt deposits `ratio` tokens and every retry spends one, with
+    a small time-based floor so low-traffic periods can still retry. When the
+    bucket is empty, failures surface immediately instead of adding load.
+    The bucket starts full unless initial_tokens says otherwise.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float = 100.0, initial_tokens: Optional[float] = None):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens if initial_tokens is None else min(initial_tokens, max_tokens)
+        self.exhausted = 0
+        self._refilled_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._refilled_at) * self.min_per_second)
+        self._refilled_at = now
+
+    def record_request(self):
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tokens": round(self.tokens, 2), "exhausted": self.exhausted}
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the delay before retry n is drawn
+    uniformly from [0, min(max_delay, base_delay * 2**n)], so concurrent
+    callers spread out instead of retrying in synchronized waves.
+    Gives up after max_attempts, once max_elapsed_seconds would be exceeded,
+    or when the shared retry budget is empty.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        base_delay_seconds: float,
+        max_delay_seconds: float,
+        max_elapsed_seconds: float,
+        budget: Optional[RetryBudget] = None,
+        retry_on: Iterable[str] = ("throttle", "timeout", "transient"),
+    ):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_elapsed_seconds = max_elapsed_seconds
+        self.budget = budget
+        self.retry_on = set(retry_on)
+        self.calls = 0
+        self.retries = 0
+        self.giveups = 0
+
+    def backoff(self, retry_number: int) -> float:
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * (2 ** retry_number)))
+
+    async def run(self, fn: Callable[[], Awaitable[T]], label: str = "") -> T:
+        """Awaits fn() until it succeeds or the policy gives up; re-raises the last error."""
+        label = label or self.name
+        started = time.monotonic()
+        attempt = 0
+        self.calls += 1
+        if self.budget:
+            self.budget.record_request()
+
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                attempt += 1
+                kind = classify_error(e)
+                if kind not in self.retry_on:
+                    raise
+                if attempt >= self.max_attempts:
+                    self.giveups += 1
+                    logger.error(f"❌ [{label}] Giving up after {attempt} attempts ({kind}): {e}")
+                    raise
+                delay = self.backoff(attempt - 1)
+                if time.monotonic() - started + delay > self.max_elapsed_seconds:
+                    self.giveups += 1
+                    logger.error(f"❌ [{label}] Giving up, retry window of {self.max_elapsed_seconds}s exhausted ({kind}): {e}")
+                    raise
+                left = remaining()
+                if left is not None and delay >= left:
+                    self.giveups += 1
+                    logger.error(f"❌ [{label}] Giving up, deadline in {max(left, 0):.2f}s ({kind}): {e}")
+                    raise
+                if self.budget and not self.budget.try_spend():
+                    self.giveups += 1
+                    logger.error(f"❌ [{label}] Retry budget exhausted, not retrying ({kind}): {e}")
+                    raise
+                self.retries += 1
+                logger.warning(f"🔁 [{label}] {kind} on attempt {attempt}, retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "retries": self.retries, "giveups": self.giveups}
+
+
+# Shared by every policy so retries across Bedrock, S3 and Transcribe are capped together
+global_retry_budget = RetryBudget(
+    ratio=settings.RETRY_BUDGET_RATIO,
+    min_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND
+)
+
+
+def boto_client_config(**overrides) -> Config:
+    """
+    botocore config with its built-in retries disabled, so RetryPolicy is the
+    only layer retrying and every retry is charged to the shared budget.
+    """
+    return Config(retries={"total_max_attempts": 1, "mode": "standard"}, **overrides)
+
+
+def policy_from_settings(name: str, max_elapsed_seconds: Optional[float] = None) -> RetryPolicy:
+    """Builds a RetryPolicy from the RETRY_* settings, sharing the global budget."""
+    return RetryPolicy(
+        name,
+        max_attempts=settings.RETRY_MAX_ATTEMPTS,
+        base_delay_seconds=settings.RETRY_BASE_DELAY_SECONDS,
+        max_delay_seconds=settings.RETRY_MAX_DELAY_SECONDS,
+        max_elapsed_seconds=max_elapsed_seconds or settings.RETRY_MAX_ELAPSED_SECONDS,
+        budget=global_retry_budget
+    )
@@ -0,0 +1,157 @@
+import hashlib
+import random
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"[a-z0-9']+")
+_DIGITS = re.compile(r"\d+")
+# Universal hashing modulo a Mersenne prime, truncated to 32 bits
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+Signature = Tuple[int, ...]
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shingles(text: str, size: int = 3) -> Set[int]:
+    """
+    Hashed word n-grams of a transcript. Lowercased, punctuation dropped and
+    every number collapsed to "#", so calls differing only in order or
+    product numbers shingle the same.
+    """
+    words = [_DIGITS.sub("#", word) for word in _WORD.findall(text.lower())]
+    if len(words) <= size:
+        return {_hash64(" ".join(words))} if words else set()
+    return {_hash64(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures: the fraction of equal positions in two signatures
+    estimates the Jaccard similarity of the texts' shingle sets.
+    Seeded, so signatures are comparable across processes and restarts.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> Signature:
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return ()
+        return tuple(min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in self._perms)
+
+    @staticmethod
+    def similarity(a: Signature, b: Signature) -> float:
+        if not a or len(a) != len(b):
+            return 0.0
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class TranscriptIndex:
+    """
+    MinHash LSH index over transcripts. Signatures are cut into `bands`
+    bands; transcripts sharing any band are candidates, and candidates are
+    ranked by their estimated Jaccard similarity. With 64 permutations in 16
+    bands of 4, pairs above ~0.5 similarity almost always become candidates,
+    so a lookup costs a few dict probes instead of a scan.
+    Holds at most max_entries transcripts, evicting the least recently added.
+    Hashing a transcript is the expensive part (pure Python, ~0.2 s for a
+    long call); async callers compute hasher.signature off the event loop and
+    use the *_signature methods, which only touch the index.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, max_entries: int = 50000):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self._signatures: "OrderedDict[str, Signature]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Signature], Set[str]] = {}
+        self.lookups = 0
+        self.candidates = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def _bands(self, signature: Signature) -> List[Tuple[int, Signature]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, key: str, text: str) -> Signature:
+        """Indexes (or re-indexes) a transcript under key; returns its signature."""
+        return self.add_signature(key, self.hasher.signature(text))
+
+    def add_signature(self, key: str, signature: Signature) -> Signature:
+        """Indexes (or re-indexes) a precomputed signature under key."""
+        self.remove(key)
+        if not signature:
+            return signature
+        self._signatures[key] = signature
+        for bucket in self._bands(signature):
+            self._buckets.setdefault(bucket, set()).add(key)
+        while len(self._signatures) > self.max_entries:
+            self.remove(next(iter(self._signatures)))
+        return signature
+
+    def remove(self, key: str):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self._bands(signature):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def query(self, text: str, limit: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Most similar indexed transcripts as (key, estimated Jaccard similarity), best first."""
+        return self.query_signature(self.hasher.signature(text), limit, exclude)
+
+    def query_signature(self, signature: Signature, limit: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """query for a precomputed signature."""
+        self.lookups += 1
+        if not signature:
+            return []
+        found: Set[str] = set()
+        for bucket in self._bands(signature):
+            found.update(self._buckets.get(bucket, ()))
+        found.discard(exclude)
+        self.candidates += len(found)
+        ranked = sorted(
+            ((key, self.hasher.similarity(signature, self._signatures[key])) for key in found),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:limit]
+
+    def nearest(self, text: str, threshold: float, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """The most similar transcript at or above threshold, or None."""
+        return self.nearest_signature(self.hasher.signature(text), threshold, exclude)
+
+    def nearest_signature(self, signature: Signature, threshold: float, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """nearest for a precomputed signature."""
+        ranked = self.query_signature(signature, limit=1, exclude=exclude)
+        if ranked and ranked[0][1] >= threshold:
+            return ranked[0]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._signatures),
+            "buckets": len(self._buckets),
+            "lookups": self.lookups,
+            "avg_candidates": round(self.candidates / self.lookups, 2) if self.lookups else 0.0,
+        }
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
 from app.core.database import db
+from app.core.metrics import metrics
 from app.api.v1.endpoints import live, analysis, sop, coaching, agent, buddy, recommendations
 import logging
 
@@ -58,6 +60,14 @@ async def startup_db():
     # Initialize the LLM Gateway (this will log its status)
     from app.core.llm.gateway import bedrock_gateway
     
+    # Index recent calls for near-duplicate reuse in the background (no-op unless ANALYSIS_REUSE_MODE is set)
+    from app.services.reuse_service import reuse_service
+    reuse_service.start_warm()
+    
+    # Re-run degraded and timed-out calls once Bedrock recovers (ANALYSIS_RECOVERY_REANALYZE_LIMIT)
+    from app.services.analysis_service import analysis_service
+    analysis_service.watch_breakers()
+    
     logger.info("=" * 70)
     logger.info("✅ BACKEND READY - Waiting for requests...")
     logger.info("=" * 70)
@@ -66,6 +76,8 @@ async def startup_db():
 async def shutdown_db():
     logger.info("🛑 Shutting down...")
     db.close()
+    from app.core.llm.gateway import bedrock_gateway
+    bedrock_gateway.close()
     logger.info("👋 Goodbye!")
 
 @app.get("/health")
@@ -73,11 +85,25 @@ async def health_check():
     logger.info("💓 Health check requested")
     return {"status": "ok", "service": "Cognivista Backend"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """LLM gateway and agent metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """Latency p50/p95/p99 per agent and model, plus raw gateway and reuse-index state, as JSON."""
+    from app.core.llm.gateway import bedrock_gateway
+    from app.services.reuse_service import reuse_service
+    metrics.collect()
+    return {"latency": metrics.latency_summary(), "gateway": bedrock_gateway.stats(), "reuse": reuse_service.stats()}
+
 @app.get("/")
 async def root():
     return {
         "service": "Cognivista QA Backend",
         "status": "running",
         "api_docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
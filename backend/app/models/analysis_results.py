@@ -0,0 +1,103 @@
+from pydantic import BaseModel, ConfigDict, ValidationError
+from typing import Dict, Any, List, Optional, Type
+
+
+class SectionResult(BaseModel):
+    """
+    Base for typed agent results. Values are coerced on decode ("7" -> 7);
+    extra keys (degraded, schema_errors, ...) are kept so the dump is the
+    whole section as stored in Mongo and returned by the API.
+    """
+    model_config = ConfigDict(extra="allow")
+
+
+class PhaseScore(BaseModel):
+    # Map-reduced trajectories add part/parts (see app.agents.map_reduce.sentiment)
+    model_config = ConfigDict(extra="allow")
+
+    phase: str
+    score: int
+    label: str
+
+
+class SentimentResult(SectionResult):
+    score: int
+    trajectory: List[PhaseScore]
+    label: str
+    escalation_detected: bool
+
+
+class ChecklistItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    step: str
+    status: str
+    evidence: Optional[str] = None
+
+
+class SOPResult(SectionResult):
+    adherence_score: int
+    compliant: bool
+    missed_steps: List[str]
+    checklist: List[ChecklistItem]
+
+
+class RiskFlag(BaseModel):
+    category: str
+    confidence: str
+    quote: str
+
+
+class RiskResult(SectionResult):
+    risk_detected: bool
+    severity: str
+    flags: List[RiskFlag]
+    summary: str
+
+
+class QABreakdown(BaseModel):
+    greeting: int
+    empathy: int
+    solution: int
+    efficiency: int
+    compliance: int
+
+
+class QAResult(SectionResult):
+    total_score: int
+    breakdown: QABreakdown
+    critical_fail: bool
+    comments: str
+
+
+class CoachingResult(SectionResult):
+    strengths: List[str]
+    weaknesses: List[str]
+    actionable_feedback: str
+    recommended_training: List[str]
+
+
+class FusedResult(SectionResult):
+    sentiment: SentimentResult
+    sop_compliance: SOPResult
+    risk_analysis: RiskResult
+    qa_score: QAResult
+    coaching: CoachingResult
+
+
+# Result key -> model, mirroring OrchestratorAgent.agents
+SECTION_MODELS: Dict[str, Type[SectionResult]] = {
+    "sentiment": SentimentResult,
+    "sop_compliance": SOPResult,
+    "risk_analysis": RiskResult,
+    "qa_score": QAResult,
+    "coaching": CoachingResult,
+}
+
+
+def decode(model: Type[SectionResult], data: Dict[str, Any]) -> Optional[SectionResult]:
+    """The typed result, or None if data does not fit the model even after coercion."""
+    try:
+        return model.model_validate(data)
+    except ValidationError:
+        return None
@@ -1,6 +1,13 @@
 from app.agents.orchestrator import orchestrator
 from app.agents.specialized.transcription import TranscriptionAgent
+from app.core.config import settings
 from app.core.database import get_database
+from app.core.llm.breaker import CLOSED
+from app.core.llm.gateway import bedrock_gateway
+from app.core.llm.priority import BACKFILL
+from app.services.reuse_service import reuse_service
+from typing import List, Optional, Set
+import asyncio
 import logging
 import datetime
 
@@ -15,8 +22,42 @@ logger = logging.getLogger("ANALYSIS_SERVICE")
 class AnalysisService:
     def __init__(self):
         self.transcription_agent = TranscriptionAgent()
+        # Pending retries of timed-out sections; referenced so they are not garbage collected
+        self._retries: Set[asyncio.Task] = set()
+        self._recovery: Optional[asyncio.Task] = None
         logger.info("✅ Analysis Service initialized")
 
+    @staticmethod
+    def analysis_fields(analysis_result: dict) -> dict:
+        """Call-document fields derived from an analysis: full result, index scores, granular sections."""
+        summary_metrics = analysis_result.get("summary_metrics", {})
+        # Heuristic sections from degraded mode, sections cut off by the deadline and
+        # sections still failing their schema are re-run later (backfill_analysis.py --degraded)
+        reanalysis_keys = [
+            key for key in ("sentiment", "sop_compliance", "risk_analysis", "qa_score", "coaching")
+            if any((analysis_result.get(key) or {}).get(flag) for flag in ("degraded", "timed_out", "schema_errors"))
+        ]
+        return {
+            "analysis": analysis_result,
+            "scores": {
+                "qa": summary_metrics.get("qa_score", 0),
+                "sop": summary_metrics.get("sop_score", 0),
+                "sentiment": summary_metrics.get("sentiment_score", 0),
+                "risk": 100 if summary_metrics.get("risk_detected") else 0
+            },
+            # Granular fields for quick access
+            "sentiment_analysis": analysis_result.get("sentiment"),
+            "sop_analysis": analysis_result.get("sop_compliance"),
+            "risk_analysis": analysis_result.get("risk_analysis"),
+            "qa_analysis": analysis_result.get("qa_score"),
+            "coaching_analysis": analysis_result.get("coaching"),
+            "token_estimates": analysis_result.get("token_budget"),
+            "needs_reanalysis": bool(reanalysis_keys),
+            "reanalysis_keys": reanalysis_keys,
+            # Set when the sections were copied from a near-duplicate call
+            "derived_from": analysis_result.get("derived_from")
+        }
+
     async def analyze_call(self, call_id: str, input_data: str, is_audio_path: bool = False):
         """
         Full Call Analysis Pipeline with comprehensive logging.
@@ -46,23 +87,23 @@ class AnalysisService:
             
             logger.info(f"📝 Transcript preview: {transcript[:200]}...")
             
-            # 2. Run Agent Pipeline
+            # 2. Run Agent Pipeline (or reuse a near-duplicate call's analysis)
             logger.info("-" * 50)
-            logger.info("🤖 Step 2: Running Agent Pipeline...")
-            analysis_result = await orchestrator.analyze_call(call_id, transcript)
-            logger.info("✅ Agent pipeline complete")
+            analysis_result = await reuse_service.analyze(call_id, transcript)
+            if analysis_result is not None:
+                logger.info(f"🧬 Step 2: Reused analysis of {analysis_result['derived_from']['call_id']}")
+            else:
+                logger.info("🤖 Step 2: Running Agent Pipeline...")
+                analysis_result = await orchestrator.analyze_call(call_id, transcript)
+                await reuse_service.remember(call_id, transcript, analysis_result)
+                logger.info("✅ Agent pipeline complete")
             
             # 3. Extract Summary Scores for DB Indexing
             logger.info("-" * 50)
             logger.info("📊 Step 3: Extracting scores for database...")
             
-            summary_metrics = analysis_result.get("summary_metrics", {})
-            scores = {
-                "qa": summary_metrics.get("qa_score", 0),
-                "sop": summary_metrics.get("sop_score", 0),
-                "sentiment": summary_metrics.get("sentiment_score", 0),
-                "risk": 100 if summary_metrics.get("risk_detected") else 0
-            }
+            fields = self.analysis_fields(analysis_result)
+            scores = fields["scores"]
             
             logger.info(f"📊 Scores: QA={scores['qa']}, SOP={scores['sop']}, Sentiment={scores['sentiment']}")
 
@@ -76,17 +117,10 @@ class AnalysisService:
                     {"_id": call_id},
                     {
                         "$set": {
-                            "analysis": analysis_result,
-                            "scores": scores,
+                            **fields,
                             "status": "completed",
                             "ended_at": datetime.datetime.utcnow(),
-                            "transcript": transcript,
-                            # Granular fields for quick access
-                            "sentiment_analysis": analysis_result.get("sentiment"),
-                            "sop_analysis": analysis_result.get("sop_compliance"),
-                            "risk_analysis": analysis_result.get("risk_analysis"),
-                            "qa_analysis": analysis_result.get("qa_score"),
-                            "coaching_analysis": analysis_result.get("coaching")
+                            "transcript": transcript
                         }
                     },
                     upsert=True  # Create if not exists
@@ -95,6 +129,10 @@ class AnalysisService:
             else:
                 logger.error("❌ Database unavailable! Data not persisted.")
             
+            timed_out = (analysis_result.get("pipeline") or {}).get("timed_out_sections") or []
+            if timed_out and db is not None:
+                self.schedule_retry(call_id, timed_out)
+            
             logger.info("=" * 70)
             logger.info(f"🎉 ANALYSIS COMPLETE: {call_id}")
             logger.info("=" * 70)
@@ -124,4 +162,86 @@ class AnalysisService:
             
             raise e
 
+    def schedule_retry(self, call_id: str, keys: List[str]):
+        """
+        Re-runs sections cut off by the analysis deadline once, after
+        ANALYSIS_TIMEOUT_RETRY_DELAY_SECONDS, at backfill priority. The retry
+        lives in this process only: sections it cannot fill stay marked
+        needs_reanalysis for backfill_analysis.py --degraded.
+        """
+        delay = settings.ANALYSIS_TIMEOUT_RETRY_DELAY_SECONDS
+        if delay <= 0:
+            return
+
+        async def retry():
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh_call(call_id, keys, priority=BACKFILL)
+            except Exception as e:
+                logger.error(f"❌ [RETRY] Re-running {keys} for {call_id} failed: {e}")
+
+        task = asyncio.create_task(retry())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+        logger.info(f"⏰ [RETRY] {call_id}: timed-out sections {keys} re-run in {delay:.0f}s")
+
+    def watch_breakers(self):
+        """Re-analyzes calls marked needs_reanalysis whenever a breaker closes; call once at startup."""
+        if settings.ANALYSIS_RECOVERY_REANALYZE_LIMIT > 0:
+            bedrock_gateway.breakers.add_listener(self._on_breaker_change)
+
+    def _on_breaker_change(self, model_id: str, previous: str, state: str):
+        if state != CLOSED or (self._recovery is not None and not self._recovery.done()):
+            return
+        logger.info(f"🟢 [RECOVERY] Breaker for {model_id} closed, re-running calls marked needs_reanalysis")
+        self._recovery = asyncio.get_running_loop().create_task(self.reanalyze_pending(settings.ANALYSIS_RECOVERY_REANALYZE_LIMIT))
+
+    async def reanalyze_pending(self, limit: int) -> int:
+        """
+        Re-runs the flagged sections of up to limit of the most recent calls
+        marked needs_reanalysis, one call at a time at backfill priority.
+        Stops as soon as any breaker opens again, so sections are not traded
+        for errors; the next close picks up where this left off. Returns calls refreshed.
+        """
+        db = await get_database()
+        if db is None:
+            return 0
+        cursor = db["calls"].find(
+            {"needs_reanalysis": True, "transcript": {"$nin": [None, ""]}},
+            {"reanalysis_keys": 1}
+        ).sort("ended_at", -1).limit(limit)
+        refreshed = 0
+        async for call in cursor:
+            if bedrock_gateway.breakers.any_open():
+                logger.warning(f"🔴 [RECOVERY] A breaker opened again, stopping after {refreshed} call(s)")
+                break
+            try:
+                if await self.refresh_call(call["_id"], call.get("reanalysis_keys") or None, priority=BACKFILL):
+                    refreshed += 1
+            except Exception as e:
+                logger.error(f"❌ [RECOVERY] Re-running {call['_id']} failed: {e}")
+        logger.info(f"✅ [RECOVERY] {refreshed} call(s) re-analyzed")
+        return refreshed
+
+    async def refresh_call(self, call_id: str, keys: Optional[List[str]] = None, priority: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Recomputes a stored call's stale sections (or just `keys`) and merges
+        them into its analysis. Returns the keys re-run, None if the call or
+        its transcript is missing. priority sets the LLM priority class.
+        """
+        db = await get_database()
+        call = await db["calls"].find_one({"_id": call_id}, {"transcript": 1, "analysis": 1})
+        if not call or not call.get("transcript"):
+            logger.warning(f"⚠️ [REFRESH] No stored transcript for {call_id}")
+            return None
+        
+        analysis, refreshed = await orchestrator.refresh_analysis(call_id, call["transcript"], call.get("analysis") or {}, keys, priority)
+        if refreshed:
+            await db["calls"].update_one(
+                {"_id": call_id},
+                {"$set": {**self.analysis_fields(analysis), "refreshed_at": datetime.datetime.utcnow()}}
+            )
+            logger.info(f"♻️ [REFRESH] {call_id}: re-ran {refreshed}")
+        return refreshed
+
 analysis_service = AnalysisService()
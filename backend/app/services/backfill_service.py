@@ -0,0 +1,244 @@
+from app.agents.map_reduce import reduce_section
+from app.agents.orchestrator import orchestrator
+from app.core.database import get_database
+from app.core.llm.batch import COMPLETED, FAILED, BatchGateway, BatchRecord, LocalBatchBackend
+from app.core.llm.gateway import bedrock_gateway
+from app.core.llm.router import Route
+from app.core.llm.schema import answer_tool
+from app.core.llm.tokens import estimate_tokens
+from app.services.analysis_service import AnalysisService
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import datetime
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger("BACKFILL_SERVICE")
+
+# Finished stand-in job whose canned results were not written to the calls
+HELD = "held"
+
+
+class BackfillService:
+    """
+    Historical re-analysis through batch inference instead of the interactive
+    gateway path. submit() turns stored transcripts into per-agent batch
+    records; poll() maps finished jobs back onto the call documents. Job state
+    lives in the batch_jobs collection, so submit and poll can run in
+    different processes, hours apart.
+    """
+
+    def __init__(self, batch: Optional[BatchGateway] = None):
+        self._batch = batch
+
+    @property
+    def batch(self) -> BatchGateway:
+        # Created on first use so importing the service never touches AWS
+        if self._batch is None:
+            self._batch = BatchGateway()
+        return self._batch
+
+    def build_records(self, call_id: str, transcript: str, keys: Optional[List[str]] = None) -> List[BatchRecord]:
+        """
+        Batch records for one call: the same prompts, budgets and routing as the
+        live pipeline. A section the live pipeline would map-reduce gets one
+        record per chunk (see OrchestratorAgent.plan_chunks), all routed like
+        the first chunk so they land in the same job; apply reduces them.
+        """
+        records = []
+        for key in keys or list(orchestrator.agents):
+            agent = orchestrator.agents[key]
+            metadata = {"call_id": call_id, "key": key, "fingerprint": orchestrator.section_fingerprint(agent, transcript)}
+            planned = orchestrator.plan_chunks(key, transcript)
+            if planned:
+                chunks, metadata["budget"] = planned
+                route = None
+                for index, chunk in enumerate(chunks):
+                    chunk_metadata = {**metadata, "chunk": index, "chunks": len(chunks), "chunk_tokens": estimate_tokens(chunk)}
+                    route, record = self._record(f"{call_id}--{key}--{index}", agent, chunk, chunk_metadata, route)
+                    records.append(record)
+            else:
+                fitted, metadata["budget"] = orchestrator.fit_transcript(agent, transcript)
+                records.append(self._record(f"{call_id}--{key}", agent, fitted, metadata)[1])
+        return records
+
+    @staticmethod
+    def _record(
+        record_id: str,
+        agent,
+        transcript: str,
+        metadata: Dict[str, Any],
+        route: Optional[Route] = None
+    ) -> Tuple[Route, BatchRecord]:
+        """The agent's batch record for a transcript and the route it takes (route, if given)."""
+        request = agent.build_request(transcript)
+        route, payload = bedrock_gateway.build_payload(
+            request["prompt"],
+            system_instruction=request["system_instruction"],
+            prefix=request["prefix"],
+            agent_name=agent.name,
+            task="analysis",
+            schema=request["schema"],
+            toolset=request["toolset"],
+            route=route
+        )
+        metadata = {**metadata, "tool": answer_tool(payload, agent.name)}
+        return route, BatchRecord(record_id=record_id, model_id=route.model_id, payload=payload, metadata=metadata)
+
+    async def submit(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = 0,
+        keys: Optional[List[str]] = None,
+        stale: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Submits batch jobs re-analyzing every call matching query that has a
+        transcript. Without keys, calls marked needs_reanalysis only re-run
+        their flagged sections (degraded or timed out). stale=True re-runs just
+        the sections whose fingerprint is out of date and skips current calls.
+        """
+        db = await get_database()
+        selector = {"transcript": {"$nin": [None, ""]}, **(query or {})}
+        projection = {"transcript": 1, "needs_reanalysis": 1, "reanalysis_keys": 1, "analysis.fingerprints": 1}
+        cursor = db["calls"].find(selector, projection)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        records = []
+        skipped = 0
+        async for call in cursor:
+            call_keys = keys or (call.get("reanalysis_keys") if call.get("needs_reanalysis") else None)
+            if stale:
+                current = orchestrator.stale_sections(call.get("analysis") or {}, call["transcript"])
+                call_keys = [key for key in (call_keys or current) if key in current]
+                if not call_keys:
+                    skipped += 1
+                    continue
+            records.extend(self.build_records(call["_id"], call["transcript"], call_keys))
+        if skipped:
+            logger.info(f"✅ [BACKFILL] {skipped} call(s) already current, not submitted")
+        if not records:
+            logger.info("📭 [BACKFILL] No calls matched, nothing submitted")
+            return []
+
+        name = f"backfill-{datetime.datetime.utcnow():%Y%m%d-%H%M%S}"
+        jobs = await self.batch.submit(name, records)
+        for job in jobs:
+            await db["batch_jobs"].insert_one({"_id": job["job_name"], **job, "status": "submitted"})
+        logger.info(f"📦 [BACKFILL] {len(records)} records in {len(jobs)} job(s)")
+        return jobs
+
+    async def poll(self, allow_standin: bool = False) -> Dict[str, str]:
+        """
+        Checks every open job once and applies the finished ones. Returns job name -> status.
+        Jobs from the local stand-in backend carry canned answers and would
+        overwrite real analyses, so they are only applied with allow_standin;
+        otherwise they are held (and applied by a later poll that allows them).
+        """
+        db = await get_database()
+        statuses = {}
+        async for job in db["batch_jobs"].find({"status": {"$in": ["submitted", HELD]}}):
+            status = await self.batch.status(job)
+            if status == COMPLETED and job.get("backend") == LocalBatchBackend.name and not allow_standin:
+                if job["status"] != HELD:
+                    logger.warning(f"🧪 [BACKFILL] Job {job['_id']} ran on the stand-in model, not applied (use --allow-standin)")
+                    await db["batch_jobs"].update_one({"_id": job["_id"]}, {"$set": {"status": HELD}})
+                statuses[job["_id"]] = HELD
+                continue
+            statuses[job["_id"]] = status
+            if status == COMPLETED:
+                applied = await self.apply(job)
+                await db["batch_jobs"].update_one(
+                    {"_id": job["_id"]},
+                    {"$set": {"status": "applied", "applied_calls": applied, "applied_at": datetime.datetime.utcnow()}}
+                )
+            elif status == FAILED:
+                logger.error(f"❌ [BACKFILL] Job {job['_id']} failed")
+                await db["batch_jobs"].update_one({"_id": job["_id"]}, {"$set": {"status": "failed"}})
+        return statuses
+
+    async def run_until_done(self, poll_seconds: float, allow_standin: bool = False) -> Dict[str, str]:
+        """Polls until no job is left running."""
+        while True:
+            statuses = await self.poll(allow_standin)
+            running = sum(1 for s in statuses.values() if s not in (COMPLETED, FAILED, HELD))
+            if not running:
+                return statuses
+            logger.info(f"⏳ [BACKFILL] {running} job(s) still running")
+            await asyncio.sleep(poll_seconds)
+
+    async def apply(self, job: Dict[str, Any]) -> int:
+        """Writes a finished job's sections onto their call documents; returns calls updated."""
+        db = await get_database()
+        results = await self.batch.results(job)
+
+        by_call: Dict[str, Dict[str, Any]] = {}
+        calls_made: Dict[str, int] = {}
+        # (call id, key) -> (chunk index, chunk tokens, result) of a map-reduced section's chunks
+        chunked: Dict[Tuple[str, str], list] = {}
+        for record in job["records"]:
+            agent = orchestrator.agents[record["key"]]
+            result = results.get(record["record_id"], {"error": "No output for record"})
+            if "error" in result:
+                section = {"error": result["error"]}
+            else:
+                # Same coercion and schema check as the live path, minus repair calls
+                section = agent.postprocess(agent.check(agent.parse_response(result["text"])))
+            calls_made[record["call_id"]] = calls_made.get(record["call_id"], 0) + 1
+            if "chunk" in record:
+                parts = chunked.setdefault((record["call_id"], record["key"]), [])
+                if "error" not in section:
+                    parts.append((record["chunk"], record["chunk_tokens"], section))
+                if record["chunk"] != record["chunks"] - 1:
+                    continue
+                # Records keep their submit order, so the last chunk closes the section
+                parts.sort(key=lambda part: part[0])
+                if parts:
+                    section = agent.check(reduce_section(record["key"], parts, record["chunks"]))
+                else:
+                    section = {"error": f"All {record['chunks']} chunks failed"}
+            by_call.setdefault(record["call_id"], {})[record["key"]] = (section, record.get("budget"), record.get("fingerprint"))
+
+        for call_id, sections in by_call.items():
+            call = await db["calls"].find_one({"_id": call_id}, {"transcript": 1, "analysis": 1})
+            if call is None:
+                logger.warning(f"⚠️ [BACKFILL] Call {call_id} no longer exists, skipping")
+                continue
+            previous = call.get("analysis") or {}
+            # Sections not re-run in this job keep their previous value
+            clean_results = {key: previous.get(key) or {} for key in orchestrator.agents}
+            token_budget = dict(previous.get("token_budget") or {})
+            fingerprints = dict(previous.get("fingerprints") or {})
+            for key, (section, budget, fingerprint) in sections.items():
+                clean_results[key] = section
+                token_budget[key] = budget
+                # The fingerprint taken at submit time describes the prompt that actually ran;
+                # sections still failing the schema get none so they stay stale
+                if fingerprint and "error" not in section and "schema_errors" not in section:
+                    fingerprints[key] = fingerprint
+                else:
+                    fingerprints.pop(key, None)
+
+            analysis = orchestrator.build_analysis(
+                call_id,
+                call["transcript"],
+                clean_results,
+                pipeline={"mode": "batch", "llm_calls": calls_made[call_id], "fallback_agents": [], "batch_job": job["_id"]},
+                token_budget=token_budget,
+                fingerprints=fingerprints
+            )
+            await db["calls"].update_one(
+                {"_id": call_id},
+                {"$set": {**AnalysisService.analysis_fields(analysis), "reanalyzed_at": datetime.datetime.utcnow()}}
+            )
+        logger.info(f"✅ [BACKFILL] Job {job['_id']}: {len(by_call)} calls updated")
+        return len(by_call)
+
+
+backfill_service = BackfillService()
@@ -21,6 +21,9 @@ logger = logging.getLogger(__name__)
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.core.llm.json_extract import extract_object
+from app.core.pipeline import Pipeline, Stage
+
 # Get Bedrock config
 BEARER_TOKEN = os.getenv("AWS_BEARER_TOKEN_BEDROCK", "")
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
@@ -81,17 +84,10 @@ def call_bedrock(prompt: str, system: str) -> str:
 
 def parse_json(text: str) -> Dict[str, Any]:
     """Parse JSON from LLM response."""
-    if not text:
-        return {}
-    try:
-        text = text.replace("```json", "").replace("```", "").strip()
-        start = text.find("{")
-        end = text.rfind("}") + 1
-        if start != -1 and end > start:
-            return json.loads(text[start:end])
-    except Exception as e:
-        logger.error(f"JSON parse error: {e}")
-    return {}
+    result = extract_object(text)
+    if result is None and text:
+        logger.error(f"JSON parse error: no object in {len(text)} chars")
+    return result or {}
 
 
 def simulate_agent(agent_type: str, prompt: str) -> Dict[str, Any]:
@@ -141,41 +137,65 @@ def calculate_priority(final_severity: int, sentiment_score: float) -> Dict[str,
     return {"priority_score": round(priority_score, 2), "priority_level": level}
 
 
+def run_agent(agent_type: str, prompt: str, system: str, transcript: str) -> Dict[str, Any]:
+    """One blocking Bedrock agent call, simulated when Bedrock is unavailable."""
+    resp = call_bedrock(prompt, system)
+    return parse_json(resp) if resp else simulate_agent(agent_type, transcript)
+
+
+def sentiment_stage(transcript: str) -> Dict[str, Any]:
+    logger.info("Running Sentiment Agent...")
+    return run_agent("sentiment", f"Analyze this transcript:\n{transcript}", SENTIMENT_INSTRUCTION, transcript)
+
+
+def issues_stage(transcript: str) -> list:
+    logger.info("Running Issue Extraction Agent...")
+    return run_agent("issues", f"Extract issues from:\n{transcript}", ISSUE_INSTRUCTION, transcript).get("issues", [])
+
+
+def classification_stage(transcript: str, issues: list) -> list:
+    logger.info("Running Classification Agent...")
+    class_prompt = f"Transcript: {transcript}\n\nIssues: {json.dumps(issues)}"
+    return run_agent("classification", class_prompt, CLASSIFICATION_INSTRUCTION, transcript).get("classified_issues", [])
+
+
+def priority_stage(sentiment: Dict[str, Any], classified_issues: list) -> Dict[str, Any]:
+    max_severity = max([i.get("proposed_severity", 1) for i in classified_issues], default=1)
+    return calculate_priority(max_severity, sentiment.get("sentiment_score", 0))
+
+
+def insights_stage(transcript: str, classified_issues: list, priority: Dict[str, Any]) -> Dict[str, Any]:
+    logger.info("Running Insight Agent...")
+    insight_prompt = f"Issues: {json.dumps(classified_issues)}\nPriority: {priority['priority_level']}"
+    return run_agent("insight", insight_prompt, INSIGHT_INSTRUCTION, transcript)
+
+
+# Sentiment and issue extraction only need the transcript and run side by side;
+# classification starts as soon as the issues are in, priority once both branches are.
+# Stage names are the keys of the raw results passed to _format_output.
+LEGACY_PIPELINE = Pipeline(
+    "legacy",
+    [
+        Stage("sentiment", sentiment_stage, ("transcript",), blocking=True),
+        Stage("issues", issues_stage, ("transcript",), blocking=True),
+        Stage("classified_issues", classification_stage, ("transcript", "issues"), blocking=True),
+        Stage("priority", priority_stage, ("sentiment", "classified_issues")),
+        Stage("insights", insights_stage, ("transcript", "classified_issues", "priority"), blocking=True),
+    ],
+    inputs=("transcript",)
+)
+
+
 class LegacyOrchestrator:
     async def run_pipeline(self, transcript: str) -> Dict[str, Any]:
         """Run the multi-agent analysis pipeline."""
-        results = {}
-        
-        # 1. Sentiment Analysis
-        logger.info("Running Sentiment Agent...")
-        resp = call_bedrock(f"Analyze this transcript:\n{transcript}", SENTIMENT_INSTRUCTION)
-        results["sentiment"] = parse_json(resp) if resp else simulate_agent("sentiment", transcript)
-        
-        # 2. Issue Extraction
-        logger.info("Running Issue Extraction Agent...")
-        resp = call_bedrock(f"Extract issues from:\n{transcript}", ISSUE_INSTRUCTION)
-        issues_data = parse_json(resp) if resp else simulate_agent("issues", transcript)
-        results["issues"] = issues_data.get("issues", [])
-        
-        # 3. Classification
-        logger.info("Running Classification Agent...")
-        class_prompt = f"Transcript: {transcript}\n\nIssues: {json.dumps(results['issues'])}"
-        resp = call_bedrock(class_prompt, CLASSIFICATION_INSTRUCTION)
-        class_data = parse_json(resp) if resp else simulate_agent("classification", transcript)
-        results["classified_issues"] = class_data.get("classified_issues", [])
-        
-        # 4. Priority Scoring
-        max_severity = max([i.get("proposed_severity", 1) for i in results["classified_issues"]], default=1)
-        sent_score = results["sentiment"].get("sentiment_score", 0)
-        results["priority"] = calculate_priority(max_severity, sent_score)
-        
-        # 5. Insights
-        logger.info("Running Insight Agent...")
-        insight_prompt = f"Issues: {json.dumps(results['classified_issues'])}\nPriority: {results['priority']['priority_level']}"
-        resp = call_bedrock(insight_prompt, INSIGHT_INSTRUCTION)
-        results["insights"] = parse_json(resp) if resp else simulate_agent("insight", transcript)
-        
-        return self._format_output(results)
+        run = await LEGACY_PIPELINE.run(transcript=transcript)
+        if run.errors:
+            # Same behaviour as the sequential runner: a failing agent fails the analysis
+            raise next(iter(run.errors.values()))
+        output = self._format_output(run.results)
+        output["pipeline"] = run.summary()
+        return output
     
     def _format_output(self, raw: Dict[str, Any]) -> Dict[str, Any]:
         """Format for frontend consumption."""
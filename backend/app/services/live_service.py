@@ -1,8 +1,9 @@
 from fastapi import WebSocket
 from typing import Dict, List
-import json
 import logging
 from app.core.llm.gateway import bedrock_gateway
+from app.core.llm.json_extract import extract_object
+from app.core.llm.priority import LIVE
 
 # Configure logging
 logging.basicConfig(
@@ -109,16 +110,15 @@ Respond with ONLY this JSON:
 }}
 """
             try:
-                response_txt = await bedrock_gateway.invoke_model(prompt)
+                response_txt = await bedrock_gateway.invoke_model(
+                    prompt,
+                    task="nudge",
+                    priority=LIVE,
+                    cacheable=lambda text: extract_object(text) is not None
+                )
                 
-                # Parse response
-                response_txt = response_txt.replace("```json", "").replace("```", "").strip()
-                start = response_txt.find("{")
-                end = response_txt.rfind("}") + 1
-                
-                if start != -1 and end > start:
-                    data = json.loads(response_txt[start:end])
-                    
+                data = extract_object(response_txt)
+                if data is not None:
                     if data.get("nudge_needed"):
                         logger.info(f"💡 [NUDGE] LLM nudge generated: {data.get('message', '')[:50]}")
                         nudge = {
@@ -0,0 +1,169 @@
+from app.agents.orchestrator import orchestrator
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import ANALYSIS_REUSE
+from app.core.similarity import Signature, TranscriptIndex
+from typing import Any, Dict, Optional
+import asyncio
+import copy
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger("REUSE_SERVICE")
+
+REUSE_MODES = ("off", "copy", "cheap")
+
+# Section key -> (list field, item field) holding verbatim transcript excerpts.
+# Copied sections would show the source customer's words, so these are blanked.
+QUOTED_FIELDS = {
+    "sop_compliance": ("checklist", "evidence"),
+    "risk_analysis": ("flags", "quote"),
+}
+
+
+class ReuseService:
+    """
+    Near-duplicate reuse for scripted calls. Transcripts of completed,
+    fully analyzed calls go into a MinHash LSH index; a new call whose
+    nearest neighbour is at least ANALYSIS_REUSE_THRESHOLD similar gets that
+    call's analysis instead of a full run:
+      "copy"  - every section copied, no LLM call
+      "cheap" - sections copied, ANALYSIS_REUSE_RERUN agents re-run on the new transcript
+    Copied sections are flagged "derived" and the analysis records derived_from;
+    their quotes and evidence come from the source call and are dropped (see derive).
+    Their fingerprints still name the source transcript, so they count as
+    stale and a later refresh (backfill --stale) can replace them.
+    MinHash signatures are computed in a worker thread so hashing a long
+    transcript never stalls the event loop; the index is warmed in the
+    background after startup and simply misses until it is filled.
+    """
+
+    def __init__(self):
+        self.mode = settings.ANALYSIS_REUSE_MODE.lower()
+        if self.mode not in REUSE_MODES:
+            logger.warning(f"⚠️ [REUSE] Unknown ANALYSIS_REUSE_MODE '{self.mode}', reuse is off")
+            self.mode = "off"
+        self.index = TranscriptIndex(max_entries=settings.ANALYSIS_REUSE_INDEX_SIZE)
+        self._warming: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def reusable(analysis: Dict[str, Any]) -> bool:
+        """Only complete, first-hand analyses are reused: no failed, degraded or derived sections."""
+        if not analysis or analysis.get("derived_from"):
+            return False
+        for key in orchestrator.agents:
+            section = analysis.get(key) or {}
+            if not section or "error" in section or section.get("degraded"):
+                return False
+        return True
+
+    @staticmethod
+    def derive(key: str, section: Dict[str, Any]) -> Dict[str, Any]:
+        """A copy of another call's section for this one, flagged "derived", without its quotes."""
+        derived = {**copy.deepcopy(section), "derived": True}
+        if key in QUOTED_FIELDS:
+            items, field = QUOTED_FIELDS[key]
+            for item in derived.get(items) or []:
+                if isinstance(item, dict) and field in item:
+                    item[field] = ""
+        return derived
+
+    async def signature(self, transcript: str) -> Signature:
+        """The transcript's MinHash signature, computed off the event loop."""
+        return await asyncio.to_thread(self.index.hasher.signature, transcript)
+
+    async def remember(self, call_id: str, transcript: str, analysis: Dict[str, Any]):
+        """Indexes a finished call so later near-duplicates can reuse its analysis."""
+        if self.enabled and transcript and self.reusable(analysis):
+            self.index.add_signature(call_id, await self.signature(transcript))
+
+    def start_warm(self):
+        """Runs warm() as a background task, so startup does not wait for the index."""
+        if not self.enabled or self._warming is not None:
+            return
+
+        async def warm():
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.error(f"❌ [REUSE] Similarity index warm-up failed: {e}")
+
+        self._warming = asyncio.create_task(warm())
+
+    async def warm(self, limit: Optional[int] = None):
+        """Indexes the most recent completed calls; run once at startup (see start_warm)."""
+        if not self.enabled:
+            return
+        db = await get_database()
+        if db is None:
+            return
+        limit = settings.ANALYSIS_REUSE_WARM_LIMIT if limit is None else limit
+        cursor = db["calls"].find(
+            {"status": "completed", "transcript": {"$nin": [None, ""]}, "derived_from": None},
+            {"transcript": 1, "analysis": 1}
+        ).sort("ended_at", -1).limit(limit)
+        async for call in cursor:
+            await self.remember(call["_id"], call["transcript"], call.get("analysis") or {})
+        logger.info(f"🧬 [REUSE] Similarity index warmed with {len(self.index)} calls ({self.mode} mode)")
+
+    async def analyze(self, call_id: str, transcript: str) -> Optional[Dict[str, Any]]:
+        """
+        An analysis derived from the nearest similar call, or None when reuse
+        is off, nothing is similar enough or the match is no longer usable.
+        """
+        if not self.enabled:
+            return None
+        signature = await self.signature(transcript)
+        match = self.index.nearest_signature(signature, settings.ANALYSIS_REUSE_THRESHOLD, exclude=call_id)
+        if match is None:
+            ANALYSIS_REUSE.inc(outcome="miss")
+            return None
+        source_id, similarity = match
+
+        db = await get_database()
+        source = await db["calls"].find_one({"_id": source_id}, {"analysis": 1}) if db is not None else None
+        previous = (source or {}).get("analysis") or {}
+        if not self.reusable(previous):
+            # Deleted or re-analyzed since it was indexed
+            self.index.remove(source_id)
+            ANALYSIS_REUSE.inc(outcome="unusable")
+            return None
+
+        logger.info(f"🧬 [REUSE] {call_id} is {similarity:.0%} similar to {source_id}, reusing ({self.mode})")
+        sections = {key: self.derive(key, previous[key]) for key in orchestrator.agents}
+        rerun = [key for key in settings.ANALYSIS_REUSE_RERUN if key in sections] if self.mode == "cheap" else []
+        if rerun:
+            analysis, rerun = await orchestrator.refresh_analysis(call_id, transcript, {**previous, **sections}, keys=rerun)
+        else:
+            analysis = orchestrator.build_analysis(
+                call_id,
+                transcript,
+                sections,
+                pipeline={"mode": "reuse", "llm_calls": 0, "fallback_agents": []},
+                token_budget=previous.get("token_budget"),
+                fingerprints=previous.get("fingerprints")
+            )
+        analysis["pipeline"]["mode"] = "reuse"
+        analysis["derived_from"] = {"call_id": source_id, "similarity": round(similarity, 3), "mode": self.mode, "rerun": rerun}
+        ANALYSIS_REUSE.inc(outcome=self.mode)
+        return analysis
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "threshold": settings.ANALYSIS_REUSE_THRESHOLD,
+            "warming": self._warming is not None and not self._warming.done(),
+            "index": self.index.stats(),
+        }
+
+
+reuse_service = ReuseService()
@@ -0,0 +1,67 @@
+"""
+Re-analyze stored calls through batch inference.
+
+Usage:
+    python scripts/backfill_analysis.py submit [--limit 1000] [--query '{"status": "completed"}'] [--keys sentiment,qa_score] [--degraded] [--stale] [--wait]
+    python scripts/backfill_analysis.py poll [--wait] [--allow-standin]
+
+submit builds the same per-agent prompts as the live pipeline for every
+matching call and submits them as batch jobs (LLM_BATCH_BACKEND: "bedrock"
+or the "local" stand-in). poll checks open jobs and writes finished results
+back onto the call documents; --wait keeps polling until all jobs are done.
+Stand-in jobs hold canned answers and are only written to the calls with
+--allow-standin (e.g. against a test database); without it they are held.
+--degraded limits submit to calls stored with heuristic sections while
+Bedrock's circuit breaker was open, with sections cut off by the analysis
+deadline or with sections still failing their schema (needs_reanalysis);
+only those sections are re-run.
+--stale re-runs only sections whose fingerprint (agent version, prompt hash,
+model, transcript hash) no longer matches, e.g. after editing one agent's
+prompt: one batch record per changed section instead of five per call.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+from app.services.backfill_service import backfill_service
+
+
+async def main(args):
+    if args.command == "submit":
+        query = json.loads(args.query) if args.query else {}
+        if args.degraded:
+            query["needs_reanalysis"] = True
+        keys = args.keys.split(",") if args.keys else None
+        jobs = await backfill_service.submit(query=query, limit=args.limit, keys=keys, stale=args.stale)
+        for job in jobs:
+            print(f"📦 {job['job_name']}: {job['record_count']} records on {job['model_id']} ({job['backend']})")
+
+    if args.command == "poll" or args.wait:
+        if args.wait:
+            statuses = await backfill_service.run_until_done(args.poll_seconds, args.allow_standin)
+        else:
+            statuses = await backfill_service.poll(args.allow_standin)
+        for name, status in statuses.items():
+            print(f"   {name}: {status}")
+        if not statuses:
+            print("📭 No open batch jobs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch re-analysis of stored calls")
+    parser.add_argument("command", choices=["submit", "poll"])
+    parser.add_argument("--limit", type=int, default=0, help="Max calls to submit (0 = all)")
+    parser.add_argument("--query", help="Extra MongoDB filter on the calls collection, as JSON")
+    parser.add_argument("--keys", help="Comma-separated result keys to re-run (default: all agents)")
+    parser.add_argument("--degraded", action="store_true", help="Only calls marked needs_reanalysis (degraded, timed-out or schema-failing sections)")
+    parser.add_argument("--stale", action="store_true", help="Only sections whose stored fingerprint is out of date")
+    parser.add_argument("--wait", action="store_true", help="Poll until every job is applied")
+    parser.add_argument("--allow-standin", action="store_true", help="Apply results of the local stand-in backend to the calls")
+    parser.add_argument("--poll-seconds", type=float, default=settings.LLM_BATCH_POLL_SECONDS)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,167 @@
+"""
+Local Bedrock-runtime stand-in server for load tests.
+
+Usage:
+    python scripts/bedrock_standin_server.py [--port 8765] [--median-ms 1500] [--p99-ms 6000]
+        [--throttle-rate 0.05] [--burst-rate 0.01] [--burst-length 5]
+        [--slow-stream-rate 0.1] [--slow-stream-delay-ms 500] [--seed 42]
+
+Then point the backend at it:
+    LLM_ENDPOINT_URL=http://localhost:8765 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x uvicorn app.main:app
+
+Implements InvokeModel and InvokeModelWithResponseStream (AWS event-stream
+framing) on the same paths as Bedrock, so the real boto3 client, retry
+policy, limiter and streaming reader are exercised end to end. Responses are
+schema-correct JSON for each specialized agent (see app/core/llm/standin.py).
+Defaults come from the STANDIN_* settings. GET /stats returns fault counters.
+"""
+import argparse
+import base64
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+from app.core.llm.standin import FAULT_ERRORS, FaultInjector, StandInModel
+
+
+def _event_header(name: str, value: str) -> bytes:
+    name_bytes, value_bytes = name.encode("utf-8"), value.encode("utf-8")
+    # Header value type 7 = string
+    return struct.pack("!B", len(name_bytes)) + name_bytes + struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+
+
+def encode_event(event: dict) -> bytes:
+    """One AWS event-stream message carrying a Bedrock "chunk" event."""
+    headers = (
+        _event_header(":event-type", "chunk")
+        + _event_header(":content-type", "application/json")
+        + _event_header(":message-type", "event")
+    )
+    payload = json.dumps({"bytes": base64.b64encode(json.dumps(event).encode("utf-8")).decode("ascii")}).encode("utf-8")
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(headers))
+    prelude += struct.pack("!I", zlib.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + headers + payload
+    return message + struct.pack("!I", zlib.crc32(message) & 0xFFFFFFFF)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model: StandInModel = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # Streaming clients hang up as soon as their JSON object closes
+            pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.model.faults.counts)
+        else:
+            self._send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "model" or parts[2] not in ("invoke", "invoke-with-response-stream"):
+            self._send_json(404, {"message": f"Unknown path {self.path}"}, {"x-amzn-ErrorType": "ResourceNotFoundException"})
+            return
+        operation = parts[2]
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        fault = self.model.faults.fault()
+        if fault is not None:
+            code, status, message = FAULT_ERRORS[fault]
+            time.sleep(min(0.05, self.model.faults.latency_seconds()))
+            self._send_json(status, {"message": message}, {"x-amzn-ErrorType": code})
+            return
+
+        latency = self.model.faults.latency_seconds()
+        if operation == "invoke":
+            time.sleep(latency)
+            self._send_json(200, self.model.body(payload))
+            return
+
+        events = list(self.model.stream_events(payload))
+        chunks = max(1, sum(1 for e in events if e["type"] == "content_block_delta"))
+        chunk_delay = 0.8 * latency / chunks + self.model.faults.stream_chunk_delay_seconds()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("x-amzn-bedrock-content-type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(0.2 * latency)
+        try:
+            for event in events:
+                if event["type"] == "content_block_delta":
+                    time.sleep(chunk_delay)
+                self._write_chunk(encode_event(event))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bedrock-runtime stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--median-ms", type=float, default=settings.STANDIN_LATENCY_MEDIAN_MS)
+    parser.add_argument("--p99-ms", type=float, default=settings.STANDIN_LATENCY_P99_MS)
+    parser.add_argument("--throttle-rate", type=float, default=settings.STANDIN_THROTTLE_RATE)
+    parser.add_argument("--burst-rate", type=float, default=settings.STANDIN_BURST_RATE)
+    parser.add_argument("--burst-length", type=int, default=settings.STANDIN_BURST_LENGTH)
+    parser.add_argument("--slow-stream-rate", type=float, default=settings.STANDIN_SLOW_STREAM_RATE)
+    parser.add_argument("--slow-stream-delay-ms", type=float, default=settings.STANDIN_SLOW_STREAM_DELAY_MS)
+    parser.add_argument("--seed", type=int, default=settings.STANDIN_SEED)
+    args = parser.parse_args()
+
+    StandInHandler.model = StandInModel(FaultInjector(
+        latency_median_ms=args.median_ms,
+        latency_p99_ms=args.p99_ms,
+        throttle_rate=args.throttle_rate,
+        burst_rate=args.burst_rate,
+        burst_length=args.burst_length,
+        slow_stream_rate=args.slow_stream_rate,
+        slow_stream_delay_ms=args.slow_stream_delay_ms,
+        seed=args.seed,
+    ))
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    server.daemon_threads = True
+    print(f"🧪 Bedrock stand-in listening on http://{args.host}:{args.port} "
+          f"(p50={args.median_ms}ms, p99={args.p99_ms}ms, throttle={args.throttle_rate}, burst={args.burst_rate}x{args.burst_length})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()